@@ -1,3 +1,11 @@
 from .kite import Kite
 from .utils import TechnicalAnalysis
-from .v2 import TechnicalAnalysisV2
\ No newline at end of file
+from .v2 import TechnicalAnalysisV2
+from .metrics import MetricsRegistry
+from .batch import BatchTechnicalAnalysis
+from .frame import CandleFrame
+from .orders import OrderGateway, OrderStatusUnknown
+from .portfolio import PortfolioService
+from .shm import SharedMarketPublisher, SharedMarketReader
+from .scheduler import CandleScheduler
+from .features import FeatureStore
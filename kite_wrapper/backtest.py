@@ -0,0 +1,167 @@
+import concurrent.futures as concurrent
+import itertools
+import numpy as np
+import pandas as pd
+
+from .batch import BatchTechnicalAnalysis
+
+# Minute bars in a year of NSE sessions.
+MINUTE_PERIODS_PER_YEAR = 252 * 375
+
+ACTION_SIGNALS = {
+    'Buy': 1.0,
+    'Sell': -1.0,
+}
+
+
+def _ffill(x):
+    """
+    Forward fill NaN along the time axis. Leading NaN stay NaN.
+    """
+    valid = ~np.isnan(x)
+    index = np.where(valid, np.arange(x.shape[1])[None, :], 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    return np.take_along_axis(x, index, axis=1)
+
+
+def _shift(x, lag, fill=np.nan):
+    out = np.full(x.shape, fill, dtype=np.float64)
+    if lag < x.shape[1]:
+        out[:, lag:] = x[:, :x.shape[1] - lag]
+    return out
+
+
+def _shift_bars(x, valid, lag, fill=np.nan):
+    """
+    Shift each row by `lag` of its own valid bars, so values move from bar to bar over missing bars instead of
+    landing on them. NaN at missing bars.
+    """
+    # Move each row's valid bars to the front, shift there and move them back, as BatchTechnicalAnalysis does.
+    order = np.argsort(~valid, axis=1, kind='stable')
+    shifted = _shift(np.take_along_axis(x, order, axis=1), lag, fill)
+    out = np.empty(x.shape, dtype=np.float64)
+    np.put_along_axis(out, order, shifted, axis=1)
+    out[~valid] = np.nan
+    return out
+
+
+class Backtest:
+    """
+    Vectorized backtest over many instruments at once.
+    A signal decided at the close of bar t is filled at the open of bar t + lag, counting only the instrument's own
+    bars. Costs and slippage are charged in basis points of traded notional each time the position changes.
+    Positions are held through missing bars.
+    """
+
+    def __init__(self, batch: BatchTechnicalAnalysis, cost_bps=3.0, slippage_bps=2.0,
+                 periods_per_year=MINUTE_PERIODS_PER_YEAR):
+        """
+        :param batch: BatchTechnicalAnalysis holding the aligned candles.
+        :param cost_bps: Brokerage and taxes per unit of position change, in basis points.
+        :param slippage_bps: Slippage per unit of position change, in basis points.
+        :param periods_per_year: Bars per year, to annualise the Sharpe ratio. Eg: 252 for day candles.
+        """
+        self.batch = batch
+        self.cost = (cost_bps + slippage_bps) / 10000.0
+        self.periods_per_year = periods_per_year
+        ohlcv = batch.get_ohlcv()
+        self.open = ohlcv['open']
+        self.close = ohlcv['close']
+        self.valid = ~np.isnan(self.close)
+
+    def run(self, signals, lag=1, long_only=False):
+        """
+        Simulate target positions.
+        :param signals: 2-D array (instruments x time) of target position, 1 long, -1 short, 0 flat, NaN keep.
+        :param lag: Bars between the signal and its fill. 1 fills at the next bar's open.
+        :param long_only: Treat short signals as flat.
+        :return: Dict {positions, returns, equity, stats (DataFrame, one row per instrument)}
+        """
+        signals = np.array(signals, dtype=np.float64)
+        signals[~self.valid] = np.nan
+        if long_only:
+            signals = np.where(signals < 0, 0.0, signals)
+        target = np.nan_to_num(_ffill(signals), nan=0.0)
+        # Orders execute only at bars that traded, otherwise the position carries over.
+        positions = _shift_bars(target, self.valid, lag, fill=0.0)
+        positions = np.nan_to_num(_ffill(positions), nan=0.0)
+        previous = _shift(positions, 1, fill=0.0)
+        previous_close = _shift(_ffill(self.close), 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            gap = np.where(np.isnan(previous_close), 0.0, self.open / previous_close - 1)
+            session = self.close / self.open - 1
+        returns = previous * gap + positions * session - np.abs(positions - previous) * self.cost
+        returns = np.where(self.valid, returns, 0.0)
+        equity = np.cumprod(1 + returns, axis=1)
+        return {
+            'positions': positions,
+            'returns': returns,
+            'equity': equity,
+            'stats': self.__stats(positions, returns, equity),
+        }
+
+    def __stats(self, positions, returns, equity):
+        bars = np.maximum(self.valid.sum(axis=1), 1)
+        mean = returns.sum(axis=1) / bars
+        variance = ((returns - mean[:, None]) ** 2 * self.valid).sum(axis=1) / bars
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sharpe = np.where(variance > 0, mean / np.sqrt(variance) * np.sqrt(self.periods_per_year), np.nan)
+        drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+        changes = np.abs(np.diff(positions, axis=1, prepend=0.0)) > 0
+        return pd.DataFrame({
+            'token': self.batch.tokens if self.batch.tokens is not None else range(len(bars)),
+            'total_return': equity[:, -1] - 1,
+            'sharpe': sharpe,
+            'max_drawdown': drawdown.min(axis=1),
+            'trades': changes.sum(axis=1),
+            'exposure': ((positions != 0) & self.valid).sum(axis=1) / bars,
+        })
+
+    def run_trend(self, smal=30, smah=60, longsma=120, lag=1, long_only=False):
+        """
+        Backtest the trend rule of Kite.get_trend_and_input_features: long on 'Long', short on 'Short', flat on
+        'None'.
+        """
+        signals = self.batch.get_trend(smal=smal, smah=smah, longsma=longsma).astype(np.float64)
+        return self.run(signals, lag=lag, long_only=long_only)
+
+    def run_actions(self, actions, stride=1, long_only=False):
+        """
+        Backtest Buy/Sell/Hold actions of TechnicalAnalysisV2.get_swing_data. Buy goes long, Sell goes short (flat if
+        long_only) and Hold keeps the position.
+        The action of a bar compares it with the bar `stride` ahead, so it is only known `stride` bars later and is
+        filled one bar after that.
+        :param actions: List of action lists, one per instrument, each aligned to that instrument's bars.
+        :param stride: Stride used to generate the actions.
+        """
+        signals = np.full(self.close.shape, np.nan)
+        for row, labels in enumerate(actions):
+            values = np.array([ACTION_SIGNALS.get(a, np.nan) for a in labels], dtype=np.float64)
+            columns = np.flatnonzero(self.valid[row])[:len(values)]
+            signals[row, columns] = values[:len(columns)]
+        signals = _shift_bars(signals, self.valid, stride)
+        return self.run(signals, lag=1, long_only=long_only)
+
+    def grid(self, smal=(10, 20, 30), smah=(40, 60), longsma=(120, 200), lag=1, long_only=False, workers=None):
+        """
+        Run the trend rule for every valid combination of SMA lengths over all instruments.
+        Moving averages are computed once per length and shared across combinations.
+        :param workers: Threads used to evaluate combinations.
+        :return: DataFrame with one row per (smal, smah, longsma, token).
+        """
+        combinations = [c for c in itertools.product(smal, smah, longsma) if c[2] > c[1] > c[0]]
+        lengths = sorted(set(itertools.chain.from_iterable(combinations)))
+        self.batch.get_indicators(*['close_{}_sma'.format(n) for n in lengths], 'pdi', 'mdi', 'adx')
+
+        def evaluate(combination):
+            stats = self.run_trend(*combination, lag=lag, long_only=long_only)['stats']
+            stats.insert(0, 'longsma', combination[2])
+            stats.insert(0, 'smah', combination[1])
+            stats.insert(0, 'smal', combination[0])
+            return stats
+
+        with concurrent.ThreadPoolExecutor(max_workers=workers) as E:
+            results = list(E.map(evaluate, combinations))
+        if not results:
+            return pd.DataFrame()
+        return pd.concat(results, ignore_index=True)
@@ -0,0 +1,377 @@
+import re
+import numpy as np
+import pandas as pd
+
+from .precision import resolve_dtype, restore_prices
+
+# stockstats defaults, kept identical so batch results match TechnicalAnalysisV2.get_indicators
+KDJ_WINDOW = 9
+KDJ_DECAY = 2.0 / 3.0
+KDJ_INITIAL = 50.0
+DMI_WINDOW = 14
+ADX_WINDOW = 6
+
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+TREND_LONG = 1
+TREND_SHORT = -1
+TREND_NONE = 0
+
+_BLOCK = 128
+
+
+def _float_dtype(x):
+    """
+    float32 arrays are computed in float32, anything else in float64.
+    """
+    return np.float32 if x.dtype == np.float32 else np.float64
+
+
+def decay_filter(x, decay, initial=None, block=_BLOCK):
+    """
+    Solve y[t] = decay * y[t-1] + x[t] along the last axis for every row at once.
+    Works block by block with a small matrix product, so the Python loop runs T / block times.
+    :param x: 2-D array (rows x time). Must not contain NaN. float32 input is solved in float32.
+    :param decay: Decay factor between 0 and 1.
+    :param initial: y[-1] per row. Defaults to 0.
+    :param block: Number of time steps solved per matrix product.
+    :return: (y, y[-1]) where the second value is the carried state for the next call.
+    """
+    x = np.asarray(x)
+    dtype = _float_dtype(x)
+    x = x.astype(dtype, copy=False)
+    rows, length = x.shape
+    state = np.zeros(rows, dtype=dtype) if initial is None else np.array(initial, dtype=dtype)
+    out = np.empty_like(x)
+    steps = np.arange(block)
+    lags = steps[None, :] - steps[:, None]
+    weights = np.where(lags >= 0, decay ** np.clip(lags, 0, None), 0.0).astype(dtype)
+    carry = (decay ** (steps + 1)).astype(dtype)
+    for start in range(0, length, block):
+        size = min(block, length - start)
+        out[:, start:start + size] = x[:, start:start + size] @ weights[:size, :size] + \
+            state[:, None] * carry[None, :size]
+        state = out[:, start + size - 1].copy()
+    return out, state
+
+
+def ewm_mean(x, alpha, state=None):
+    """
+    Exponentially weighted mean matching pandas ewm(alpha=alpha, adjust=True, ignore_na=False).mean().
+    NaN inputs add no weight but still decay earlier weights; output holds the last value until data starts.
+    :param x: 2-D array (rows x time).
+    :param alpha: Smoothing factor.
+    :param state: (numerator, denominator) carried from a previous call, for incremental updates.
+    :return: (mean, state). float32 input gives float32 output.
+    """
+    x = np.asarray(x)
+    dtype = _float_dtype(x)
+    valid = ~np.isnan(x)
+    numerator, denominator = (None, None) if state is None else state
+    num, num_state = decay_filter(np.where(valid, x, 0.0).astype(dtype, copy=False), 1 - alpha, numerator)
+    den, den_state = decay_filter(valid.astype(dtype), 1 - alpha, denominator)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(den > 0, num / den, np.nan)
+    return mean, (num_state, den_state)
+
+
+def rolling_mean(x, window):
+    """
+    Rolling mean with min_periods=1, accumulated in float64 and returned in the dtype of x, since the running sum
+    of a long series loses the digits a float32 mean needs.
+    """
+    x = np.asarray(x)
+    c = np.cumsum(x, axis=1, dtype=np.float64)
+    out = c.copy()
+    out[:, window:] = c[:, window:] - c[:, :-window]
+    counts = np.minimum(np.arange(1, x.shape[1] + 1), window)
+    return (out / counts[None, :]).astype(_float_dtype(x), copy=False)
+
+
+def rolling_extreme(x, window, fn):
+    """
+    Rolling max (fn=np.fmax) or min (fn=np.fmin) with min_periods=1.
+    """
+    out = np.array(x, dtype=_float_dtype(x))
+    for lag in range(1, min(window, x.shape[1])):
+        out[:, lag:] = fn(out[:, lag:], x[:, :-lag])
+    return out
+
+
+def diff(x):
+    out = np.full(x.shape, np.nan, dtype=x.dtype)
+    out[:, 1:] = x[:, 1:] - x[:, :-1]
+    return out
+
+
+class BatchTechnicalAnalysis:
+    """
+    Technical analysis over many instruments at once.
+    Input is an aligned (instruments x time) matrix per OHLCV column with NaN for missing bars.
+    Each instrument is computed over its own bars only, as if it had been passed alone to
+    TechnicalAnalysisV2.get_indicators, and results are NaN at its missing bars.
+
+    Supported indicators: <column>_<n>_sma, <column>_<n>_ema, rsi_<n>, wr_<n>, pdi, mdi, dx, adx, adxr,
+    kdjk, kdjd, kdjj (and _<n> variants), vwap.
+
+    With dtype=float32 candles, intermediate columns and results take half the memory and the recursive filters run
+    as float32 matrix products. Sums over long spans (sma, vwap) are still accumulated in float64 and the DMI family
+    (pdi, mdi, dx, adx, adxr) is computed in float64 and cast at the end. See precision.FLOAT32_TOLERANCE for the
+    error against float64 per indicator.
+    """
+
+    def __init__(self, data, tokens=None, timestamps=None, dtype=np.float64):
+        """
+        :param data: Dict of column name to 2-D array (instruments x time). Needs open, high, low, close, volume.
+        :param tokens: Instrument tokens, one per row.
+        :param timestamps: Timestamps, one per column.
+        :param dtype: float64, or float32 for large universes. See precision.resolve_dtype.
+        """
+        self.tokens = tokens
+        self.timestamps = timestamps
+        self.dtype = resolve_dtype(dtype)
+        close = np.asarray(data['close'], dtype=self.dtype)
+        self.shape = close.shape
+        missing = np.isnan(close)
+        for column in OHLCV:
+            missing |= np.isnan(np.asarray(data[column], dtype=self.dtype))
+        self.missing = missing
+        # Move each row's bars to the front, so recursive indicators never see a gap.
+        self.__order = np.argsort(missing, axis=1, kind='stable')
+        self.__columns = {c: self.__compact(np.asarray(data[c], dtype=self.dtype)) for c in OHLCV}
+        self.__cache = {}
+
+    @classmethod
+    def from_candles(cls, candle_sets, dtype=np.float64):
+        """
+        Align candle lists of several instruments on their timestamps.
+        :param candle_sets: Dict of instrument token to list of candles (as returned by Kite.get_historic_data).
+        :param dtype: float64 or float32.
+        :return: BatchTechnicalAnalysis
+        """
+        frames = {token: pd.DataFrame(candles).set_index('date')[OHLCV] for token, candles in candle_sets.items()}
+        combined = pd.concat(frames, names=['token', 'date']).unstack('token').sort_index()
+        tokens = list(frames.keys())
+        data = {c: combined[c][tokens].to_numpy(dtype=resolve_dtype(dtype)).T for c in OHLCV}
+        return cls(data, tokens=tokens, timestamps=combined.index, dtype=dtype)
+
+    def __compact(self, x):
+        return np.take_along_axis(x, self.__order, axis=1)
+
+    def __expand(self, x):
+        out = np.full(self.shape, np.nan, dtype=self.dtype)
+        np.put_along_axis(out, self.__order, x, axis=1)
+        out[self.missing] = np.nan
+        return out
+
+    def __column(self, name):
+        """
+        Compacted series by stockstats style name. Results are cached for reuse by dependent indicators.
+        """
+        if name in self.__cache:
+            return self.__cache[name]
+        if name in self.__columns:
+            return self.__columns[name]
+        value = self.__compute(name)
+        self.__cache[name] = value
+        return value
+
+    def __compute(self, name):
+        c = self.__column
+        match = re.match(r'^(open|high|low|close|volume)_(\d+)_(sma|ema|smma)$', name)
+        if match:
+            column, window, kind = match.group(1), int(match.group(2)), match.group(3)
+            if kind == 'sma':
+                return rolling_mean(c(column), window)
+            alpha = 2.0 / (window + 1) if kind == 'ema' else 1.0 / window
+            return ewm_mean(c(column), alpha)[0]
+        match = re.match(r'^rsi_(\d+)$', name)
+        if match:
+            window = int(match.group(1))
+            d = diff(c('close'))
+            gain = ewm_mean((d + np.abs(d)) / 2, 1.0 / window)[0]
+            loss = ewm_mean((-d + np.abs(d)) / 2, 1.0 / window)[0]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return 100 - 100 / (1.0 + gain / loss)
+        match = re.match(r'^wr_(\d+)$', name)
+        if match:
+            window = int(match.group(1))
+            hn = rolling_extreme(c('high'), window, np.fmax)
+            ln = rolling_extreme(c('low'), window, np.fmin)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return (hn - c('close')) / (hn - ln) * 100
+        match = re.match(r'^(kdjk|kdjd|kdjj)(?:_(\d+))?$', name)
+        if match:
+            kind, window = match.group(1), int(match.group(2) or KDJ_WINDOW)
+            if kind == 'kdjj':
+                return 3 * c('kdjk_{}'.format(window)) - 2 * c('kdjd_{}'.format(window))
+            if kind == 'kdjk':
+                low = rolling_extreme(c('low'), window, np.fmin)
+                high = rolling_extreme(c('high'), window, np.fmax)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    source = (c('close') - low) / (high - low)
+                source = source * 100
+            else:
+                source = c('kdjk_{}'.format(window))
+            initial = np.full(self.shape[0], KDJ_INITIAL)
+            source = np.where(np.isnan(source), 0.0, source)
+            return decay_filter(source * (1 - KDJ_DECAY), KDJ_DECAY, initial)[0]
+        if name in ['pdi', 'mdi', 'dx', 'adx', 'adxr']:
+            return self.__dmi(name)
+        if name == 'vwap':
+            close, volume = c('close').astype(np.float64), c('volume').astype(np.float64)
+            vwap = np.cumsum(volume * close, axis=1) / np.cumsum(volume, axis=1)
+            return (vwap / np.nanmax(vwap, axis=1, keepdims=True)).astype(self.dtype, copy=False)
+        raise KeyError(name)
+
+    def __dmi(self, name):
+        return self.__dmi64(name).astype(self.dtype, copy=False)
+
+    def __dmi64(self, name):
+        """
+        DMI family in float64 whatever the dtype. A bar's move is credited to pdi or mdi by comparing its up and down
+        moves, so float32 prices are first restored to the price grid (precision.restore_prices) and ties fall the
+        same way as in float64.
+        """
+        key = ('float64', name)
+        if key in self.__cache:
+            return self.__cache[key]
+        if name in ['adx', 'adxr']:
+            value = ewm_mean(self.__dmi64('dx' if name == 'adx' else 'adx'), 2.0 / (ADX_WINDOW + 1))[0]
+        elif name == 'dx':
+            pdi, mdi = self.__dmi64('pdi'), self.__dmi64('mdi')
+            with np.errstate(invalid='ignore', divide='ignore'):
+                value = np.abs(pdi - mdi) / (pdi + mdi) * 100
+        else:
+            high, low = self.__prices64('high'), self.__prices64('low')
+            hd = diff(high)
+            ld = -diff(low)
+            up = (hd + np.abs(hd)) / 2
+            down = (ld + np.abs(ld)) / 2
+            with np.errstate(invalid='ignore'):
+                dm = np.where(up > down, up, 0.0) if name == 'pdi' else np.where(down > up, down, 0.0)
+            dm = np.where(np.isnan(high) | np.isnan(low), np.nan, dm)
+            dm_ema = ewm_mean(dm, 2.0 / (DMI_WINDOW + 1))[0]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                value = dm_ema / self.__atr() * 100
+        self.__cache[key] = value
+        return value
+
+    def __prices64(self, name):
+        if self.dtype == np.float64:
+            return self.__columns[name]
+        return restore_prices(self.__columns[name])
+
+    def __atr(self):
+        """
+        Average true range in float64, see __dmi64.
+        """
+        if 'atr' not in self.__cache:
+            high, low = self.__prices64('high'), self.__prices64('low')
+            prev_close = np.full(self.shape, np.nan)
+            prev_close[:, 1:] = self.__prices64('close')[:, :-1]
+            tr = np.max(np.stack([high - low, np.abs(high - prev_close), np.abs(low - prev_close)]), axis=0)
+            self.__cache['atr'] = ewm_mean(tr, 1.0 / DMI_WINDOW)[0]
+        return self.__cache['atr']
+
+    def get_ohlcv(self):
+        """
+        :return: Dict of OHLCV column to 2-D array (instruments x time), NaN at missing bars.
+        """
+        return {c: self.__expand(self.__columns[c]) for c in OHLCV}
+
+    def get_indicators(self, *args, to_percentage=True):
+        """
+        Get set of indicators for every instrument.
+        :param args: indicator strings ==> https://pypi.org/project/stockstats/
+        :param to_percentage: divide by 100 (vwap is left as is, like TechnicalAnalysisV2)
+        :return: Dict of indicator name to 2-D array (instruments x time). Unsupported names are skipped.
+        """
+        indicators = {}
+        for arg in args:
+            try:
+                value = self.__expand(self.__column(arg))
+            except KeyError:
+                continue
+            if to_percentage and arg != 'vwap':
+                value = value / 100
+            indicators[arg] = value
+        return indicators
+
+    def get_candle_ratios(self, to_percentage=True):
+        """
+        Ratios of candle body and wicks, same definitions as TechnicalAnalysisV2.get_candle_ratios.
+        :param to_percentage: divide by 100
+        :return: Dict of r1..r6 and t, each a 2-D array (instruments x time).
+        """
+        c = self.__column
+        open_, high, low, close = c('open'), c('high'), c('low'), c('close')
+        green = close > open_
+        candle = np.abs(open_ - close)
+        total = high - low
+        upper_wick = np.where(green, np.abs(high - close), np.abs(high - open_))
+        lower_wick = np.where(green, np.abs(low - open_), np.abs(low - close))
+        scale = 100 if to_percentage else 1
+        ratios = {
+            'r1': candle / (total + 0.1) / scale,
+            'r2': upper_wick / (total + 0.1) / scale,
+            'r3': lower_wick / (total + 0.1) / scale,
+            'r4': upper_wick / (lower_wick + 0.1) / scale,
+            'r5': upper_wick / (candle + 0.1) / scale,
+            'r6': lower_wick / (candle + 0.1) / scale,
+            't': green.astype(self.dtype),
+        }
+        return {k: self.__expand(v) for k, v in ratios.items()}
+
+    def get_trend(self, smal=30, smah=60, longsma=120, ltp=None):
+        """
+        Trend rule of Kite.get_trend_and_input_features evaluated at every bar.
+        :param smal: Lower simple moving average
+        :param smah: Higher simple moving average
+        :param longsma: long term sma for trend
+        :param ltp: Optional last traded price per instrument, used for the latest bar instead of its close.
+        :return: int8 array (instruments x time). TREND_LONG, TREND_SHORT or TREND_NONE.
+        """
+        assert longsma > smah > smal
+        c = self.__column
+        price = self.__expand(c('close'))
+        if ltp is not None:
+            last = self.last_index()
+            rows = np.arange(self.shape[0])[last >= 0]
+            price[rows, last[last >= 0]] = np.asarray(ltp, dtype=np.float64)[last >= 0]
+        low = self.__expand(c('close_{}_sma'.format(smal)))
+        high = self.__expand(c('close_{}_sma'.format(smah)))
+        long_ = self.__expand(c('close_{}_sma'.format(longsma)))
+        pdi, mdi = self.__expand(c('pdi')), self.__expand(c('mdi'))
+        adx = self.__expand(c('adx'))
+        with np.errstate(invalid='ignore'):
+            strong = adx >= 25
+            up = strong & (price > long_) & (price > low) & (low > high) & (pdi > mdi)
+            down = strong & (price < long_) & (price < low) & (low < high) & (pdi < mdi)
+        trend = np.zeros(self.shape, dtype=np.int8)
+        trend[up] = TREND_LONG
+        trend[down] = TREND_SHORT
+        return trend
+
+    def last_index(self):
+        """
+        :return: Column index of the latest available bar per instrument, -1 if the instrument has no bars.
+        """
+        available = ~self.missing
+        last = self.shape[1] - 1 - np.argmax(available[:, ::-1], axis=1)
+        return np.where(available.any(axis=1), last, -1)
+
+    def latest(self, values):
+        """
+        Latest available value per instrument.
+        :param values: Dict of name to 2-D array, as returned by get_indicators or get_candle_ratios.
+        :return: Dict of name to 1-D array (one value per instrument).
+        """
+        last = self.last_index()
+        rows = np.arange(self.shape[0])
+        latest = {}
+        for name, value in values.items():
+            v = value[rows, np.maximum(last, 0)].astype(np.float64)
+            v[last < 0] = np.nan
+            latest[name] = v
+        return latest
@@ -0,0 +1,287 @@
+import argparse
+import concurrent.futures as concurrent
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+from .metrics import registry
+from .orders import is_transient
+from .planner import split_range
+from .ratelimit import KITE_RATE_LIMITS, RateLimiter
+from .scheduler import exchange_now
+from .sessions import INTERVAL_MINUTES
+from .store import HistoryStore
+
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+
+# Seconds between progress log lines.
+PROGRESS_INTERVAL = 30
+
+
+def chunk_key(instrument_token, interval, start, end):
+    return '{}|{}|{}|{}'.format(instrument_token, interval, start.isoformat(), end.isoformat())
+
+
+def plan_chunks(instrument_tokens, intervals, from_date, to_date, calendar=None):
+    """
+    Requests needed to download a range for several instruments and intervals.
+    Chunk edges only depend on from_date and the interval, so a rerun with a later to_date plans the same chunks
+    plus new ones at the end.
+    :return: List of (instrument_token, interval, from, to).
+    """
+    chunks = []
+    for interval in intervals:
+        ranges = split_range(from_date, to_date, interval, calendar=calendar)
+        for instrument_token in instrument_tokens:
+            chunks.extend((instrument_token, interval, start, end) for start, end in ranges)
+    return chunks
+
+
+class Checkpoint:
+    """
+    Append only record of downloaded chunks, one JSON line per chunk, flushed to disk as each chunk finishes.
+    A line cut short by a crash is ignored on load.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Checkpoint file. Created if missing.
+        """
+        self.path = path
+        self.__done = set()
+        self.__lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as fp:
+                for line in fp:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.__done.add(entry['key'])
+        self.__file = open(path, 'a')
+
+    def __len__(self):
+        return len(self.__done)
+
+    def __contains__(self, key):
+        return key in self.__done
+
+    def add(self, key, candles):
+        """
+        Record a finished chunk.
+        :param key: chunk_key of the chunk.
+        :param candles: Number of candles received.
+        """
+        line = json.dumps({'key': key, 'candles': candles, 'at': datetime.datetime.now().isoformat()})
+        with self.__lock:
+            self.__file.write(line + '\n')
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__done.add(key)
+
+    def close(self):
+        self.__file.close()
+
+
+class BulkDownloader:
+    """
+    Backfills historical candles of many instruments into a HistoryStore.
+    The range is split into the requests Kite allows per interval and the requests run concurrently under the
+    historical rate limit. Transient errors are retried with backoff. Finished chunks are written to the store and
+    the checkpoint, so an interrupted run continues where it stopped. Chunks that still fail are reported and
+    retried on the next run.
+
+    Usage:
+        downloader = BulkDownloader(kite, HistoryStore('history'))
+        summary = downloader.run([256265, 260105], ['minute', 'day'], from_date=datetime.datetime(2020, 1, 1))
+    """
+
+    def __init__(self, kite, store, checkpoint=None, workers=3, rate=KITE_RATE_LIMITS['historical'], retries=5,
+                 backoff=1.0, oi=False, metrics=None):
+        """
+        :param kite: Kite instance.
+        :param store: HistoryStore to write into.
+        :param checkpoint: Checkpoint file. Defaults to checkpoint.jsonl in the store.
+        :param workers: Requests in flight at once.
+        :param rate: Historical requests per second.
+        :param retries: Retries of a chunk after a transient error.
+        :param backoff: Seconds to wait before the first retry, doubled after each retry.
+        :param oi: Fetch open interest too.
+        :param metrics: MetricsRegistry to record into. Defaults to the Kite instance's.
+        """
+        self.kite = kite
+        self.store = store
+        self.checkpoint = Checkpoint(checkpoint or os.path.join(store.root, CHECKPOINT_FILE))
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.oi = oi
+        self.metrics = metrics or getattr(kite, 'metrics', None) or registry
+        self.__limiter = RateLimiter(rate)
+        self.__stop = threading.Event()
+
+    def run(self, instrument_tokens, intervals, from_date, to_date=None):
+        """
+        Download every chunk of the range that is not in the checkpoint yet.
+        :param instrument_tokens: Instruments to download.
+        :param intervals: Candle intervals.
+        :param from_date: Start of the range (datetime). Keep it the same when resuming.
+        :param to_date: End of the range. Defaults to now, in exchange time like the chunk edges.
+        :return: Dict {planned, skipped, done, candles, failed: [(chunk, error)], interrupted}
+        """
+        for interval in intervals:
+            assert interval in INTERVAL_MINUTES, 'Invalid interval: {}'.format(interval)
+        to_date = to_date or exchange_now()
+        chunks = plan_chunks(instrument_tokens, intervals, from_date, to_date, calendar=self.kite.calendar)
+        pending = [c for c in chunks if chunk_key(*c) not in self.checkpoint]
+        summary = {'planned': len(chunks), 'skipped': len(chunks) - len(pending), 'done': 0, 'candles': 0,
+                   'failed': [], 'interrupted': False}
+        logging.info('%d chunks planned, %d already downloaded', len(chunks), summary['skipped'])
+        self.__stop.clear()
+        start = last_log = time.monotonic()
+        queue = iter(pending)
+        running = {}
+        with concurrent.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='backfill') as E:
+            try:
+                while True:
+                    # Keep a bounded number of chunks queued, a full universe plans many thousands.
+                    while len(running) < 2 * self.workers and not self.__stop.is_set():
+                        chunk = next(queue, None)
+                        if chunk is None:
+                            break
+                        running[E.submit(self.__download, chunk)] = chunk
+                    if not running:
+                        break
+                    finished, _ = concurrent.wait(list(running), return_when=concurrent.FIRST_COMPLETED)
+                    for future in finished:
+                        self.__collect(running.pop(future), future, summary)
+                    if time.monotonic() - last_log > PROGRESS_INTERVAL:
+                        last_log = time.monotonic()
+                        self.__progress(summary, len(pending), last_log - start)
+            except KeyboardInterrupt:
+                logging.warning('Interrupted, finishing chunks in flight')
+                summary['interrupted'] = True
+                self.__stop.set()
+                for future in concurrent.as_completed(list(running)):
+                    self.__collect(running.pop(future), future, summary)
+        self.__progress(summary, len(pending), time.monotonic() - start)
+        return summary
+
+    def stop(self):
+        """
+        Stop after the chunks in flight. Call from another thread.
+        """
+        self.__stop.set()
+
+    def __collect(self, chunk, future, summary):
+        try:
+            candles = future.result()
+        except Exception as e:
+            logging.warning('Chunk %s failed: %s', chunk_key(*chunk), e)
+            summary['failed'].append((chunk, e))
+            return
+        if candles is not None:
+            summary['done'] += 1
+            summary['candles'] += candles
+
+    def __progress(self, summary, pending, elapsed):
+        finished = summary['done'] + len(summary['failed'])
+        rate = finished / elapsed if elapsed > 0 else 0
+        remaining = (pending - finished) / rate if rate else float('nan')
+        logging.info('%d/%d chunks, %d failed, %d candles, %.1f chunks/s, about %.0f s left', finished, pending,
+                     len(summary['failed']), summary['candles'], rate, remaining)
+
+    def __download(self, chunk):
+        """
+        Fetch and store one chunk.
+        :return: Number of candles, or None if stopped before fetching.
+        """
+        instrument_token, interval, start, end = chunk
+        error = None
+        for attempt in range(self.retries + 1):
+            if self.__stop.is_set():
+                return None
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                self.metrics.inc('kite_bulk_retries_total', interval=interval)
+            self.__limiter.acquire()
+            try:
+                candles = self.kite.session.historical_data(instrument_token, from_date=start, to_date=end,
+                                                            interval=interval, oi=self.oi)
+            except Exception as e:
+                if not is_transient(e):
+                    self.metrics.inc('kite_bulk_chunks_total', interval=interval, status='failed')
+                    raise
+                error = e
+                continue
+            fetched = exchange_now()
+            self.store.write_chunk(instrument_token, interval, start, end, candles)
+            # A chunk whose last candle may still be forming is stored but fetched again next run.
+            if end + datetime.timedelta(minutes=INTERVAL_MINUTES[interval]) <= fetched:
+                self.checkpoint.add(chunk_key(*chunk), len(candles))
+            self.metrics.inc('kite_bulk_chunks_total', interval=interval, status='done')
+            self.metrics.inc('kite_candles_fetched_total', len(candles), interval=interval)
+            return len(candles)
+        self.metrics.inc('kite_bulk_chunks_total', interval=interval, status='failed')
+        raise error
+
+    def close(self):
+        self.checkpoint.close()
+
+
+def _parse_date(value):
+    return datetime.datetime.fromisoformat(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backfill Kite historical candles into a local store. '
+                                                 'Rerun the same command to resume.')
+    parser.add_argument('--store', default='history', help='Store directory.')
+    parser.add_argument('--tokens', type=int, nargs='*', default=[], help='Instrument tokens.')
+    parser.add_argument('--tokens-file', help='File of instrument tokens, one per line.')
+    parser.add_argument('--exchange', help='All instruments of an exchange. Eg: NSE')
+    parser.add_argument('--segment', help='Only instruments of a segment, with --exchange. Eg: NSE')
+    parser.add_argument('--intervals', nargs='+', default=['minute'])
+    parser.add_argument('--from', dest='from_date', type=_parse_date, required=True, help='Eg: 2020-01-01')
+    parser.add_argument('--to', dest='to_date', type=_parse_date, help='Defaults to now.')
+    parser.add_argument('--checkpoint', help='Checkpoint file. Defaults to checkpoint.jsonl in the store.')
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('--oi', action='store_true', help='Fetch open interest.')
+    parser.add_argument('--root', help='API root URL. Eg: a FakeKiteServer.')
+    args = parser.parse_args(argv)
+    # kite.py configures DEBUG logging on import, keep the progress readable.
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s', force=True)
+
+    from .kite import Kite
+    from .v2 import load_secrets
+    secrets = load_secrets()
+    kite = Kite(secrets['api_key'], secrets['api_secret'], secrets['redirect_url'], root=args.root)
+    tokens = list(args.tokens)
+    if args.tokens_file:
+        with open(args.tokens_file) as fp:
+            tokens.extend(int(line) for line in fp if line.strip())
+    if args.exchange:
+        tokens.extend(i['instrument_token'] for i in kite.session.instruments(args.exchange)
+                      if not args.segment or i['segment'] == args.segment)
+    if not tokens:
+        parser.error('No instruments. Use --tokens, --tokens-file or --exchange.')
+
+    downloader = BulkDownloader(kite, HistoryStore(args.store), checkpoint=args.checkpoint, workers=args.workers,
+                                retries=args.retries, oi=args.oi)
+    try:
+        summary = downloader.run(tokens, args.intervals, args.from_date, args.to_date)
+    finally:
+        downloader.close()
+    for chunk, error in summary['failed']:
+        print('Failed:', chunk_key(*chunk), error)
+    print('Downloaded {done} chunks ({candles} candles), skipped {skipped} done earlier, {failed} failed.'.format(
+        done=summary['done'], candles=summary['candles'], skipped=summary['skipped'], failed=len(summary['failed'])))
+    return 1 if summary['failed'] or summary['interrupted'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+import concurrent.futures as concurrent
+import os
+import threading
+import time
+
+from .frame import CandleFrame
+from .historical import arrays_to_frame, frame_to_arrays
+from .metrics import registry
+
+# inline runs analysis on the calling thread, thread on a shared thread pool and process on a pool of worker
+# processes. Indicator code holds the GIL, so only process runs the analysis of several instruments in parallel.
+COMPUTE_BACKENDS = ['inline', 'thread', 'process']
+
+_local = threading.local()
+
+
+def _analysis():
+    """
+    TechnicalAnalysisV2 of the current thread, so threads do not share one instance.
+    """
+    analysis = getattr(_local, 'analysis', None)
+    if analysis is None:
+        from .v2 import TechnicalAnalysisV2
+        analysis = _local.analysis = TechnicalAnalysisV2()
+    return analysis
+
+
+def _warm_up():
+    """
+    Process pool initializer: import pandas, stockstats and the analysis code once per worker.
+    """
+    _analysis()
+
+
+def latest_features(data, indicators=(), tail=True, candle_ratios=False):
+    """
+    Latest indicator values (and candle ratios) of a set of candles. Runs in any backend.
+    :param data: Decoded arrays (see historical.decode_candles) or CandleFrame.
+    :param indicators: indicator strings ==> https://pypi.org/project/stockstats/
+    :param tail: Compute only the trailing window each indicator needs. False computes the full series.
+    :param candle_ratios: Add the ratios of the latest candle.
+    :return: Dict of latest values.
+    """
+    analysis = _analysis()
+    candles = data if isinstance(data, CandleFrame) else arrays_to_frame(data)
+    if not indicators:
+        values = {}
+    elif tail:
+        values = analysis.get_latest_indicators(*indicators, data=candles)
+    else:
+        series = analysis.get_indicators(*indicators, data=candles)
+        values = {indicator: value[-1] for indicator, value in series.items()}
+    if candle_ratios:
+        values.update(analysis.get_latest_candle_ratios(data=candles))
+    return values
+
+
+class ComputeBackend:
+    """
+    Where Kite runs CPU bound analysis. Workers are created on first use and kept until shutdown.
+    Candles are passed to worker processes as a few numpy arrays, which pickle as raw buffers, instead of a list
+    of dicts and datetimes.
+
+    Usage:
+        kite = Kite(api_key, api_secret, redirect_url, compute=ComputeBackend('process'))
+        # Many threads (Eg: CandleScheduler workers) can now analyse instruments on all cores.
+    """
+
+    def __init__(self, kind='inline', workers=None, metrics=None):
+        """
+        :param kind: inline, thread or process. See COMPUTE_BACKENDS.
+        :param workers: Pool size. Defaults to the number of CPUs.
+        :param metrics: MetricsRegistry to record into. Defaults to the process wide registry.
+        """
+        assert kind in COMPUTE_BACKENDS
+        self.kind = kind
+        self.workers = workers or os.cpu_count()
+        self.metrics = metrics or registry
+        self.__executor = None
+        self.__lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def __pool(self):
+        with self.__lock:
+            if self.__executor is None:
+                if self.kind == 'process':
+                    self.__executor = concurrent.ProcessPoolExecutor(max_workers=self.workers,
+                                                                     initializer=_warm_up)
+                else:
+                    self.__executor = concurrent.ThreadPoolExecutor(max_workers=self.workers,
+                                                                    thread_name_prefix='compute')
+            return self.__executor
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Run a function on the backend. In the process backend fn and its arguments must be picklable.
+        :return: Future.
+        """
+        start = time.perf_counter()
+        if self.kind == 'inline':
+            future = concurrent.Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = self.__pool().submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self.metrics.observe('kite_compute_seconds', time.perf_counter() - start,
+                                                                backend=self.kind))
+        return future
+
+    def latest_features(self, data, *indicators, tail=True, candle_ratios=False):
+        """
+        Future of latest_features on the backend.
+        :param data: Decoded arrays, CandleFrame, DataFrame or list of candles.
+        """
+        if self.kind == 'process':
+            if not isinstance(data, dict):
+                data = frame_to_arrays(data)
+        elif not isinstance(data, CandleFrame):
+            data = arrays_to_frame(data) if isinstance(data, dict) else CandleFrame(data)
+        return self.submit(latest_features, data, indicators, tail=tail, candle_ratios=candle_ratios)
+
+    def shutdown(self, wait=True):
+        with self.__lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=wait)
+                self.__executor = None
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Chart types drawn from OHLC bars, which can be aggregated into coarser bars.
+OHLC_TYPES = ['candle', 'ohlc', 'bars', 'hollow_and_filled', 'hollow']
+
+
+def to_plot_frame(data):
+    """
+    Candles indexed by a DatetimeIndex, as mplfinance expects. data itself is left unchanged.
+    :param data: DataFrame with a date column or index.
+    """
+    if 'date' in data.columns:
+        data = data.set_index('date')
+    if not isinstance(data.index, pd.DatetimeIndex):
+        data = data.set_axis(pd.DatetimeIndex(data.index), axis=0)
+    return data
+
+
+def bucket_starts(length, buckets):
+    """
+    First row of each of `buckets` nearly equal groups of consecutive rows.
+    """
+    return np.unique(np.linspace(0, length, min(buckets, length) + 1).astype(np.int64)[:-1])
+
+
+def downsample_ohlc(data, max_points):
+    """
+    Aggregate consecutive candles into at most max_points candles: first open, highest high, lowest low, last close
+    and total volume, dated at the first candle. Extremes are never lost, so the chart keeps its range.
+    :param data: DataFrame of open, high, low, close (volume) indexed by date.
+    :param max_points: Number of candles to keep.
+    :return: (DataFrame, ends). ends holds the row of data each new candle closes on.
+    """
+    starts = bucket_starts(len(data), max_points)
+    ends = np.r_[starts[1:], len(data)] - 1
+    columns = {
+        'open': data['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(data['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(data['low'].to_numpy(), starts),
+        'close': data['close'].to_numpy()[ends],
+    }
+    if 'volume' in data:
+        columns['volume'] = np.add.reduceat(data['volume'].to_numpy(), starts)
+    return pd.DataFrame(columns, index=data.index[starts]), ends
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of the points that best keep the visual shape of a line.
+    :param x: 1-D array of x values, increasing.
+    :param y: 1-D array of y values.
+    :param threshold: Number of points to keep.
+    :return: int array of indices, including the first and last point.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    length = len(y)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+    # The first and last point are kept, the rest is split into threshold - 2 buckets.
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+            next_x, next_y = x[next_start:next_end].mean(), np.nanmean(y[next_start:next_end])
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) -
+                      (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_line(data, max_points, column='close'):
+    """
+    Keep the LTTB points of one column. Volume is summed over the candles up to the next kept point.
+    :return: (DataFrame, rows). rows holds the kept rows of data.
+    """
+    rows = lttb(np.arange(len(data)), data[column].to_numpy(), max_points)
+    sampled = data.iloc[rows].copy()
+    if 'volume' in data:
+        sampled['volume'] = np.add.reduceat(data['volume'].to_numpy(), rows)
+    return sampled, rows
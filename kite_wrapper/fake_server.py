@@ -0,0 +1,625 @@
+import argparse
+import csv
+import datetime
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from .ratelimit import KITE_RATE_LIMITS, RateLimiter, endpoint_category
+from .sessions import ExchangeCalendar, INTERVAL_MINUTES, SESSION_MINUTES, SESSION_OPEN
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S+0530'
+
+INSTRUMENT_FIELDS = ['instrument_token', 'exchange_token', 'tradingsymbol', 'name', 'last_price', 'expiry',
+                     'strike', 'tick_size', 'lot_size', 'instrument_type', 'segment', 'exchange']
+
+
+class LatencyModel:
+    """
+    Random response delay in seconds. Seeded, so a run can be replayed.
+    """
+
+    def __init__(self, sampler, seed=0):
+        self.__sampler = sampler
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+
+    def sample(self):
+        with self.__lock:
+            return max(0.0, self.__sampler(self.__random))
+
+    @classmethod
+    def constant(cls, seconds):
+        return cls(lambda r: seconds)
+
+    @classmethod
+    def uniform(cls, low, high, seed=0):
+        return cls(lambda r: r.uniform(low, high), seed)
+
+    @classmethod
+    def normal(cls, mean, std, seed=0):
+        return cls(lambda r: r.gauss(mean, std), seed)
+
+    @classmethod
+    def lognormal(cls, median, sigma, seed=0):
+        """
+        Heavy tailed latency, the usual shape of API response times.
+        :param median: Median delay in seconds.
+        :param sigma: Shape parameter. 0.5 gives p99 of roughly 3x the median.
+        """
+        mu = np.log(median)
+        return cls(lambda r: r.lognormvariate(mu, sigma), seed)
+
+    @classmethod
+    def parse(cls, spec, seed=0):
+        """
+        Build a model from a string. Eg: constant:0.05, uniform:0.01:0.1, normal:0.05:0.01, lognormal:0.05:0.5
+        """
+        kind, *params = spec.split(':')
+        params = [float(p) for p in params]
+        if kind == 'constant':
+            return cls.constant(*params)
+        return getattr(cls, kind)(*params, seed=seed)
+
+
+class SyntheticMarket:
+    """
+    Deterministic price generator. A candle depends only on (seed, instrument token, timestamp), so overlapping
+    requests and different intervals always agree with each other.
+    """
+
+    def __init__(self, seed=0, calendar=None):
+        self.seed = seed
+        self.calendar = calendar or ExchangeCalendar()
+
+    def __params(self, instrument_token):
+        r = random.Random(self.seed * 1000003 + int(instrument_token))
+        base = r.uniform(100, 3000)
+        waves = [(r.uniform(0.01, 0.05), r.uniform(3000, 20000), r.uniform(0, 2 * np.pi)),
+                 (r.uniform(0.005, 0.02), r.uniform(300, 2000), r.uniform(0, 2 * np.pi)),
+                 (r.uniform(0.001, 0.005), r.uniform(20, 120), r.uniform(0, 2 * np.pi))]
+        return base, waves, r.uniform(0, 1000)
+
+    @staticmethod
+    def __noise(t, key):
+        return np.modf(np.abs(np.sin(t * 12.9898 + key) * 43758.5453))[0]
+
+    def price(self, instrument_token, minutes):
+        """
+        Price at the start of the given minutes.
+        :param instrument_token: Instrument token.
+        :param minutes: Array of minutes since epoch (exchange local time).
+        :return: Array of prices
+        """
+        base, waves, key = self.__params(instrument_token)
+        t = np.asarray(minutes, dtype=np.float64)
+        log_price = 0.001 * (self.__noise(t, key) - 0.5)
+        for amplitude, period, phase in waves:
+            log_price = log_price + amplitude * np.sin(2 * np.pi * t / period + phase)
+        return base * np.exp(log_price)
+
+    def minute_candles(self, instrument_token, days):
+        """
+        Minute candles for whole sessions.
+        :return: Tuple of (session start minutes, open, high, low, close, volume) each shaped (days, 375)
+        """
+        epoch = datetime.datetime(1970, 1, 1)
+        starts = np.array([(datetime.datetime.combine(d, SESSION_OPEN) - epoch).total_seconds() // 60 for d in days],
+                          dtype=np.int64)
+        minutes = starts[:, None] + np.arange(SESSION_MINUTES)[None, :]
+        open_ = self.price(instrument_token, minutes)
+        close = self.price(instrument_token, minutes + 1)
+        _, _, key = self.__params(instrument_token)
+        high = np.maximum(open_, close) * (1 + 0.0005 * self.__noise(minutes, key + 1))
+        low = np.minimum(open_, close) * (1 - 0.0005 * self.__noise(minutes, key + 2))
+        volume = np.floor(100 + 5000 * self.__noise(minutes, key + 3))
+        ticks = [np.round(x * 20) / 20 for x in (open_, high, low, close)]
+        return (starts,) + tuple(ticks) + (volume,)
+
+    def candles(self, instrument_token, interval, from_datetime, to_datetime, oi=False):
+        """
+        Candles in the raw Kite historical format, [timestamp, open, high, low, close, volume(, oi)].
+        Only minutes up to to_datetime are used, so the last candle is the forming one and no candle holds prices
+        from after the range. Day and week candles are selected by date and a bare date (midnight) as to_datetime
+        covers the whole day, like Kite.
+        """
+        days = self.calendar.trading_days(from_datetime.date(), to_datetime.date())
+        if not days:
+            return []
+        starts, open_, high, low, close, volume = self.minute_candles(instrument_token, days)
+        until = to_datetime
+        if interval in ['day', 'week'] and to_datetime.time() == datetime.time():
+            until = datetime.datetime.combine(to_datetime.date(), datetime.time.max)
+        epoch = datetime.datetime(1970, 1, 1)
+        minutes = starts[:, None] + np.arange(SESSION_MINUTES)[None, :]
+        # Minutes of each session up to `until`. Minutes are increasing, so they are a prefix of the session.
+        limits = (minutes <= (until - epoch).total_seconds() // 60).sum(axis=1)
+        step = INTERVAL_MINUTES[interval]
+        rows = []
+        if interval in ['day', 'week']:
+            groups = [[i] for i in range(len(days)) if limits[i]]
+            if interval == 'week':
+                groups = {}
+                for i, d in enumerate(days):
+                    if limits[i]:
+                        groups.setdefault(d.isocalendar()[:2], []).append(i)
+                groups = list(groups.values())
+            for group in groups:
+                first = days[group[0]]
+                stamp = datetime.datetime.combine(first - datetime.timedelta(days=first.weekday())
+                                                  if interval == 'week' else first, datetime.time())
+                if not from_datetime.date() <= stamp.date() <= to_datetime.date():
+                    continue
+                last = group[-1]
+                rows.append((stamp, open_[group[0], 0],
+                             max(high[i, :limits[i]].max() for i in group),
+                             min(low[i, :limits[i]].min() for i in group),
+                             close[last, limits[last] - 1],
+                             sum(volume[i, :limits[i]].sum() for i in group)))
+        else:
+            valid = np.arange(SESSION_MINUTES)[None, :] < limits[:, None]
+            edges = np.arange(0, SESSION_MINUTES, step)
+            o = open_[:, edges]
+            h = np.maximum.reduceat(np.where(valid, high, -np.inf), edges, axis=1)
+            l_ = np.minimum.reduceat(np.where(valid, low, np.inf), edges, axis=1)
+            ends = np.minimum(np.append(edges[1:], SESSION_MINUTES)[None, :], limits[:, None]) - 1
+            c = np.take_along_axis(close, np.maximum(ends, 0), axis=1)
+            v = np.add.reduceat(np.where(valid, volume, 0), edges, axis=1)
+            for i, d in enumerate(days):
+                session = datetime.datetime.combine(d, SESSION_OPEN)
+                for j, e in enumerate(edges):
+                    stamp = session + datetime.timedelta(minutes=int(e))
+                    if e < limits[i] and from_datetime <= stamp <= to_datetime:
+                        rows.append((stamp, o[i, j], h[i, j], l_[i, j], c[i, j], v[i, j]))
+        candles = []
+        for stamp, o, h, l_, c, v in rows:
+            candle = [stamp.strftime(TIMESTAMP_FORMAT), float(o), float(h), float(l_), float(c), int(v)]
+            if oi:
+                candle.append(0)
+            candles.append(candle)
+        return candles
+
+
+class FakeKiteServer:
+    """
+    Local stand-in for the Kite Connect REST API, for load testing and offline checks of retry and concurrency
+    behaviour. Serves historical data, ltp/ohlc/quote, instruments, profile, an in-memory order book and the
+    positions and margins that follow from it.
+
+    Usage:
+        with FakeKiteServer(latency=LatencyModel.lognormal(0.05, 0.5)) as server:
+            kite = Kite(api_key, api_secret, redirect_url, root=server.url)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, instruments=None, recorded=None, seed=0, calendar=None,
+                 latency=None, rate_limits=KITE_RATE_LIMITS, error_rate=0.0):
+        """
+        :param host: Interface to bind.
+        :param port: Port to bind. 0 picks a free port.
+        :param instruments: List of instrument dicts. Defaults to 50 synthetic NSE equities.
+        :param recorded: Recorded candles, {instrument_token: {interval: [raw candles]}} or path of a JSON file of
+        the same shape. Served instead of synthetic data for the tokens present.
+        :param seed: Seed for synthetic prices, latency and error injection.
+        :param calendar: ExchangeCalendar for synthetic sessions. Defaults to NSE sessions and holidays.
+        :param latency: LatencyModel, or dict of rate limit category (quote, historical, orders, default) to
+        LatencyModel.
+        :param rate_limits: Requests per second by category. Requests over the limit get HTTP 429. None disables.
+        :param error_rate: Probability of a 500 response, or dict of category to probability.
+        """
+        self.market = SyntheticMarket(seed=seed, calendar=calendar)
+        self.instruments = instruments or self.__synthetic_instruments()
+        self.recorded = self.__load_recorded(recorded)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.limiters = {k: RateLimiter(v) for k, v in rate_limits.items()} if rate_limits else {}
+        self.stats = {}
+        self.orders = []
+        self.__random = random.Random(seed)
+        self.__injected = {}
+        self.__lost = {}
+        self.__lock = threading.Lock()
+        self.__httpd = ThreadingHTTPServer((host, port), self.__handler())
+        self.__httpd.daemon_threads = True
+        self.__thread = None
+
+    @staticmethod
+    def __synthetic_instruments(count=50):
+        return [{
+            'instrument_token': 100000 + i,
+            'exchange_token': 400 + i,
+            'tradingsymbol': 'FAKE' + str(i),
+            'name': 'FAKE INSTRUMENT ' + str(i),
+            'last_price': 0.0,
+            'expiry': '',
+            'strike': 0.0,
+            'tick_size': 0.05,
+            'lot_size': 1,
+            'instrument_type': 'EQ',
+            'segment': 'NSE',
+            'exchange': 'NSE',
+        } for i in range(count)]
+
+    @staticmethod
+    def __load_recorded(recorded):
+        if recorded is None:
+            return {}
+        if isinstance(recorded, str):
+            with open(recorded, 'r') as fp:
+                recorded = json.load(fp)
+        data = {}
+        for token, intervals in recorded.items():
+            for interval, candles in intervals.items():
+                rows = []
+                for c in candles:
+                    if isinstance(c, dict):
+                        c = [c['date'], c['open'], c['high'], c['low'], c['close'], c['volume']] + \
+                            ([c['oi']] if 'oi' in c else [])
+                    if isinstance(c[0], datetime.datetime):
+                        c = [c[0].strftime(TIMESTAMP_FORMAT)] + list(c[1:])
+                    rows.append(c)
+                data[(int(token), interval)] = rows
+        return data
+
+    @property
+    def url(self):
+        host, port = self.__httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__httpd.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__httpd.shutdown()
+        self.__httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def inject_errors(self, category='default', count=1, status=503, error_type='NetworkException'):
+        """
+        Fail the next `count` requests of a category with the given status.
+        """
+        with self.__lock:
+            self.__injected.setdefault(category, []).extend([(status, error_type)] * count)
+
+    def lose_responses(self, category='orders', count=1):
+        """
+        Process the next `count` requests of a category but answer them with a 504, like a gateway timeout after
+        the request already reached the exchange.
+        """
+        with self.__lock:
+            self.__lost[category] = self.__lost.get(category, 0) + count
+
+    def lost(self, path, method='POST'):
+        """
+        :return: Boolean. True if the response to this processed request should be replaced by a timeout.
+        """
+        category = endpoint_category(path, method)
+        with self.__lock:
+            lost = self.__lost.get(category, 0) > 0
+            if lost:
+                self.__lost[category] -= 1
+        if lost:
+            self.__count(category, 'errors')
+        return lost
+
+    def __count(self, category, key):
+        with self.__lock:
+            counts = self.stats.setdefault(category, {'requests': 0, 'throttled': 0, 'errors': 0})
+            counts[key] += 1
+
+    def __fault(self, category):
+        """
+        Decide whether a request fails. Returns (status, error_type, message) or None.
+        """
+        limiter = self.limiters.get(category)
+        if limiter and not limiter.try_acquire():
+            self.__count(category, 'throttled')
+            return 429, 'NetworkException', 'Too many requests'
+        with self.__lock:
+            if self.__injected.get(category):
+                status, error_type = self.__injected[category].pop(0)
+                return status, error_type, 'Injected error'
+            rate = self.error_rate.get(category, 0) if isinstance(self.error_rate, dict) else self.error_rate
+            failed = rate and self.__random.random() < rate
+        if failed:
+            return 500, 'GeneralException', 'Injected error'
+        return None
+
+    def admit(self, path, method='GET'):
+        """
+        Count, delay and throttle an incoming request.
+        :param path: URL path of the request.
+        :param method: HTTP method of the request.
+        :return: (status, error_type, message) if the request should fail, else None.
+        """
+        category = endpoint_category(path, method)
+        self.__count(category, 'requests')
+        self.__delay(category)
+        fault = self.__fault(category)
+        if fault and fault[0] != 429:
+            self.__count(category, 'errors')
+        return fault
+
+    def __delay(self, category):
+        model = self.latency.get(category) if isinstance(self.latency, dict) else self.latency
+        if model:
+            time.sleep(model.sample())
+
+    def __resolve(self, key):
+        """
+        Find an instrument by token or exchange:tradingsymbol.
+        """
+        for i in self.instruments:
+            if key == str(i['instrument_token']) or key == i['exchange'] + ':' + i['tradingsymbol']:
+                return i
+        return None
+
+    def __last_price(self, instrument_token):
+        epoch = datetime.datetime(1970, 1, 1)
+        minute = (datetime.datetime.now() - epoch).total_seconds() // 60
+        return float(np.round(self.market.price(instrument_token, minute) * 20) / 20)
+
+    def historical(self, instrument_token, interval, from_datetime, to_datetime, oi=False):
+        recorded = self.recorded.get((instrument_token, interval))
+        if recorded is None:
+            return self.market.candles(instrument_token, interval, from_datetime, to_datetime, oi=oi)
+        candles = []
+        for c in recorded:
+            stamp = datetime.datetime.strptime(c[0][:19], '%Y-%m-%dT%H:%M:%S')
+            if from_datetime <= stamp <= to_datetime or \
+                    (interval in ['day', 'week'] and from_datetime.date() <= stamp.date() <= to_datetime.date()):
+                candles.append(c if oi else c[:6])
+        return candles
+
+    def quotes(self, keys, mode):
+        data = {}
+        for key in keys:
+            instrument = self.__resolve(key)
+            if instrument is None:
+                continue
+            token = instrument['instrument_token']
+            last_price = self.__last_price(token)
+            quote = {'instrument_token': token, 'last_price': last_price}
+            if mode in ['ohlc', 'full']:
+                today = datetime.datetime.now()
+                day = self.market.candles(token, 'day', today, today)
+                o, h, l_, c = day[0][1:5] if day else (last_price,) * 4
+                quote['ohlc'] = {'open': o, 'high': max(h, last_price), 'low': min(l_, last_price), 'close': c}
+            if mode == 'full':
+                quote.update({
+                    'timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'last_quantity': 1,
+                    'volume': day[0][5] if day else 0,
+                    'net_change': 0,
+                    'depth': {'buy': [{'price': last_price - 0.05, 'quantity': 100, 'orders': 1}],
+                              'sell': [{'price': last_price + 0.05, 'quantity': 100, 'orders': 1}]},
+                })
+            data[key] = quote
+        return data
+
+    def instruments_csv(self, exchange=None):
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=INSTRUMENT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for i in self.instruments:
+            if exchange is None or i['exchange'] == exchange:
+                writer.writerow(i)
+        return out.getvalue()
+
+    def place_order(self, variety, params):
+        """
+        Add an order to the order book. Market orders complete at the last price, others stay open.
+        :return: The order dict.
+        """
+        instrument = self.__resolve(params.get('exchange', '') + ':' + params.get('tradingsymbol', ''))
+        last_price = self.__last_price(instrument['instrument_token']) if instrument else 0.0
+        market = params.get('order_type') == 'MARKET'
+        with self.__lock:
+            order = {
+                'order_id': str(250000000000000 + len(self.orders) + 1),
+                'variety': variety,
+                'status': 'COMPLETE' if market else 'OPEN',
+                'exchange': params.get('exchange'),
+                'tradingsymbol': params.get('tradingsymbol'),
+                'instrument_token': instrument['instrument_token'] if instrument else 0,
+                'transaction_type': params.get('transaction_type'),
+                'order_type': params.get('order_type'),
+                'product': params.get('product'),
+                'quantity': int(params.get('quantity', 0)),
+                'price': float(params.get('price') or 0),
+                'average_price': last_price if market else 0.0,
+                'filled_quantity': int(params.get('quantity', 0)) if market else 0,
+                'tag': params.get('tag'),
+                'tags': [params['tag']] if params.get('tag') else [],
+                'order_timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self.orders.append(order)
+        return order
+
+    def order_book(self):
+        with self.__lock:
+            return [dict(o) for o in self.orders]
+
+    def positions(self):
+        """
+        Net positions from completed orders, marked to the last price.
+        """
+        net = {}
+        for order in self.order_book():
+            if order['status'] != 'COMPLETE':
+                continue
+            key = (order['exchange'], order['tradingsymbol'], order['product'])
+            position = net.setdefault(key, {
+                'exchange': order['exchange'], 'tradingsymbol': order['tradingsymbol'],
+                'instrument_token': order['instrument_token'], 'product': order['product'],
+                'quantity': 0, 'buy_quantity': 0, 'sell_quantity': 0, 'buy_value': 0.0, 'sell_value': 0.0,
+            })
+            value = order['filled_quantity'] * order['average_price']
+            if order['transaction_type'] == 'BUY':
+                position['buy_quantity'] += order['filled_quantity']
+                position['buy_value'] += value
+            else:
+                position['sell_quantity'] += order['filled_quantity']
+                position['sell_value'] += value
+            position['quantity'] = position['buy_quantity'] - position['sell_quantity']
+        for position in net.values():
+            position['last_price'] = self.__last_price(position['instrument_token'])
+            position['pnl'] = position['sell_value'] - position['buy_value'] + \
+                position['quantity'] * position['last_price']
+        return {'net': list(net.values()), 'day': list(net.values())}
+
+    def margins(self):
+        used = sum(abs(p['quantity']) * p['last_price'] for p in self.positions()['net'])
+        cash = 1000000.0
+        return {
+            'equity': {'enabled': True, 'net': cash - used, 'available': {'cash': cash, 'live_balance': cash - used},
+                       'utilised': {'debits': used}},
+            'commodity': {'enabled': False, 'net': 0.0, 'available': {'cash': 0.0, 'live_balance': 0.0},
+                          'utilised': {'debits': 0.0}},
+        }
+
+    @staticmethod
+    def profile():
+        return {
+            'user_id': 'FK0001',
+            'user_name': 'Fake User',
+            'user_shortname': 'Fake',
+            'email': 'fake@example.com',
+            'user_type': 'individual',
+            'broker': 'ZERODHA',
+            'exchanges': ['NSE', 'BSE', 'NFO'],
+            'products': ['CNC', 'NRML', 'MIS'],
+            'order_types': ['MARKET', 'LIMIT', 'SL', 'SL-M'],
+        }
+
+    def __handler(self):
+        server = self
+
+        def parse_date(value):
+            for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d']:
+                try:
+                    return datetime.datetime.strptime(value, fmt)
+                except ValueError:
+                    continue
+            raise ValueError('invalid date ' + value)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def send(self, status, body, content_type='application/json'):
+                body = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_json(self, status, payload):
+                self.send(status, json.dumps(payload))
+
+            def send_error_json(self, status, error_type, message):
+                self.send_json(status, {'status': 'error', 'message': message, 'data': None,
+                                        'error_type': error_type})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                path = url.path.rstrip('/')
+                query = parse_qs(url.query)
+                fault = server.admit(path)
+                if fault:
+                    return self.send_error_json(*fault)
+                parts = path.strip('/').split('/')
+                try:
+                    if parts[:2] == ['instruments', 'historical'] and len(parts) == 4:
+                        token, interval = int(parts[2]), parts[3]
+                        if interval not in INTERVAL_MINUTES:
+                            return self.send_error_json(400, 'InputException', 'invalid interval')
+                        candles = server.historical(token, interval, parse_date(query['from'][0]),
+                                                    parse_date(query['to'][0]),
+                                                    oi=query.get('oi', ['0'])[0] == '1')
+                        return self.send_json(200, {'status': 'success', 'data': {'candles': candles}})
+                    if parts[0] == 'instruments' and len(parts) <= 2:
+                        return self.send(200, server.instruments_csv(parts[1] if len(parts) == 2 else None),
+                                         content_type='text/csv')
+                    if parts[0] == 'quote':
+                        mode = {1: 'full', 2: parts[-1]}.get(len(parts))
+                        if mode not in ['full', 'ohlc', 'ltp']:
+                            return self.send_error_json(404, 'GeneralException', 'Route not found')
+                        data = server.quotes(query.get('i', []), mode)
+                        return self.send_json(200, {'status': 'success', 'data': data})
+                    if parts == ['orders']:
+                        return self.send_json(200, {'status': 'success', 'data': server.order_book()})
+                    if parts == ['portfolio', 'positions']:
+                        return self.send_json(200, {'status': 'success', 'data': server.positions()})
+                    if parts == ['portfolio', 'holdings']:
+                        return self.send_json(200, {'status': 'success', 'data': []})
+                    if parts == ['user', 'margins']:
+                        return self.send_json(200, {'status': 'success', 'data': server.margins()})
+                    if parts == ['user', 'profile']:
+                        return self.send_json(200, {'status': 'success', 'data': server.profile()})
+                except (KeyError, ValueError) as e:
+                    return self.send_error_json(400, 'InputException', str(e))
+                return self.send_error_json(404, 'GeneralException', 'Route not found')
+
+            def do_POST(self):
+                path = urlparse(self.path).path.rstrip('/')
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+                fault = server.admit(path, 'POST')
+                if fault:
+                    return self.send_error_json(*fault)
+                parts = path.strip('/').split('/')
+                if parts[0] != 'orders' or len(parts) != 2:
+                    return self.send_error_json(404, 'GeneralException', 'Route not found')
+                params = {k: v[0] for k, v in parse_qs(body).items()}
+                for field in ['exchange', 'tradingsymbol', 'transaction_type', 'quantity', 'product', 'order_type']:
+                    if field not in params:
+                        return self.send_error_json(400, 'InputException', 'Missing ' + field)
+                order = server.place_order(parts[1], params)
+                if server.lost(path):
+                    return self.send_error_json(504, 'NetworkException', 'Gateway timed out')
+                return self.send_json(200, {'status': 'success', 'data': {'order_id': order['order_id']}})
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a local fake Kite Connect API server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--recorded', help='JSON file of recorded candles.')
+    parser.add_argument('--latency', help='Latency model. Eg: lognormal:0.05:0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--no-rate-limit', action='store_true')
+    args = parser.parse_args(argv)
+    server = FakeKiteServer(host=args.host, port=args.port, seed=args.seed, recorded=args.recorded,
+                            latency=LatencyModel.parse(args.latency, args.seed) if args.latency else None,
+                            rate_limits=None if args.no_rate_limit else KITE_RATE_LIMITS,
+                            error_rate=args.error_rate)
+    print('Fake Kite API listening on', server.url)
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
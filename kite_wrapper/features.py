@@ -0,0 +1,546 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .batch import ADX_WINDOW, DMI_WINDOW, KDJ_DECAY, KDJ_INITIAL, KDJ_WINDOW, OHLCV, decay_filter, diff, ewm_mean, \
+    rolling_extreme, rolling_mean
+from .historical import frame_to_arrays
+from .sessions import INTERVAL_MINUTES
+from .store import HistoryStore
+
+RATIOS = ['r1', 'r2', 'r3', 'r4', 'r5', 'r6', 't']
+
+# Feature files live under <root>/features, next to the interval directories of a HistoryStore in the same root.
+FEATURES_DIRECTORY = 'features'
+
+STATE_FILE = 'state.json'
+
+# Segment files per feature set before they are merged into one, which keeps range reads to a few files.
+MAX_SEGMENTS = 32
+
+
+def _canonical(name):
+    """
+    Indicator name with its default window spelled out, so kdjk and kdjk_9 share one state.
+    """
+    match = re.match(r'^(kdjk|kdjd|kdjj)(?:_(\d+))?$', name)
+    if match:
+        return '{}_{}'.format(match.group(1), match.group(2) or KDJ_WINDOW)
+    return name
+
+
+def context_bars(indicator):
+    """
+    Earlier candles an indicator reads, besides its carried state, to compute the next value.
+    :raises ValueError: If the indicator can not be computed incrementally.
+    """
+    name = _canonical(indicator)
+    match = re.match(r'^(open|high|low|close|volume)_(\d+)_(sma|ema|smma)$', name)
+    if match:
+        return int(match.group(2)) - 1 if match.group(3) == 'sma' else 0
+    match = re.match(r'^(?:wr|kdjk|kdjd|kdjj)_(\d+)$', name)
+    if match:
+        return int(match.group(1)) - 1
+    if re.match(r'^rsi_\d+$', name) or name in ['pdi', 'mdi', 'dx', 'adx', 'adxr']:
+        return 1
+    if name == 'vwap':
+        return 0
+    raise ValueError('Indicator not supported by the feature store: {}'.format(indicator))
+
+
+def is_incremental(indicator):
+    """
+    :return: Boolean. True if the feature store computes the indicator incrementally.
+    """
+    try:
+        context_bars(indicator)
+    except ValueError:
+        return False
+    return True
+
+
+def feature_key(indicators, candle_ratios=True):
+    """
+    Directory name of a feature set. The order of the indicators does not matter.
+    """
+    spec = json.dumps({'indicators': sorted(set(indicators)), 'candle_ratios': bool(candle_ratios)})
+    return hashlib.sha1(spec.encode()).hexdigest()[:16]
+
+
+class _Pass:
+    """
+    One update of IncrementalFeatures: the context candles followed by the new ones, as 1 x T arrays.
+    Moving window indicators run over all of it, recursive ones over the new candles only, from the carried state.
+    """
+
+    def __init__(self, context, arrays, filters):
+        self.offset = len(context['close'])
+        self.x = {c: np.concatenate([np.asarray(context[c], dtype=np.float64),
+                                     np.asarray(arrays[c], dtype=np.float64)])[None, :] for c in OHLCV}
+        self.filters = dict(filters)
+        self.cache = {}
+
+    def column(self, name):
+        if name in self.x:
+            return self.x[name]
+        if name not in self.cache:
+            self.cache[name] = self.__compute(name)
+        return self.cache[name]
+
+    def __recursive(self, values):
+        out = np.full(self.x['close'].shape, np.nan)
+        out[:, self.offset:] = values
+        return out
+
+    def __ewm(self, key, x, alpha):
+        state = self.filters.get(key)
+        if state is not None:
+            state = (np.array([state[0]]), np.array([state[1]]))
+        mean, (numerator, denominator) = ewm_mean(x[:, self.offset:], alpha, state)
+        self.filters[key] = [float(numerator[0]), float(denominator[0])]
+        return self.__recursive(mean)
+
+    def __decay(self, key, x, decay, initial):
+        state = np.array([self.filters.get(key, initial)], dtype=np.float64)
+        y, state = decay_filter(x[:, self.offset:], decay, state)
+        self.filters[key] = float(state[0])
+        return self.__recursive(y)
+
+    def __compute(self, name):
+        c = self.column
+        match = re.match(r'^(open|high|low|close|volume)_(\d+)_(sma|ema|smma)$', name)
+        if match:
+            column, window, kind = match.group(1), int(match.group(2)), match.group(3)
+            if kind == 'sma':
+                return rolling_mean(c(column), window)
+            return self.__ewm(name, c(column), 2.0 / (window + 1) if kind == 'ema' else 1.0 / window)
+        match = re.match(r'^rsi_(\d+)$', name)
+        if match:
+            window = int(match.group(1))
+            d = diff(c('close'))
+            gain = self.__ewm(name + ':gain', (d + np.abs(d)) / 2, 1.0 / window)
+            loss = self.__ewm(name + ':loss', (-d + np.abs(d)) / 2, 1.0 / window)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return 100 - 100 / (1.0 + gain / loss)
+        match = re.match(r'^wr_(\d+)$', name)
+        if match:
+            window = int(match.group(1))
+            hn = rolling_extreme(c('high'), window, np.fmax)
+            ln = rolling_extreme(c('low'), window, np.fmin)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return (hn - c('close')) / (hn - ln) * 100
+        match = re.match(r'^(kdjk|kdjd|kdjj)_(\d+)$', name)
+        if match:
+            kind, window = match.group(1), int(match.group(2))
+            if kind == 'kdjj':
+                return 3 * c('kdjk_{}'.format(window)) - 2 * c('kdjd_{}'.format(window))
+            if kind == 'kdjk':
+                low = rolling_extreme(c('low'), window, np.fmin)
+                high = rolling_extreme(c('high'), window, np.fmax)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    source = (c('close') - low) / (high - low) * 100
+            else:
+                source = c('kdjk_{}'.format(window))
+            source = np.where(np.isnan(source), 0.0, source)
+            return self.__decay(name, source * (1 - KDJ_DECAY), KDJ_DECAY, KDJ_INITIAL)
+        if name == 'adx':
+            return self.__ewm(name, c('dx'), 2.0 / (ADX_WINDOW + 1))
+        if name == 'adxr':
+            return self.__ewm(name, c('adx'), 2.0 / (ADX_WINDOW + 1))
+        if name == 'dx':
+            pdi, mdi = c('pdi'), c('mdi')
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.abs(pdi - mdi) / (pdi + mdi) * 100
+        if name == 'atr':
+            prev_close = np.full(self.x['close'].shape, np.nan)
+            prev_close[:, 1:] = c('close')[:, :-1]
+            tr = np.max(np.stack([c('high') - c('low'), np.abs(c('high') - prev_close),
+                                  np.abs(c('low') - prev_close)]), axis=0)
+            return self.__ewm(name, tr, 1.0 / DMI_WINDOW)
+        if name in ['pdi', 'mdi']:
+            hd = diff(c('high'))
+            ld = -diff(c('low'))
+            up = (hd + np.abs(hd)) / 2
+            down = (ld + np.abs(ld)) / 2
+            with np.errstate(invalid='ignore'):
+                dm = np.where(up > down, up, 0.0) if name == 'pdi' else np.where(down > up, down, 0.0)
+            dm = np.where(np.isnan(c('high')) | np.isnan(c('low')), np.nan, dm)
+            dm_ema = self.__ewm(name, dm, 2.0 / (DMI_WINDOW + 1))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return dm_ema / c('atr') * 100
+        raise KeyError(name)
+
+
+class IncrementalFeatures:
+    """
+    Indicators and candle ratios computed a batch of new candles at a time. Moving window indicators keep the
+    candles their longest window needs, recursive ones (ema, smma, rsi, pdi, mdi, dx, adx, adxr, kdj) their filter
+    state and vwap its running sums, so values match a computation over the whole history
+    (BatchTechnicalAnalysis, TechnicalAnalysisV2 with to_percentage=False) however the candles are split.
+    vwap is returned unscaled, divide by vwap_max() for the autoscaled value of TechnicalAnalysisV2.get_vwap.
+
+    Usage:
+        features = IncrementalFeatures(['rsi_14', 'adx'])
+        values = features.update(arrays)
+        state = features.state  # JSON serialisable, IncrementalFeatures(['rsi_14', 'adx'], state=state) resumes
+    """
+
+    def __init__(self, indicators, candle_ratios=True, state=None):
+        """
+        :param indicators: indicator strings, see context_bars for the supported ones.
+        :param candle_ratios: Add r1..r6 and t of TechnicalAnalysisV2.get_candle_ratios.
+        :param state: State of an earlier instance with the same indicators.
+        """
+        self.indicators = list(indicators)
+        self.candle_ratios = candle_ratios
+        self.bars = max([1] + [context_bars(i) for i in self.indicators])
+        self.state = state or {'context': {c: [] for c in OHLCV}, 'filters': {}, 'vwap': [0.0, 0.0, None]}
+
+    @property
+    def columns(self):
+        return self.indicators + (RATIOS if self.candle_ratios else [])
+
+    def vwap_max(self):
+        return self.state['vwap'][2]
+
+    def update(self, arrays, commit=True):
+        """
+        Values of new candles.
+        :param arrays: Decoded arrays of the candles following the last update (see historical.decode_candles).
+        :param commit: Advance the state past these candles. False leaves it as it was, Eg: for a forming candle.
+        :return: Dict of column to 1-D float64 array, one value per new candle.
+        """
+        step = _Pass(self.state['context'], arrays, self.state['filters'])
+        values = {}
+        for indicator in self.indicators:
+            if indicator == 'vwap':
+                continue
+            values[indicator] = step.column(_canonical(indicator))[0, step.offset:]
+        pv, volume, vwap_max = self.state['vwap']
+        if 'vwap' in self.indicators:
+            close, traded = step.x['close'][0, step.offset:], step.x['volume'][0, step.offset:]
+            cumulative_pv = pv + np.cumsum(traded * close)
+            cumulative_volume = volume + np.cumsum(traded)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values['vwap'] = cumulative_pv / cumulative_volume
+            if len(close):
+                pv, volume = float(cumulative_pv[-1]), float(cumulative_volume[-1])
+                if not np.all(np.isnan(values['vwap'])):
+                    vwap_max = float(np.nanmax([np.nanmax(values['vwap']),
+                                                -np.inf if vwap_max is None else vwap_max]))
+        if self.candle_ratios:
+            values.update(self.__ratios({c: step.x[c][0, step.offset:] for c in OHLCV}))
+        if commit:
+            self.state = {
+                'context': {c: step.x[c][0, -self.bars:].tolist() for c in OHLCV},
+                'filters': step.filters,
+                'vwap': [pv, volume, vwap_max],
+            }
+        return {column: values[column] for column in self.columns}
+
+    @staticmethod
+    def __ratios(candles):
+        """
+        Same definitions as BatchTechnicalAnalysis.get_candle_ratios, without the division by 100.
+        """
+        open_, high, low, close = candles['open'], candles['high'], candles['low'], candles['close']
+        green = close > open_
+        candle = np.abs(open_ - close)
+        total = high - low
+        upper_wick = np.where(green, np.abs(high - close), np.abs(high - open_))
+        lower_wick = np.where(green, np.abs(low - open_), np.abs(low - close))
+        return {
+            'r1': candle / (total + 0.1),
+            'r2': upper_wick / (total + 0.1),
+            'r3': lower_wick / (total + 0.1),
+            'r4': upper_wick / (lower_wick + 0.1),
+            'r5': upper_wick / (candle + 0.1),
+            'r6': lower_wick / (candle + 0.1),
+            't': green.astype(np.float64),
+        }
+
+
+def _epoch(moment, utc_offset):
+    """
+    Epoch seconds of a datetime. Naive datetimes are taken in the time zone of the stored candles.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone(datetime.timedelta(seconds=utc_offset)))
+    return int(moment.timestamp())
+
+
+def _closed(dates, interval, utc_offset, until):
+    """
+    Mask of candles that had closed at until (epoch seconds).
+    """
+    if interval in ['day', 'week']:
+        days = 7 if interval == 'week' else 1
+        return (dates + utc_offset) // 86400 + days <= (until + utc_offset) // 86400
+    return dates + INTERVAL_MINUTES[interval] * 60 <= until
+
+
+def _scale(values, vwap_max, to_percentage):
+    """
+    Stored (raw) values in the units of TechnicalAnalysisV2: vwap autoscaled, the rest divided by 100 if
+    to_percentage, except the candle type t.
+    """
+    scaled = {}
+    for column, value in values.items():
+        if column == 'vwap':
+            value = value / vwap_max if vwap_max else value
+        elif to_percentage and column != 't':
+            value = value / 100
+        scaled[column] = value
+    return scaled
+
+
+def _write_atomic(path, write):
+    temporary = '{}.{}.tmp'.format(path, threading.get_ident())
+    with open(temporary, 'wb') as fp:
+        write(fp)
+    os.replace(temporary, path)
+
+
+class FeatureStore:
+    """
+    Indicator and candle ratio columns of each (instrument, interval, feature set), kept next to the candle
+    history so they are computed once:
+        <root>/features/<interval>/<instrument_token>/<feature_key>/
+    Each update appends the new candles as a numpy segment file, computed from the state IncrementalFeatures
+    carried over from the previous update. state.json lists the segments and holds that state, and is replaced
+    after the segment is written, so an interrupted update is simply repeated. Only closed candles are stored.
+    Values are the same as TechnicalAnalysisV2.get_indicators and get_candle_ratios over the whole stored history
+    (vwap is cumulative from the first stored candle and scaled by its maximum over the stored candles).
+
+    Usage:
+        features = FeatureStore('history')  # Same root as the HistoryStore of BulkDownloader
+        features.update(256265, 'minute', 'rsi_14', 'adx')
+        data = features.read(256265, 'minute', 'rsi_14', 'adx', from_date=datetime.datetime(2024, 1, 1))
+    """
+
+    def __init__(self, root, history=None):
+        """
+        :param root: Directory of the store. Created if missing.
+        :param history: HistoryStore update reads candles from. Defaults to one in the same root.
+        """
+        self.root = root
+        self.history = history or HistoryStore(root)
+        self.__locks = {}
+        self.__lock = threading.Lock()
+
+    def __directory(self, instrument_token, interval, indicators, candle_ratios):
+        return os.path.join(self.root, FEATURES_DIRECTORY, interval, str(instrument_token),
+                            feature_key(indicators, candle_ratios))
+
+    def __key_lock(self, directory):
+        with self.__lock:
+            return self.__locks.setdefault(directory, threading.Lock())
+
+    @staticmethod
+    def __load(directory, indicators, candle_ratios):
+        path = os.path.join(directory, STATE_FILE)
+        if os.path.exists(path):
+            with open(path, 'r') as fp:
+                return json.load(fp)
+        return {
+            'indicators': sorted(set(indicators)),
+            'candle_ratios': bool(candle_ratios),
+            'segments': [],
+            'last': None,
+            'utc_offset': None,
+            'state': None,
+        }
+
+    @staticmethod
+    def __save(directory, meta):
+        _write_atomic(os.path.join(directory, STATE_FILE), lambda fp: fp.write(json.dumps(meta).encode()))
+
+    @staticmethod
+    def __read_segments(directory, meta, start=None, end=None):
+        parts = []
+        for first, last, name in meta['segments']:
+            if (start is not None and last < start) or (end is not None and first > end):
+                continue
+            with np.load(os.path.join(directory, name)) as segment:
+                parts.append({column: segment[column] for column in segment.files})
+        if not parts:
+            return None
+        columns = {column: np.concatenate([p[column] for p in parts]) for column in parts[0]}
+        keep = np.ones(len(columns['date']), dtype=bool)
+        if start is not None:
+            keep &= columns['date'] >= start
+        if end is not None:
+            keep &= columns['date'] <= end
+        return {column: value[keep] for column, value in columns.items()}
+
+    @staticmethod
+    def __write_segment(directory, columns):
+        first, last = int(columns['date'][0]), int(columns['date'][-1])
+        name = '{}_{}.npz'.format(first, last)
+        _write_atomic(os.path.join(directory, name), lambda fp: np.savez(fp, **columns))
+        return [first, last, name]
+
+    def __compact(self, directory, meta):
+        """
+        Merge all segments into one once there are more than MAX_SEGMENTS.
+        """
+        if len(meta['segments']) <= MAX_SEGMENTS:
+            return
+        old = [name for _, _, name in meta['segments']]
+        meta['segments'] = [self.__write_segment(directory, self.__read_segments(directory, meta))]
+        self.__save(directory, meta)
+        for name in old:
+            if name != meta['segments'][0][2]:
+                os.remove(os.path.join(directory, name))
+
+    def __append(self, instrument_token, interval, indicators, candle_ratios, candles, until):
+        """
+        Store the closed ones of candles newer than the stored history.
+        :return: (meta, rows stored, IncrementalFeatures at the last stored candle, decoded candles not stored)
+        """
+        directory = self.__directory(instrument_token, interval, indicators, candle_ratios)
+        meta = self.__load(directory, indicators, candle_ratios)
+        features = IncrementalFeatures(meta['indicators'], meta['candle_ratios'], state=meta['state'])
+        if candles is None:
+            from_date = None
+            if meta['last'] is not None:
+                tz = datetime.timezone(datetime.timedelta(seconds=meta['utc_offset']))
+                from_date = datetime.datetime.fromtimestamp(meta['last'], tz).replace(tzinfo=None)
+            candles = self.history.read(instrument_token, interval, from_date=from_date)
+        arrays = candles if isinstance(candles, dict) else frame_to_arrays(candles)
+        dates = np.asarray(arrays['date'], dtype=np.int64)
+        new = np.ones(len(dates), dtype=bool) if meta['last'] is None else dates > meta['last']
+        if meta['utc_offset'] is None and len(dates):
+            meta['utc_offset'] = arrays['utc_offset']
+        closed = new & _closed(dates, interval, meta['utc_offset'] or 0, until or time.time())
+        forming = {c: np.asarray(arrays[c])[new & ~closed] for c in ['date'] + OHLCV}
+        if not closed.any():
+            return meta, 0, features, forming
+        stored = {c: np.asarray(arrays[c])[closed] for c in ['date'] + OHLCV}
+        values = features.update(stored)
+        columns = dict(values, date=stored['date'])
+        os.makedirs(directory, exist_ok=True)
+        meta['segments'].append(self.__write_segment(directory, columns))
+        meta['last'] = int(stored['date'][-1])
+        meta['state'] = features.state
+        self.__save(directory, meta)
+        self.__compact(directory, meta)
+        return meta, int(closed.sum()), features, forming
+
+    def update(self, instrument_token, interval, *indicators, candles=None, candle_ratios=True, until=None):
+        """
+        Append features of candles newer than the last stored one.
+        :param indicators: indicator strings, see context_bars for the supported ones.
+        :param candles: New candles, as a list of candles, decoded arrays or CandleFrame, oldest first. Defaults to
+        the candles in the HistoryStore.
+        :param candle_ratios: The feature set includes the candle ratios.
+        :param until: Epoch seconds. Candles that had not closed by then are left for a later update. Defaults to now.
+        :return: Number of candles appended.
+        """
+        directory = self.__directory(instrument_token, interval, indicators, candle_ratios)
+        with self.__key_lock(directory):
+            return self.__append(instrument_token, interval, indicators, candle_ratios, candles, until)[1]
+
+    def last_date(self, instrument_token, interval, *indicators, candle_ratios=True):
+        """
+        :return: Timezone aware datetime of the last stored candle, None if nothing is stored.
+        """
+        meta = self.__load(self.__directory(instrument_token, interval, indicators, candle_ratios), indicators,
+                           candle_ratios)
+        if meta['last'] is None:
+            return None
+        tz = datetime.timezone(datetime.timedelta(seconds=meta['utc_offset']))
+        return datetime.datetime.fromtimestamp(meta['last'], tz)
+
+    def read(self, instrument_token, interval, *indicators, from_date=None, to_date=None, candle_ratios=True,
+             to_percentage=True):
+        """
+        Stored features of a date range.
+        :param from_date: First candle (datetime, naive ones in the time zone of the candles). Defaults to the first.
+        :param to_date: Last candle. Defaults to the last.
+        :param to_percentage: divide by 100 (vwap and t are left as they are, like TechnicalAnalysisV2)
+        :return: Dict of 'date' (int64 epoch seconds), 'utc_offset' and one float64 array per feature, in the
+        order requested with the candle ratios last. Empty arrays if nothing is stored.
+        """
+        directory = self.__directory(instrument_token, interval, indicators, candle_ratios)
+        meta = self.__load(directory, indicators, candle_ratios)
+        offset = meta['utc_offset'] or 0
+        start = _epoch(from_date, offset) if from_date else None
+        end = _epoch(to_date, offset) if to_date else None
+        names = list(indicators) + (RATIOS if candle_ratios else [])
+        columns = self.__read_segments(directory, meta, start, end)
+        if columns is None:
+            columns = dict({name: np.zeros(0) for name in names}, date=np.zeros(0, dtype=np.int64))
+        vwap_max = meta['state']['vwap'][2] if meta['state'] else None
+        values = _scale({name: columns[name] for name in names}, vwap_max, to_percentage)
+        return dict({'date': columns['date'], 'utc_offset': offset}, **values)
+
+    def latest(self, instrument_token, interval, *indicators, candles=None, candle_ratios=True, to_percentage=True,
+               until=None):
+        """
+        Latest features, as Kite.get_input_features returns them. Closed candles among the given ones are appended
+        to the store, a forming candle is computed from the stored state without being stored.
+        :param candles: Fresh candles, see update. Defaults to the candles in the HistoryStore.
+        :return: Dict of feature to latest value. Empty if there are no candles.
+        """
+        directory = self.__directory(instrument_token, interval, indicators, candle_ratios)
+        with self.__key_lock(directory):
+            meta, appended, features, forming = self.__append(instrument_token, interval, indicators, candle_ratios,
+                                                              candles, until)
+        names = list(indicators) + (RATIOS if candle_ratios else [])
+        if len(forming['date']):
+            values = features.update(forming, commit=False)
+            vwap_max = features.vwap_max()
+            if 'vwap' in values and not np.all(np.isnan(values['vwap'])):
+                vwap_max = float(np.nanmax([np.nanmax(values['vwap']), vwap_max or -np.inf]))
+            values = _scale({name: values[name][-1:] for name in names}, vwap_max, to_percentage)
+        else:
+            if meta['last'] is None:
+                return {}
+            values = self.__read_segments(directory, meta, meta['last'], meta['last'])
+            values = _scale({name: values[name] for name in names}, features.vwap_max(), to_percentage)
+        return {name: float(value[-1]) for name, value in values.items()}
+
+    def feature_matrix(self, instrument_token, interval, *indicators, from_date=None, to_date=None,
+                       candle_ratios=True):
+        """
+        Stored features as one matrix, like TechnicalAnalysisV2.get_feature_matrix, for dataset generation.
+        TechnicalAnalysisV2.sliding_windows turns it into windows for sequence models.
+        :return: (matrix, names, dates). C-contiguous float64 array (candles x features), the feature names and the
+        epoch seconds of each row.
+        """
+        data = self.read(instrument_token, interval, *indicators, from_date=from_date, to_date=to_date,
+                         candle_ratios=candle_ratios)
+        names = list(indicators) + (RATIOS if candle_ratios else [])
+        matrix = np.empty((len(data['date']), len(names)), dtype=np.float64)
+        for column, name in enumerate(names):
+            matrix[:, column] = data[name]
+        return matrix, names, data['date']
+
+    def read_aligned(self, instrument_tokens, interval, *indicators, from_date=None, to_date=None,
+                     candle_ratios=True, to_percentage=True):
+        """
+        Features of several instruments aligned on their timestamps, in the layout of
+        BatchTechnicalAnalysis.get_indicators, for vectorised backtests.
+        :return: (timestamps, features). DatetimeIndex of the union of the candles' timestamps, and dict of feature
+        to 2-D array (instruments x time), NaN where an instrument has no candle.
+        """
+        reads = [self.read(token, interval, *indicators, from_date=from_date, to_date=to_date,
+                           candle_ratios=candle_ratios, to_percentage=to_percentage) for token in instrument_tokens]
+        dates = np.unique(np.concatenate([r['date'] for r in reads])) if reads else np.zeros(0, dtype=np.int64)
+        names = list(indicators) + (RATIOS if candle_ratios else [])
+        features = {name: np.full((len(reads), len(dates)), np.nan) for name in names}
+        for row, data in enumerate(reads):
+            columns = np.searchsorted(dates, data['date'])
+            for name in names:
+                features[name][row, columns] = data[name]
+        offset = next((r['utc_offset'] for r in reads if len(r['date'])), 0)
+        tz = datetime.timezone(datetime.timedelta(seconds=offset))
+        return pd.to_datetime(dates, unit='s', utc=True).tz_convert(tz), features
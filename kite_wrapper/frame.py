@@ -0,0 +1,180 @@
+import threading
+import numpy as np
+import pandas as pd
+from stockstats import StockDataFrame
+
+from .precision import resolve_dtype, restore_prices
+
+# Columns cast by the dtype of a CandleFrame.
+FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'oi']
+
+# Indicators that compare a bar's up and down moves. On float32 frames they are computed from float64 prices
+# restored to the price grid, so ties fall the same way as on float64 candles.
+DMI_INDICATORS = ['pdi', 'mdi', 'dx', 'adx', 'adxr']
+
+
+class CandleFrame:
+    """
+    Candles prepared once for analysis and shared, read-only, between TechnicalAnalysisV2 calls.
+    The DataFrame is built once, indicator columns are computed at most once and derived values (vwap, candle
+    ratios, trailing windows) are cached on the frame, so several calls on the same fetch reuse them instead of
+    converting the candles again. Safe to share between threads. Returned values must not be modified.
+    With dtype float32 the candles and the indicator columns returned are held in float32. stockstats computes each
+    indicator in float64, then the columns it added are dropped, so only the float32 results are kept. Indicators
+    sharing intermediate columns recompute them, trading time for memory. DMI_INDICATORS are computed from a
+    temporary float64 copy of high, low and close. With inplace the columns stay on the given DataFrame.
+    """
+
+    def __init__(self, candles, inplace=False, dtype=None):
+        """
+        :param candles: List of candles as returned by Kite.get_historic_data, or a DataFrame with columns date,
+        open, high, low, close, volume.
+        :param inplace: Add indicator columns to the given DataFrame itself, like TechnicalAnalysisV2 does with its
+        own data. By default they go to a shallow copy and the given frame is left untouched.
+        :param dtype: float32 or float64 to cast the price and volume columns to. None keeps them as they are.
+        """
+        if isinstance(candles, CandleFrame):
+            candles = candles.frame
+        frame = candles if isinstance(candles, pd.DataFrame) else pd.DataFrame(list(candles))
+        self.__dtype = None if dtype is None else resolve_dtype(dtype)
+        if self.__dtype is not None:
+            columns = [c for c in FLOAT_COLUMNS if c in frame and frame[c].dtype != self.__dtype]
+            if columns:
+                frame = frame if inplace else frame.copy(deep=False)
+                for column in columns:
+                    frame[column] = frame[column].astype(self.__dtype)
+        self.__frame = frame
+        self.__inplace = inplace
+        self.__stock = None
+        self.__stock_columns = []
+        self.__cache = {}
+        self.__lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.__frame)
+
+    def __bool__(self):
+        return len(self.__frame) > 0
+
+    def __getitem__(self, name):
+        return self.__frame[name]
+
+    def __contains__(self, name):
+        return name in self.__frame
+
+    @property
+    def dtype(self):
+        """
+        Float type the frame was cast to, None if the candles were kept as given.
+        """
+        return self.__dtype
+
+    @property
+    def frame(self):
+        """
+        Underlying DataFrame. Shared, do not modify.
+        """
+        return self.__frame
+
+    def column(self, name):
+        """
+        Read-only numpy array of a column.
+        """
+        return self.derived(('column', name), lambda candles: self.__read_only(candles[name].to_numpy()))
+
+    def indicator(self, name):
+        """
+        stockstats indicator column, computed on first use.
+        :param name: Indicator string ==> https://pypi.org/project/stockstats/
+        :return: Series indexed by date, in the dtype of the frame if it has one.
+        """
+        if self.__dtype is None:
+            with self.__lock:
+                return self.stock[name]
+        return self.derived(('indicator', name), lambda candles: candles.__cast_indicator(name))
+
+    @property
+    def stock(self):
+        """
+        StockDataFrame of the candles, indexed by date. Shared, do not modify.
+        """
+        with self.__lock:
+            if self.__stock is None:
+                # Shallow copy: retype sets the index and adds indicator columns without touching the shared frame.
+                self.__stock = StockDataFrame.retype(self.__frame if self.__inplace else self.__frame.copy(deep=False))
+                self.__stock_columns = list(self.__stock.columns)
+            return self.__stock
+
+    def __cast_indicator(self, name):
+        """
+        Indicator column cast to the dtype of the frame. On float32 frames the float64 columns stockstats added are
+        dropped afterwards.
+        """
+        if self.__dtype != np.float32:
+            values = self.stock[name]
+            return values if values.dtype == self.__dtype else values.astype(self.__dtype)
+        if name in DMI_INDICATORS:
+            values = self.__restored_stock()[name]
+        else:
+            values = self.stock[name]
+        # astype copies, so the result does not keep the block of float64 columns alive.
+        values = values.astype(self.__dtype)
+        if not self.__inplace:
+            added = [c for c in self.stock.columns if c not in self.__stock_columns]
+            if added:
+                self.__stock.drop(columns=added, inplace=True)
+        return values
+
+    def __restored_stock(self):
+        """
+        StockDataFrame of the high, low and close of the float32 candles restored to float64, see DMI_INDICATORS.
+        Built for each indicator and not kept.
+        """
+        frame = pd.DataFrame({c: restore_prices(self.__frame[c].to_numpy()) for c in ['high', 'low', 'close']},
+                             index=self.stock.index)
+        return StockDataFrame.retype(frame)
+
+    def derived(self, key, fn):
+        """
+        Value computed once from the frame and cached.
+        :param key: Hashable cache key.
+        :param fn: Function of this CandleFrame.
+        :return: Cached value of fn(self).
+        """
+        with self.__lock:
+            if key not in self.__cache:
+                self.__cache[key] = fn(self)
+            return self.__cache[key]
+
+    def tail(self, bars):
+        """
+        CandleFrame of the last `bars` candles, cached per length.
+        """
+        bars = max(int(bars), 1)
+        if bars >= len(self):
+            return self
+        return self.derived(('tail', bars), lambda candles: CandleFrame(self.__slice(candles.frame, bars),
+                                                                        dtype=self.__dtype))
+
+    @staticmethod
+    def __slice(frame, bars):
+        tail = frame.iloc[-bars:]
+        # A frame indexed by date keeps its dates as a column.
+        return tail.reset_index(drop=tail.index.name != 'date')
+
+    @staticmethod
+    def __read_only(values):
+        values = values.view()
+        values.flags.writeable = False
+        return values
+
+
+def as_candle_frame(data, dtype=None):
+    """
+    :param data: CandleFrame, DataFrame or list of candles.
+    :param dtype: See CandleFrame.
+    :return: CandleFrame. The same object if it already is one of that dtype.
+    """
+    if isinstance(data, CandleFrame) and (dtype is None or data.dtype == resolve_dtype(dtype)):
+        return data
+    return CandleFrame(data, dtype=dtype)
@@ -0,0 +1,147 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .frame import CandleFrame
+from .precision import resolve_dtype
+
+# Columns of decoded candles. date holds epoch seconds (int64), the rest float64 (or float32, see precision.py).
+ARRAY_FIELDS = ['date', 'open', 'high', 'low', 'close', 'volume', 'oi']
+
+DATE_STRING_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Output formats of Kite.get_historic_data: KiteConnect's list of dicts, decoded arrays or a CandleFrame.
+HISTORIC_OUTPUTS = ['list', 'arrays', 'frame']
+
+_ZERO, _COLON, _PLUS, _MINUS = ord('0'), ord(':'), ord('+'), ord('-')
+
+# Widths parsed without pandas: no offset, +HHMM and +HH:MM.
+_FAST_WIDTHS = (19, 24, 25)
+
+
+def parse_timestamps(stamps):
+    """
+    Parse Kite timestamps (Eg: 2024-01-01T09:15:00+0530) into epoch seconds in one vectorised step.
+    Timestamps that do not all share the layout of the first one are parsed by pandas instead.
+    :param stamps: Sequence of ISO 8601 strings with a +HHMM or +HH:MM offset, or none (taken as UTC).
+    :return: (int64 array of epoch seconds, UTC offset in seconds of the first timestamp)
+    """
+    stamps = np.asarray(stamps)
+    if not len(stamps):
+        return np.zeros(0, dtype=np.int64), 0
+    width = stamps.dtype.itemsize // 4
+    if width not in _FAST_WIDTHS or (np.char.str_len(stamps) != width).any():
+        return _parse_timestamps_slow(stamps)
+    local = stamps.astype('U19').astype('datetime64[s]').astype(np.int64)
+    if width == 19:
+        return local, 0
+    # Unicode code points of every character, one row per timestamp.
+    codes = stamps.view(np.uint32).reshape(len(stamps), width).astype(np.int64)
+    minutes_at = 23 if width == 25 else 22
+    if not np.isin(codes[:, 19], (_PLUS, _MINUS)).all() or (width == 25 and (codes[:, 22] != _COLON).any()):
+        return _parse_timestamps_slow(stamps)
+    hours = (codes[:, 20] - _ZERO) * 10 + codes[:, 21] - _ZERO
+    minutes = (codes[:, minutes_at] - _ZERO) * 10 + codes[:, minutes_at + 1] - _ZERO
+    offset = np.where(codes[:, 19] == _MINUS, -1, 1) * (hours * 3600 + minutes * 60)
+    return local - offset, int(offset[0])
+
+
+def _parse_timestamps_slow(stamps):
+    dates = pd.to_datetime(stamps.tolist(), utc=True)
+    offset = pd.Timestamp(str(stamps[0])).utcoffset()
+    return dates.asi8 // 10 ** 9, int(offset.total_seconds()) if offset is not None else 0
+
+
+def decode_candles(candles, dtype=np.float64):
+    """
+    Decode the candles of a raw historical response (lists of [timestamp, open, high, low, close, volume(, oi)])
+    without building a dict and datetime per candle.
+    :param candles: The candles list of the response.
+    :param dtype: float64 or float32 for the price, volume and oi arrays.
+    :return: Dict of ARRAY_FIELDS to arrays, oi only when present, and 'utc_offset' in seconds.
+    """
+    dtype = resolve_dtype(dtype)
+    if not candles:
+        arrays = {f: np.zeros(0, dtype=dtype) for f in ARRAY_FIELDS[1:6]}
+        arrays['date'] = np.zeros(0, dtype=np.int64)
+        arrays['utc_offset'] = 0
+        return arrays
+    columns = list(zip(*candles))
+    date, utc_offset = parse_timestamps(columns[0])
+    arrays = {'date': date, 'utc_offset': utc_offset}
+    values = np.array(columns[1:], dtype=dtype)
+    for index, field in enumerate(ARRAY_FIELDS[1:len(columns)]):
+        arrays[field] = values[index]
+    return arrays
+
+
+def concat_arrays(parts):
+    """
+    Join decoded chunks in chronological order, dropping candles repeated at chunk edges.
+    """
+    parts = [p for p in parts if len(p['date'])]
+    if not parts:
+        return decode_candles([])
+    keep = [np.ones(len(parts[0]['date']), dtype=bool)]
+    last = parts[0]['date'][-1]
+    for part in parts[1:]:
+        keep.append(part['date'] > last)
+        last = max(last, part['date'][-1])
+    arrays = {'utc_offset': parts[0]['utc_offset']}
+    for field in ARRAY_FIELDS:
+        if all(field in p for p in parts):
+            arrays[field] = np.concatenate([p[field][k] for p, k in zip(parts, keep)])
+    return arrays
+
+
+def arrays_to_frame(arrays):
+    """
+    CandleFrame of decoded candles, dates as timezone aware timestamps like KiteConnect.historical_data gives.
+    """
+    tz = datetime.timezone(datetime.timedelta(seconds=arrays['utc_offset']))
+    columns = {'date': pd.to_datetime(arrays['date'], unit='s', utc=True).tz_convert(tz)}
+    for field in ARRAY_FIELDS[1:]:
+        if field in arrays:
+            columns[field] = arrays[field]
+    return CandleFrame(pd.DataFrame(columns))
+
+
+def frame_to_arrays(data, dtype=np.float64):
+    """
+    Decoded arrays of candles held in another form, the inverse of arrays_to_frame.
+    :param data: CandleFrame, DataFrame or list of candles with a date column.
+    :param dtype: float64 or float32.
+    """
+    if isinstance(data, CandleFrame):
+        data = data.frame
+    elif not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame(data)
+    if not len(data):
+        return decode_candles([], dtype)
+    dates = pd.DatetimeIndex(data['date'])
+    offset = dates[0].utcoffset()
+    arrays = {'date': dates.asi8 // 10 ** 9, 'utc_offset': int(offset.total_seconds()) if offset else 0}
+    for field in ARRAY_FIELDS[1:]:
+        if field in data:
+            arrays[field] = data[field].to_numpy(dtype=resolve_dtype(dtype))
+    return arrays
+
+
+def fetch_raw(session, instrument_token, interval, from_date, to_date, continuous=False, oi=False,
+              dtype=np.float64):
+    """
+    KiteConnect.historical_data without its per candle formatting.
+    :param dtype: float64 or float32.
+    :return: Decoded arrays, see decode_candles.
+    """
+    data = session._get('market.historical',
+                        url_args={'instrument_token': instrument_token, 'interval': interval},
+                        params={
+                            'from': from_date.strftime(DATE_STRING_FORMAT),
+                            'to': to_date.strftime(DATE_STRING_FORMAT),
+                            'interval': interval,
+                            'continuous': 1 if continuous else 0,
+                            'oi': 1 if oi else 0,
+                        })
+    return decode_candles(data['candles'], dtype)
@@ -1,3 +1,4 @@
+import collections
 import concurrent.futures as concurrent
 import logging
 from kiteconnect import KiteConnect
@@ -11,13 +12,27 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
-# from .utils import TechnicalAnalysis
-from .v2 import TechnicalAnalysisV2
+import threading
+from .metrics import registry, instrument_session
+from .tracing import NULL_TRACER
+from .sessions import ExchangeCalendar
+from .planner import plan_window, split_range, DEFAULT_TOLERANCE, DEFAULT_LOOKBACK_DAYS
+from .resample import resample_all
+from .orders import OrderGateway
+from .portfolio import PortfolioService
+from .scheduler import CandleScheduler
+from .compute import ComputeBackend
+from .historical import HISTORIC_OUTPUTS, fetch_raw, concat_arrays, arrays_to_frame
+from .features import RATIOS, is_incremental
 
 logging.basicConfig(level=logging.DEBUG)
 
-# analysis = TechnicalAnalysis()
-analysis = TechnicalAnalysisV2()
+# Instruments whose minute candles get_minute_candles keeps, the least recently used are dropped first.
+MINUTE_CACHE_INSTRUMENTS = 256
+
+# Cached minute candles are kept back to the oldest from_date of this many recent calls per instrument, so a
+# rolling window does not keep every candle since the first call.
+MINUTE_CACHE_RANGES = 4
 
 
 class Kite:
@@ -25,13 +40,44 @@ class Kite:
     A wrapper class for kiteconnect API.
     """
 
-    def __init__(self, api_key, api_secret, redirect_url):
+    def __init__(self, api_key, api_secret, redirect_url, root=None, metrics=None, tracer=None, calendar=None,
+                 compute=None, features=None, minute_cache_size=MINUTE_CACHE_INSTRUMENTS):
+        """
+        :param api_key: Kite API key.
+        :param api_secret: Kite API secret.
+        :param redirect_url: Redirect URL registered for the app.
+        :param root: API root URL. Defaults to the Kite API. Point it at a FakeKiteServer for offline load tests.
+        :param metrics: MetricsRegistry to record into. Defaults to the process wide registry.
+        :param tracer: Tracer for stage level spans. Defaults to no tracing.
+        :param calendar: ExchangeCalendar used to plan fetch windows. Defaults to NSE sessions and holidays.
+        :param compute: ComputeBackend, or its kind (inline, thread or process), for indicator work. Defaults to
+        inline.
+        :param features: FeatureStore. get_input_features then appends fresh candles to it instead of recomputing
+        features over the history on every call. vwap and indicators the store does not support (see
+        features.context_bars) are still computed on every call.
+        :param minute_cache_size: Instruments whose minute candles get_minute_candles keeps.
+        """
         self.api_key = api_key
         self.api_secret = api_secret
         self.redirect_url = redirect_url
         self.access_token = None
         self.request_token = None
-        self.session = KiteConnect(api_key=self.api_key)
+        self.metrics = metrics or registry
+        self.tracer = tracer or NULL_TRACER
+        self.calendar = calendar or ExchangeCalendar()
+        if compute is None or isinstance(compute, str):
+            compute = ComputeBackend(compute or 'inline', metrics=self.metrics)
+        self.compute = compute
+        self.features = features
+        self.__minute_cache = collections.OrderedDict()
+        self.__minute_cache_size = minute_cache_size
+        self.__minute_cache_lock = threading.Lock()
+        self.__order_gateway = None
+        self.__order_gateway_lock = threading.Lock()
+        self.__scheduler = None
+        self.__scheduler_lock = threading.Lock()
+        self.session = instrument_session(KiteConnect(api_key=self.api_key, root=root), self.metrics)
+        self.portfolio = PortfolioService(self.session, metrics=self.metrics)
         self.__set_secrets()
         if self.access_token:
             self.session.set_access_token(self.access_token)
@@ -139,7 +185,8 @@ class Kite:
         }
         return secrets
 
-    def get_historic_data(self, instrument_token, interval='day', sets=1, delta=None):
+    def get_historic_data(self, instrument_token, interval='day', sets=1, delta=None, from_date=None, to_date=None,
+                          output='list', dtype=np.float64):
         """
         Gets historic data till today
         :param instrument_token: instrument identifier (retrieved from the instruments()) call.
@@ -147,43 +194,73 @@ class Kite:
         :param sets: Number of sets of historic data to fetch. Default 1. Used as multiplier for the total time span
         of data.
         :param delta: Number of days for which data need to be fetched.
+        :param from_date: Start of an explicit range (datetime). Overrides sets and delta.
+        :param to_date: End of the explicit range. Defaults to now.
+        :param output: list of candle dicts as KiteConnect returns them, or, decoding the raw response in one
+        vectorised step: arrays (dict of int64 epoch seconds 'date' and float64 open, high, low, close, volume, oi)
+        or frame (CandleFrame).
+        :param dtype: float64, or float32 to halve the memory of arrays and frame output. See precision.py.
         :return: List of historic data
         """
+        assert output in HISTORIC_OUTPUTS
         try:
             assert interval in self.valid_intervals
         except AssertionError as e:
             print('Enter a valid interval.')
             print(self.valid_intervals)
             return
+        if from_date:
+            to_date = to_date or datetime.datetime.now()
+            return self.__fetch_range(instrument_token, interval, from_date, to_date, output, dtype)
         if delta:
             assert delta > 0
-            assert delta < 60
             delta = datetime.timedelta(days=delta)
         else:
-            if interval in ['minute', '2minute']:
-                delta = datetime.timedelta(days=60)
-            elif interval in ['3minute', '4minute', '5minute', '10minute']:
-                delta = datetime.timedelta(days=100)
-            elif interval in ['15minute', '30minute']:
-                delta = datetime.timedelta(days=200)
-            elif interval in ['hour', '2hour', '3hour']:
-                delta = datetime.timedelta(days=400)
-            elif interval in ['day', 'week']:
-                delta = datetime.timedelta(days=2000)
-            else:
-                delta = datetime.timedelta(days=1)
+            delta = datetime.timedelta(days=DEFAULT_LOOKBACK_DAYS.get(interval, 1))
         now = datetime.datetime.now()
+        return self.__fetch_range(instrument_token, interval, now - sets * delta, now, output, dtype)
+
+    def __fetch_range(self, instrument_token, interval, from_date, to_date, output='list', dtype=np.float64):
+        """
+        Fetch a date range in as few requests as Kite allows, oldest first, without duplicate candles.
+        """
+        if output != 'list':
+            parts = []
+            for start, end in split_range(from_date, to_date, interval, calendar=self.calendar):
+                parts.append(fetch_raw(self.session, instrument_token, interval, start, end, dtype=dtype))
+                self.metrics.inc('kite_candles_fetched_total', len(parts[-1]['date']), interval=interval)
+            arrays = concat_arrays(parts)
+            return arrays_to_frame(arrays) if output == 'frame' else arrays
         data = []
-        for s in range(sets):
-            to_date = now - s * delta
-            from_date = to_date - delta
-            historical_data = self.session.historical_data(instrument_token, interval=interval, from_date=from_date,
-                                                           to_date=to_date)
+        for start, end in split_range(from_date, to_date, interval, calendar=self.calendar):
+            historical_data = self.session.historical_data(instrument_token, interval=interval, from_date=start,
+                                                           to_date=end)
+            if data and historical_data:
+                last = data[-1]['date']
+                historical_data = [c for c in historical_data if c['date'] > last]
             data.extend(historical_data)
+            self.metrics.inc('kite_candles_fetched_total', len(historical_data), interval=interval)
         return data
 
+    def get_planned_historic_data(self, *args, instrument_token, interval='minute', tolerance=DEFAULT_TOLERANCE,
+                                  output='list', dtype=np.float64):
+        """
+        Fetch only the candles the requested indicators need for their latest value.
+        The window is the warm-up of the slowest indicator, counted in trading sessions of self.calendar.
+        :param args: indicator strings ==> https://pypi.org/project/stockstats/
+        :param instrument_token: instrument identifier (retrieved from the instruments()) call.
+        :param interval: candle interval (hour, minute, day, 5 minute etc.).
+        :param tolerance: Accuracy of recursive indicators. See planner.DEFAULT_TOLERANCE.
+        :param output: list, arrays or frame. See get_historic_data.
+        :param dtype: float64 or float32. See get_historic_data.
+        :return: List of historic data
+        """
+        from_date, to_date, bars = plan_window(*args, interval=interval, calendar=self.calendar, tolerance=tolerance)
+        return self.get_historic_data(instrument_token, interval, from_date=from_date, to_date=to_date, output=output,
+                                      dtype=dtype)
+
     def get_latest_technical_indicators(self, *args, instrument_token, interval='minute', normalize=False,
-                                        coeff=0.001415926535):
+                                        coeff=0.001415926535, tail=True):
         """
         Fetch latest indicator values
         :param args: indicator strings ==> https://pypi.org/project/stockstats/
@@ -191,14 +268,15 @@ class Kite:
         :param interval: candle interval (hour, minute, day, 5 minute etc.).
         :param normalize: Boolean - data should be normalised or not
         :param coeff :Normalisation coefficient for sigmoid.
+        :param tail: Compute only the trailing window each indicator needs. See
+        TechnicalAnalysisV2.get_latest_indicators for the accuracy. False computes the full series.
         :return: Dict of latest indicator values.
         """
-        data = self.get_historic_data(instrument_token, interval)
-        indicators = analysis.get_indicators(*args, data=data)
+        data = self.get_planned_historic_data(*args, instrument_token=instrument_token, interval=interval,
+                                              output='arrays')
+        indicators = self.compute.latest_features(data, *args, tail=tail).result()
         indicator_values = {}
-        for indicator, value in indicators.items():
-
-            v = value[-1]
+        for indicator, v in indicators.items():
             # Mapping using sigmoid
             if normalize:
                 v = 1 / (1 + np.exp(-coeff * v))
@@ -212,32 +290,124 @@ class Kite:
         :param interval:
         :return:
         """
-        data = self.get_historic_data(instrument_token, interval)
-        ratios = analysis.get_candle_ratios(data=data)
-        indicator_values = {}
-        for ratio, value in ratios.items():
-            v = value[-1]
-            indicator_values[ratio] = v
-        return indicator_values
+        data = self.get_planned_historic_data('candle_ratios', instrument_token=instrument_token, interval=interval,
+                                              output='arrays')
+        return self.compute.latest_features(data, candle_ratios=True).result()
 
-    def get_input_features(self, *args, instrument_token, interval='minute'):
+    def get_input_features(self, *args, instrument_token, interval='minute', tail=True):
         """
         Get input features to feed ML model
         :param args: indicator strings ==> https://pypi.org/project/stockstats/
         :param instrument_token: instrument identifier (retrieved from the instruments()) call.
         :param interval: candle interval (hour, minute, day, 5 minute etc.).
+        :param tail: Compute only the trailing window each indicator needs. Not used for the indicators read from a
+        FeatureStore, which carries the state of recursive indicators over the whole stored history.
         :return: Dict of latest indicator values.
         """
-        data = self.get_historic_data(instrument_token, interval)
-        indicators = analysis.get_indicators(*args, data=data)
-        ratios = analysis.get_candle_ratios(data=data)
-        indicators.update(ratios)
-        indicator_values = {}
-        for indicator, value in indicators.items():
-            v = value[-1]
-            indicator_values[indicator] = v
+        stored = [arg for arg in args if arg != 'vwap' and is_incremental(arg)] if self.features is not None else []
+        if not stored:
+            data = self.get_planned_historic_data(*args, instrument_token=instrument_token, interval=interval,
+                                                  output='arrays')
+            return self.compute.latest_features(data, *args, tail=tail, candle_ratios=True).result()
+        values = self.__stored_input_features(*stored, instrument_token=instrument_token, interval=interval)
+        # vwap depends on where its history starts and other indicators are not in the store, so they are computed
+        # from a planned fetch as without a store.
+        computed = [arg for arg in args if arg not in stored]
+        if computed:
+            data = self.get_planned_historic_data(*computed, instrument_token=instrument_token, interval=interval,
+                                                  output='arrays')
+            values.update(self.compute.latest_features(data, *computed, tail=tail).result())
+        return {name: values[name] for name in list(args) + RATIOS if name in values}
+
+    def __stored_input_features(self, *args, instrument_token, interval):
+        """
+        get_input_features from self.features: only candles after the last stored one are fetched. A new feature set
+        starts from the candles in the store's HistoryStore, or else from the planned window.
+        """
+        last = self.features.last_date(instrument_token, interval, *args)
+        if last is None:
+            self.features.update(instrument_token, interval, *args)
+            last = self.features.last_date(instrument_token, interval, *args)
+        if last is None:
+            from_date = plan_window(*args, interval=interval, calendar=self.calendar)[0]
+        else:
+            # Stored dates are in the exchange time zone, fetch ranges are naive exchange time.
+            from_date = last.replace(tzinfo=None)
+        data = self.get_historic_data(instrument_token, interval, from_date=from_date, output='arrays')
+        return self.features.latest(instrument_token, interval, *args, candles=data)
 
-        return indicator_values
+    def get_minute_candles(self, instrument_token, from_date):
+        """
+        Minute candles from a date till now. Candles are cached per instrument, and later calls only fetch the
+        candles formed since the last call. See MINUTE_CACHE_INSTRUMENTS and MINUTE_CACHE_RANGES for what is kept.
+        :param instrument_token: instrument identifier (retrieved from the instruments()) call.
+        :param from_date: Start of the range (datetime).
+        :return: List of historic data
+        """
+        with self.__minute_cache_lock:
+            cached = self.__minute_cache.get(instrument_token)
+        now = datetime.datetime.now()
+        if cached and cached[0] <= from_date and cached[1]:
+            self.metrics.record_cache('minute_candles', True)
+            start, candles, ranges = cached
+            last = candles[-1]['date']
+            fresh = self.get_historic_data(instrument_token, 'minute', from_date=last.replace(tzinfo=None),
+                                           to_date=now)
+            # The last cached candle may have been still forming, so it is replaced.
+            fresh = [c for c in fresh if c['date'] >= last]
+            if fresh:
+                candles = candles[:-1] + fresh
+        else:
+            self.metrics.record_cache('minute_candles', False)
+            start, ranges = from_date, collections.deque(maxlen=MINUTE_CACHE_RANGES)
+            candles = self.get_historic_data(instrument_token, 'minute', from_date=from_date, to_date=now)
+        ranges.append(from_date)
+        if min(ranges) > start:
+            start = min(ranges)
+            candles = [c for c in candles if c['date'].replace(tzinfo=None) >= start]
+        with self.__minute_cache_lock:
+            self.__minute_cache[instrument_token] = (start, candles, ranges)
+            self.__minute_cache.move_to_end(instrument_token)
+            while len(self.__minute_cache) > self.__minute_cache_size:
+                self.__minute_cache.popitem(last=False)
+        return [c for c in candles if c['date'].replace(tzinfo=None) >= from_date]
+
+    def clear_candle_cache(self):
+        with self.__minute_cache_lock:
+            self.__minute_cache.clear()
+
+    def get_resampled_historic_data(self, instrument_token, intervals, from_date):
+        """
+        Candles of several intervals derived locally from one minute candle fetch.
+        Candles are aligned to the session open like Kite's own candles.
+        :param instrument_token: instrument identifier (retrieved from the instruments()) call.
+        :param intervals: Intervals from valid_intervals.
+        :param from_date: Start of the range (datetime).
+        :return: Dict of interval to list of historic data
+        """
+        for interval in intervals:
+            assert interval in self.valid_intervals
+        candles = self.get_minute_candles(instrument_token, from_date)
+        return resample_all(candles, intervals, calendar=self.calendar)
+
+    def get_multi_timeframe_input_features(self, *args, instrument_token,
+                                           intervals=('minute', '5minute', '15minute', 'hour')):
+        """
+        Get input features for several intervals from a single minute candle fetch.
+        :param args: indicator strings ==> https://pypi.org/project/stockstats/
+        :param instrument_token: instrument identifier (retrieved from the instruments()) call.
+        :param intervals: Intervals from valid_intervals.
+        :return: Dict of interval to dict of latest indicator values.
+        """
+        # Every interval is resampled from the same minute candles, so vwap needs only the minute lookback.
+        windowed = [arg for arg in args if arg != 'vwap']
+        from_date = min(plan_window(*windowed, interval=interval, calendar=self.calendar)[0] for interval in intervals)
+        if 'vwap' in args:
+            from_date = min(from_date, plan_window('vwap', interval='minute', calendar=self.calendar)[0])
+        frames = self.get_resampled_historic_data(instrument_token, intervals, from_date)
+        futures = {interval: self.compute.latest_features(candles, *args, candle_ratios=True)
+                   for interval, candles in frames.items()}
+        return {interval: future.result() for interval, future in futures.items()}
 
     def get_trading_symbol(self, instrument_token):
         """
@@ -285,7 +455,8 @@ class Kite:
             pass
         return trend
 
-    def get_trend_and_input_features(self, *args, instrument_token, interval='minute', smal=30, smah=60, longsma=120):
+    def get_trend_and_input_features(self, *args, instrument_token, interval='minute', smal=30, smah=60, longsma=120,
+                                     tail=True):
         """
         Find market trend of an instrument in a given time frame
         :param instrument_token:
@@ -293,57 +464,60 @@ class Kite:
         :param smal: Lower simple moving average
         :param smah:Higher simple moving average
         :param longsma: long term sma for trend
+        :param tail: Compute only the trailing window each indicator needs.
         :return: trend
         """
         # TODO: Improve trend prediction
         assert longsma > smah > smal
-        # calculate delta for historic data
-        delta = self.__get_delta(longsma, interval=interval)
-        #     Trend Calculation
-        sma_low = 'close_' + str(smal) + '_sma'
-        sma_high = 'close_' + str(smah) + '_sma'
-        sma_long = 'close_' + str(longsma) + '_sma'
-        # TODO: Multi threading
-
-        with concurrent.ThreadPoolExecutor() as E:
-            t0 = E.submit(self.get_historic_data, instrument_token, interval, delta=delta)
-            t1 = E.submit(self.session.ltp, [instrument_token])
-            concurrent.wait([t0, t1, ])
-            ltp = t1.result().get(str(instrument_token))['last_price']
-            data = t0.result()
-            t2 = E.submit(analysis.get_candle_ratios, data, )
-            t3 = E.submit(analysis.get_indicators, *args, sma_high, sma_low, sma_long, data=data)
-            ratios = t2.result()
-            indicators = t3.result()
-            concurrent.wait([t2, t3])
-        #     absolute slope of vwap
-
-        indicator_values = {}
-        # Get the latest values
-        for indicator, value in indicators.items():
-            indicator_values[indicator] = value[-1]
-        #   Input feature calculation
-        # Get candle ratios
-        for r, value in ratios.items():
-            indicator_values[r] = value[-1]
-        # convert from percentage to actual value
-        smal = indicator_values.pop(sma_low) * 100
-        smah = indicator_values.pop(sma_high) * 100
-        longsma = indicator_values.pop(sma_long) * 100
-        pdi = indicator_values['pdi']
-        mdi = indicator_values['mdi']
-        adx = indicator_values['adx'] * 100
-
-        trend = 'None'
-        # Find trend
-        if adx >= 25:
-            if ltp > longsma:
-                if ltp > smal > smah and pdi > mdi:
-                    trend = 'Long'
-
-            if ltp < longsma:
-                if ltp < smal < smah and pdi < mdi:
-                    trend = 'Short'
+        tracer = self.tracer
+        with tracer.span('get_trend_and_input_features', instrument_token=instrument_token, interval=interval):
+            #     Trend Calculation
+            sma_low = 'close_' + str(smal) + '_sma'
+            sma_high = 'close_' + str(smah) + '_sma'
+            sma_long = 'close_' + str(longsma) + '_sma'
+            # smallest window for historic data
+            with tracer.span('plan_window'):
+                from_date, to_date, bars = plan_window(*args, sma_high, sma_low, sma_long, interval=interval,
+                                                       calendar=self.calendar)
+            # TODO: Multi threading
+
+            with concurrent.ThreadPoolExecutor() as E:
+                t0 = self.__submit(E, tracer.wrap(self.get_historic_data, 'historic_fetch'), instrument_token,
+                                   interval, from_date=from_date, to_date=to_date, output='arrays')
+                t1 = self.__submit(E, tracer.wrap(self.session.ltp, 'ltp_fetch'), [instrument_token])
+                concurrent.wait([t0, t1, ])
+                ltp = t1.result().get(str(instrument_token))['last_price']
+                data = t0.result()
+            # Both run on the compute backend. Candle ratios only read the latest candle, so running them after the
+            # indicators costs little and keeps a span per stage.
+            with tracer.span('candle_ratios', backend=self.compute.kind):
+                ratios = self.compute.latest_features(data, candle_ratios=True).result()
+            with tracer.span('indicators', backend=self.compute.kind):
+                indicators = self.compute.latest_features(data, *args, sma_high, sma_low, sma_long,
+                                                          tail=tail).result()
+            indicators.update(ratios)
+            #     absolute slope of vwap
+
+            with tracer.span('trend'):
+                indicator_values = dict(indicators)
+                # convert from percentage to actual value
+                smal = indicator_values.pop(sma_low) * 100
+                smah = indicator_values.pop(sma_high) * 100
+                longsma = indicator_values.pop(sma_long) * 100
+                pdi = indicator_values['pdi']
+                mdi = indicator_values['mdi']
+                adx = indicator_values['adx'] * 100
+
+                trend = 'None'
+                # Find trend
+                if adx >= 25:
+                    if ltp > longsma:
+                        if ltp > smal > smah and pdi > mdi:
+                            trend = 'Long'
+
+                    if ltp < longsma:
+                        if ltp < smal < smah and pdi < mdi:
+                            trend = 'Short'
 
         response = {
             'trend': trend,
@@ -356,91 +530,14 @@ class Kite:
 
         return response
 
-    @staticmethod
-    def __get_delta(min_length, interval, trading_hours=5):
-        today = datetime.datetime.today().strftime('%A')
-        D = 0
-        if today in ['Saturday', 'Sunday', 'Monday']:
-            D = 3
-        num_min_candles_per_day = trading_hours * 60
-        if interval == 'minute':
-            num_candles = num_min_candles_per_day
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 1 + D
-        if interval == '2minute':
-            num_candles = num_min_candles_per_day // 2
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 1 + D
-        if interval == '3minute':
-            num_candles = num_min_candles_per_day // 3
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 1 + D
-        if interval == '4minute':
-            num_candles = num_min_candles_per_day // 4
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 1 + D
-        if interval == '5minute':
-            num_candles = num_min_candles_per_day // 5
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 2 + D
-        if interval == '10minute':
-            num_candles = num_min_candles_per_day // 10
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 2 + D
-        if interval == '15minute':
-            num_candles = num_min_candles_per_day // 15
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 2 + D
-        if interval == '30minute':
-            num_candles = num_min_candles_per_day // 30
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 3 + D
-        if interval == 'hour':
-            num_candles = num_min_candles_per_day // 60
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 5
-        if interval == '2hour':
-            num_candles = num_min_candles_per_day // 120
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 8
-        if interval == '3hour':
-            num_candles = num_min_candles_per_day // 180
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 10
-        if interval == 'day':
-            num_candles = 1
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles) + D
-            else:
-                return 25
-        if interval == 'week':
-            num_candles = 0.2
-            if min_length > num_candles:
-                return np.ceil(min_length / num_candles)
-            else:
-                return 50
+    def __submit(self, executor, fn, *args, **kwargs):
+        """
+        Submit work to an executor, tracking the number of queued and running tasks.
+        """
+        self.metrics.add('kite_executor_pending_tasks', 1)
+        future = executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self.metrics.add('kite_executor_pending_tasks', -1))
+        return future
 
     def get_combined_historic_data_for_multiple_instruments(self, *args, interval='day', sets=1):
         """
@@ -452,12 +549,17 @@ class Kite:
         :return: List of data
         """
         historic_data = []
-        for instrument_token in args:
-            try:
-                data = self.get_historic_data(instrument_token, interval=interval, sets=sets)
-                historic_data.extend(data)
-            except Exception as e:
-                continue
+        with self.tracer.span('get_combined_historic_data_for_multiple_instruments', interval=interval,
+                              instruments=len(args)):
+            for instrument_token in args:
+                with self.tracer.span('instrument', instrument_token=instrument_token) as span:
+                    try:
+                        data = self.get_historic_data(instrument_token, interval=interval, sets=sets)
+                        historic_data.extend(data)
+                        span.set('candles', len(data))
+                    except Exception as e:
+                        span.set('error', type(e).__name__)
+                        continue
         return historic_data
 
     @property
@@ -465,6 +567,26 @@ class Kite:
         return ['minute', '2minute', '3minute', '4minute', '5minute', '10minute', '15minute', '30minute',
                 'hour', '2hour', '3hour', 'day', 'week']
 
+    @property
+    def order_gateway(self):
+        """
+        Shared OrderGateway on this session, created on first use.
+        """
+        with self.__order_gateway_lock:
+            if self.__order_gateway is None:
+                self.__order_gateway = OrderGateway(self.session, metrics=self.metrics)
+            return self.__order_gateway
+
+    @property
+    def scheduler(self):
+        """
+        Shared CandleScheduler on this session's calendar, created on first use. Call start() to run it.
+        """
+        with self.__scheduler_lock:
+            if self.__scheduler is None:
+                self.__scheduler = CandleScheduler(calendar=self.calendar, metrics=self.metrics)
+            return self.__scheduler
+
     @property
     def instruments(self):
         return self.session.instruments()
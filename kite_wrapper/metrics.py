@@ -0,0 +1,247 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a cached lookup up to a slow historical pull.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (extra or [])
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+    return '{' + body + '}'
+
+
+class Histogram:
+    """
+    Fixed bucket histogram. Bucket counts are not cumulative here; they are summed on export.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self):
+        h = Histogram(self.buckets)
+        h.counts = list(self.counts)
+        h.sum = self.sum
+        h.count = self.count
+        return h
+
+    def quantile(self, q):
+        """
+        Estimate a quantile by linear interpolation inside the bucket that holds it.
+        :param q: Quantile between 0 and 1.
+        :return: Estimated value. None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= rank and c:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Thread safe, in-process store of counters, gauges and histograms.
+    Values are keyed by metric name and a set of labels. Eg: kite_requests_total{endpoint="market.historical"}
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__counters = {}
+        self.__gauges = {}
+        self.__histograms = {}
+        self.__help = {}
+
+    def describe(self, name, text):
+        """
+        Set the help text exported for a metric.
+        """
+        self.__help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increase a counter.
+        """
+        key = _key(labels)
+        with self.__lock:
+            series = self.__counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """
+        Set a gauge.
+        """
+        key = _key(labels)
+        with self.__lock:
+            self.__gauges.setdefault(name, {})[key] = value
+
+    def add(self, name, value, **labels):
+        """
+        Add to a gauge. Use a negative value to decrease it.
+        """
+        key = _key(labels)
+        with self.__lock:
+            series = self.__gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        """
+        Record a value in a histogram.
+        """
+        key = _key(labels)
+        with self.__lock:
+            series = self.__histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Observe the wall time of a block in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def record_cache(self, cache, hit):
+        """
+        Count a cache lookup.
+        :param cache: Name of the cache.
+        :param hit: Boolean. True for a hit.
+        """
+        self.inc('cache_hits_total' if hit else 'cache_misses_total', cache=cache)
+
+    def cache_hit_ratio(self, cache):
+        """
+        :param cache: Name of the cache.
+        :return: Hit ratio, None if the cache was never used.
+        """
+        hits = self.get('cache_hits_total', cache=cache) or 0
+        misses = self.get('cache_misses_total', cache=cache) or 0
+        if hits + misses == 0:
+            return None
+        return hits / (hits + misses)
+
+    def get(self, name, **labels):
+        """
+        Current value of a single series. Histograms are returned as a copy.
+        :return: Value, or None if the series does not exist.
+        """
+        key = _key(labels)
+        with self.__lock:
+            for store in (self.__counters, self.__gauges):
+                if name in store:
+                    return store[name].get(key)
+            histogram = self.__histograms.get(name, {}).get(key)
+            return histogram.copy() if histogram else None
+
+    def snapshot(self):
+        """
+        Cheap point in time copy of every series.
+        :return: Dict {counters, gauges, histograms}, each {name: {labels tuple: value}}
+        """
+        with self.__lock:
+            return {
+                'counters': {n: dict(s) for n, s in self.__counters.items()},
+                'gauges': {n: dict(s) for n, s in self.__gauges.items()},
+                'histograms': {n: {k: h.copy() for k, h in s.items()} for n, s in self.__histograms.items()},
+            }
+
+    def reset(self):
+        with self.__lock:
+            self.__counters.clear()
+            self.__gauges.clear()
+            self.__histograms.clear()
+
+    def to_prometheus(self):
+        """
+        Export every series in the Prometheus text exposition format.
+        :return: String.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for kind, type_ in [('counters', 'counter'), ('gauges', 'gauge')]:
+            for name, series in sorted(snapshot[kind].items()):
+                if name in self.__help:
+                    lines.append('# HELP {} {}'.format(name, self.__help[name]))
+                lines.append('# TYPE {} {}'.format(name, type_))
+                for key, value in sorted(series.items()):
+                    lines.append('{}{} {}'.format(name, _format_labels(key), value))
+        for name, series in sorted(snapshot['histograms'].items()):
+            if name in self.__help:
+                lines.append('# HELP {} {}'.format(name, self.__help[name]))
+            lines.append('# TYPE {} histogram'.format(name))
+            for key, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append('{}_bucket{} {}'.format(name, _format_labels(key, [('le', bound)]), cumulative))
+                lines.append('{}_sum{} {}'.format(name, _format_labels(key), histogram.sum))
+                lines.append('{}_count{} {}'.format(name, _format_labels(key), histogram.count))
+        return '\n'.join(lines) + '\n'
+
+
+# Process wide default registry used by Kite and TechnicalAnalysisV2.
+registry = MetricsRegistry()
+
+
+def instrument_session(session, metrics):
+    """
+    Record request count, latency, errors and response bytes per endpoint for a KiteConnect session.
+    Endpoints are KiteConnect route names. Eg: market.historical, market.quote.ltp, user.profile
+    :param session: KiteConnect instance.
+    :param metrics: MetricsRegistry.
+    :return: session
+    """
+    request = session._request
+    current = threading.local()
+
+    def on_response(response, *args, **kwargs):
+        endpoint = getattr(current, 'route', 'unknown')
+        metrics.inc('kite_response_bytes_total', len(response.content), endpoint=endpoint)
+
+    def instrumented(route, method, *args, **kwargs):
+        current.route = route
+        start = time.perf_counter()
+        try:
+            return request(route, method, *args, **kwargs)
+        except Exception as e:
+            metrics.inc('kite_request_errors_total', endpoint=route, error=type(e).__name__)
+            raise e
+        finally:
+            metrics.inc('kite_requests_total', endpoint=route)
+            metrics.observe('kite_request_seconds', time.perf_counter() - start, endpoint=route)
+
+    session.reqsession.hooks.setdefault('response', []).append(on_response)
+    session._request = instrumented
+    return session
@@ -0,0 +1,225 @@
+import concurrent.futures as concurrent
+import threading
+import time
+import uuid
+
+import requests
+from kiteconnect import exceptions as kite_exceptions
+
+from .metrics import registry
+from .ratelimit import KITE_RATE_LIMITS, RateLimiter
+
+# Kite accepts alphanumeric tags of up to 20 characters.
+MAX_TAG_LENGTH = 20
+
+# Order statuses after which no more updates arrive.
+TERMINAL_STATUSES = ['COMPLETE', 'CANCELLED', 'REJECTED']
+
+# HTTP statuses worth retrying: throttled, or the gateway failed before or after forwarding the order.
+TRANSIENT_STATUS_CODES = [429, 500, 502, 503, 504]
+
+
+class OrderStatusUnknown(Exception):
+    """
+    An order request failed in a way that may have placed the order, and the order book could not confirm it either
+    way before the reconciliation deadline. The order is not sent again; look it up by tag before placing it anew.
+    """
+
+    def __init__(self, tag, error):
+        super().__init__('Status of order {} unknown after {!r}'.format(tag, error))
+        self.tag = tag
+        self.error = error
+
+
+def is_transient(error):
+    """
+    :param error: Exception raised by a kiteconnect call.
+    :return: Boolean. True if the call may succeed when retried.
+    """
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          kite_exceptions.NetworkException)):
+        return True
+    if isinstance(error, (kite_exceptions.InputException, kite_exceptions.OrderException,
+                          kite_exceptions.TokenException, kite_exceptions.PermissionException)):
+        return False
+    return isinstance(error, kite_exceptions.KiteException) and error.code in TRANSIENT_STATUS_CODES
+
+
+def is_throttled(error):
+    """
+    :return: Boolean. True if the request was refused by the rate limit, so it never reached the exchange.
+    """
+    return isinstance(error, kite_exceptions.KiteException) and error.code == 429
+
+
+class OrderGateway:
+    """
+    Places orders concurrently while staying within Kite's order rate limit.
+    Every order is sent with a unique tag. When an order request fails in a way that may have placed it (timeout,
+    500, 504) the order book is polled for its tag until a deadline, since new orders can take a while to show up.
+    The order is sent again only if the order book confirms it is not there, and the future raises
+    OrderStatusUnknown if the order book could not be read, so an order whose response was lost is not placed twice.
+
+    Usage:
+        futures = kite.order_gateway.submit_basket([dict(exchange='NSE', tradingsymbol='INFY', ...), ...])
+        order_ids = [f.result() for f in futures]
+    """
+
+    def __init__(self, session, rate=KITE_RATE_LIMITS['orders'], workers=10, retries=3, backoff=0.2,
+                 tag_prefix='kw', metrics=None, reconcile_timeout=5.0, reconcile_interval=0.5,
+                 lookup_rate=KITE_RATE_LIMITS['default']):
+        """
+        :param session: KiteConnect session.
+        :param rate: Order requests per second.
+        :param workers: Orders in flight at once.
+        :param retries: Retries of an order after a transient error.
+        :param backoff: Seconds to wait before the first retry, doubled after each retry.
+        :param reconcile_timeout: Seconds to poll the order book for an order whose request failed before
+        concluding it was not placed.
+        :param reconcile_interval: Seconds between order book polls.
+        :param lookup_rate: Order book reads per second. Reads have their own limit, so polling for orders with
+        lost responses does not slow down placing the rest of a basket.
+        :param tag_prefix: Prefix of generated tags, to tell these orders apart in the order book.
+        :param metrics: MetricsRegistry to record into. Defaults to the process wide registry.
+        """
+        assert tag_prefix.isalnum() and len(tag_prefix) < MAX_TAG_LENGTH
+        self.session = session
+        self.retries = retries
+        self.backoff = backoff
+        self.reconcile_timeout = reconcile_timeout
+        self.reconcile_interval = reconcile_interval
+        self.tag_prefix = tag_prefix
+        self.metrics = metrics or registry
+        self.__limiter = RateLimiter(rate)
+        self.__lookup_limiter = RateLimiter(lookup_rate)
+        self.__executor = concurrent.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='order')
+        self.__placed = {}
+        self.__lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def new_tag(self):
+        """
+        :return: Unique order tag.
+        """
+        return (self.tag_prefix + uuid.uuid4().hex)[:MAX_TAG_LENGTH]
+
+    def submit(self, variety='regular', tag=None, **params):
+        """
+        Queue an order.
+        :param variety: regular, amo, co, iceberg or auction.
+        :param tag: Order tag. Generated if not given. Must be unique for retries to be safe.
+        :param params: Arguments of KiteConnect.place_order. Eg: exchange, tradingsymbol, transaction_type,
+        quantity, product, order_type, price.
+        :return: Future of the order id. Raises the last error if the order could not be placed.
+        """
+        tag = tag or self.new_tag()
+        self.metrics.add('kite_order_queue_size', 1)
+        return self.__executor.submit(self.__place, variety, tag, params, time.perf_counter())
+
+    def submit_basket(self, orders):
+        """
+        Queue several orders at once.
+        :param orders: List of dicts of submit arguments.
+        :return: List of futures, in the same order.
+        """
+        return [self.submit(**order) for order in orders]
+
+    def __place(self, variety, tag, params, queued):
+        self.metrics.add('kite_order_queue_size', -1)
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                self.metrics.inc('kite_order_retries_total')
+            self.__limiter.acquire()
+            start = time.perf_counter()
+            try:
+                order_id = self.session.place_order(variety=variety, tag=tag, **params)
+            except Exception as e:
+                self.metrics.observe('kite_order_seconds', time.perf_counter() - start, stage='request')
+                if not is_transient(e):
+                    self.metrics.inc('kite_orders_total', status='rejected')
+                    raise
+                error = e
+                if is_throttled(e):
+                    continue
+                order_id = self.__reconcile(tag, e)
+                if order_id:
+                    self.metrics.inc('kite_orders_total', status='recovered')
+                    return self.__placed_order(order_id, queued)
+                continue
+            self.metrics.observe('kite_order_seconds', time.perf_counter() - start, stage='request')
+            self.metrics.inc('kite_orders_total', status='placed')
+            return self.__placed_order(order_id, queued)
+        self.metrics.inc('kite_orders_total', status='failed')
+        raise error
+
+    def __reconcile(self, tag, error):
+        """
+        Poll the order book for a tag until it shows up or reconcile_timeout passes.
+        :return: Order id, or None if the order book was read at the deadline without the order.
+        Raises OrderStatusUnknown if the last read failed.
+        """
+        deadline = time.monotonic() + self.reconcile_timeout
+        while True:
+            try:
+                order_id = self.__find(tag)
+                confirmed = True
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                order_id, confirmed = None, False
+            if order_id:
+                return order_id
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(max(min(self.reconcile_interval, deadline - time.monotonic()), 0))
+        if not confirmed:
+            self.metrics.inc('kite_orders_total', status='unknown')
+            raise OrderStatusUnknown(tag, error)
+        return None
+
+    def __placed_order(self, order_id, queued):
+        now = time.perf_counter()
+        self.metrics.observe('kite_order_seconds', now - queued, stage='placed')
+        with self.__lock:
+            self.__placed[str(order_id)] = now
+        return order_id
+
+    def __find(self, tag):
+        """
+        Order id of the order with a tag, or None.
+        """
+        self.__lookup_limiter.acquire()
+        for order in self.session.orders():
+            if order.get('tag') == tag or tag in (order.get('tags') or []):
+                return order['order_id']
+        return None
+
+    def on_order_update(self, ws, data):
+        """
+        Record the time from placing an order to each of its updates. Assign to KiteTicker.on_order_update, or
+        call with postback data.
+        :param ws: KiteTicker (unused).
+        :param data: Order update dict with order_id and status.
+        """
+        order_id = str(data.get('order_id'))
+        status = data.get('status')
+        with self.__lock:
+            placed = self.__placed.get(order_id)
+            if placed is not None and status in TERMINAL_STATUSES:
+                del self.__placed[order_id]
+        if placed is not None:
+            self.metrics.observe('kite_order_update_seconds', time.perf_counter() - placed, status=status)
+
+    def shutdown(self, wait=True):
+        """
+        Stop accepting orders.
+        :param wait: Wait for queued orders to finish.
+        """
+        self.__executor.shutdown(wait=wait)
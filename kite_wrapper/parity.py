@@ -0,0 +1,364 @@
+import argparse
+import datetime
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from .batch import BatchTechnicalAnalysis
+from .fake_server import SyntheticMarket
+from .frame import CandleFrame
+from .historical import arrays_to_frame, decode_candles
+from .precision import float32_tolerance
+from .sessions import ExchangeCalendar
+from .utils import TechnicalAnalysis
+from .v2 import TechnicalAnalysisV2
+
+# Indicators every built in engine supports, except vwap which TechnicalAnalysis (v1) lacks.
+DEFAULT_INDICATORS = ('close_20_sma', 'close_10_ema', 'rsi_6', 'rsi_14', 'wr_10', 'pdi', 'mdi', 'adx', 'kdjk',
+                      'kdjd', 'kdjj', 'vwap')
+
+RATIOS = ('r1', 'r2', 'r3', 'r4', 'r5', 'r6', 't')
+
+# Full series must match the reference to floating point noise.
+SERIES_RTOL = 1e-7
+SERIES_ATOL = 1e-7
+
+# Latest values computed on trailing windows (TechnicalAnalysisV2.get_latest_indicators) carry the truncation
+# error of planner.DEFAULT_TOLERANCE, up to 1e-4 of the input range per smoothing stage.
+LATEST_RTOL = 1e-3
+LATEST_ATOL = 1e-2
+
+
+class Engine:
+    """
+    An implementation under test. Outputs are in the units of stockstats, not divided by 100 or normalised.
+    """
+
+    def __init__(self, name, indicators, ratios=None, latest=False, strict=True, note=None, tolerance=None):
+        """
+        :param name: Engine name in reports.
+        :param indicators: Function of (candles, names) returning a dict of name to 1-D array. Names it does not
+        support are left out.
+        :param ratios: Function of (candles) returning a dict of r1..r6 and t. None if not supported.
+        :param latest: The engine returns only the latest value of each output, compared with the last reference
+        value under the LATEST tolerances.
+        :param strict: Mismatches fail the run. Engines that differ by design are reported but not failed.
+        :param note: Known differences, shown in reports.
+        :param tolerance: Function of the output name returning (rtol, atol), for engines with their own precision
+        (Eg: precision.float32_tolerance). Defaults to the SERIES or LATEST tolerances.
+        """
+        self.name = name
+        self.indicators = indicators
+        self.ratios = ratios
+        self.latest = latest
+        self.strict = strict
+        self.note = note
+        self.tolerance = tolerance
+
+    def run(self, candles, names):
+        outputs = dict(self.indicators(candles, names))
+        if self.ratios is not None:
+            outputs.update(self.ratios(candles))
+        return {k: np.atleast_1d(np.asarray(v, dtype=np.float64)) for k, v in outputs.items()}
+
+
+def _v2_indicators(candles, names):
+    return TechnicalAnalysisV2().get_indicators(*names, data=candles, to_percentage=False)
+
+
+def _v2_ratios(candles):
+    return TechnicalAnalysisV2().get_candle_ratios(data=candles, to_percentage=False)
+
+
+def _v2_latest_indicators(candles, names):
+    return TechnicalAnalysisV2().get_latest_indicators(*names, data=candles, to_percentage=False)
+
+
+def _v2_latest_ratios(candles):
+    return TechnicalAnalysisV2().get_latest_candle_ratios(data=candles, to_percentage=False)
+
+
+def _v2_float32_indicators(candles, names):
+    return TechnicalAnalysisV2(dtype=np.float32).get_indicators(*names, data=candles, to_percentage=False)
+
+
+def _v2_float32_ratios(candles):
+    return TechnicalAnalysisV2().get_candle_ratios(data=CandleFrame(candles, dtype=np.float32), to_percentage=False)
+
+
+def _v1_indicators(candles, names):
+    return TechnicalAnalysis().get_indicators(*[n for n in names if n != 'vwap'], data=candles)
+
+
+def _v1_ratios(candles):
+    return TechnicalAnalysis().get_candle_ratios(data=candles)
+
+
+def _batch_indicators(candles, names):
+    batch = BatchTechnicalAnalysis.from_candles({0: candles})
+    return {k: v[0] for k, v in batch.get_indicators(*names, to_percentage=False).items()}
+
+
+def _batch_ratios(candles):
+    batch = BatchTechnicalAnalysis.from_candles({0: candles})
+    return {k: v[0] for k, v in batch.get_candle_ratios(to_percentage=False).items()}
+
+
+def _batch_float32_indicators(candles, names):
+    batch = BatchTechnicalAnalysis.from_candles({0: candles}, dtype=np.float32)
+    return {k: v[0] for k, v in batch.get_indicators(*names, to_percentage=False).items()}
+
+
+def _batch_float32_ratios(candles):
+    batch = BatchTechnicalAnalysis.from_candles({0: candles}, dtype=np.float32)
+    return {k: v[0] for k, v in batch.get_candle_ratios(to_percentage=False).items()}
+
+
+REFERENCE = Engine('v2', _v2_indicators, _v2_ratios)
+
+ENGINES = {
+    'v2_latest': Engine('v2_latest', _v2_latest_indicators, _v2_latest_ratios, latest=True),
+    'batch': Engine('batch', _batch_indicators, _batch_ratios),
+    'v2_float32': Engine('v2_float32', _v2_float32_indicators, _v2_float32_ratios, tolerance=float32_tolerance),
+    'batch_float32': Engine('batch_float32', _batch_float32_indicators, _batch_float32_ratios,
+                            tolerance=float32_tolerance),
+    'v1': Engine('v1', _v1_indicators, _v1_ratios, strict=False,
+                 note='ratio epsilon 0.00001 instead of 0.1, no vwap'),
+}
+
+
+def _records(raw):
+    """
+    Candles in the raw Kite format as the list of dicts KiteConnect.historical_data returns.
+    """
+    return arrays_to_frame(decode_candles(raw)).frame.to_dict('records')
+
+
+def synthetic_sets(count=5, interval='minute', days=20, seed=0, end=None, calendar=None):
+    """
+    Candle sets of the fake server's synthetic market.
+    :param count: Number of instruments.
+    :param interval: Candle interval.
+    :param days: Calendar days of history.
+    :param end: Last date. Defaults to today.
+    :return: Dict of set name to list of candles.
+    """
+    calendar = calendar or ExchangeCalendar()
+    market = SyntheticMarket(seed=seed, calendar=calendar)
+    end = end or datetime.date.today()
+    to_datetime = datetime.datetime.combine(end, datetime.time(23, 59))
+    from_datetime = to_datetime - datetime.timedelta(days=days)
+    return {'synthetic_{}_{}'.format(interval, token): _records(market.candles(token, interval, from_datetime,
+                                                                               to_datetime))
+            for token in range(1, count + 1)}
+
+
+def recorded_sets(path, interval=None):
+    """
+    Candle sets of a recorded file, in the format FakeKiteServer(recorded=...) reads:
+    {instrument_token: {interval: [candles]}}, candles as raw lists or dicts.
+    :param interval: Only sets of this interval.
+    """
+    with open(path, 'r') as fp:
+        recorded = json.load(fp)
+    sets = {}
+    for token, intervals in recorded.items():
+        for name, candles in intervals.items():
+            if interval and name != interval:
+                continue
+            raw = [[c['date'], c['open'], c['high'], c['low'], c['close'], c['volume']] if isinstance(c, dict)
+                   else c for c in candles]
+            sets['recorded_{}_{}'.format(name, token)] = _records(raw)
+    return sets
+
+
+def store_sets(store, interval, instrument_tokens=None):
+    """
+    Candle sets of a HistoryStore.
+    """
+    return {'store_{}_{}'.format(interval, token): store.read(token, interval)
+            for token in instrument_tokens or store.instruments(interval)}
+
+
+def compare(values, reference, rtol, atol):
+    """
+    :return: (max absolute error, max relative error, positions where only one side is NaN, passed)
+    """
+    both = np.isfinite(values) & np.isfinite(reference)
+    nan_mismatch = int(np.count_nonzero(np.isfinite(values) != np.isfinite(reference)))
+    if not both.any():
+        return 0.0, 0.0, nan_mismatch, nan_mismatch == 0
+    error = np.abs(values[both] - reference[both])
+    scale = np.abs(reference[both])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(scale > 0, error / scale, 0.0)
+    passed = nan_mismatch == 0 and bool(np.all(error <= atol + rtol * scale))
+    return float(error.max()), float(relative.max()), nan_mismatch, passed
+
+
+class ParityReport:
+    """
+    Result of ParityHarness.run: one check per (set, engine, output) and timings per engine.
+    """
+
+    def __init__(self, checks, performance, engines):
+        self.checks = checks
+        self.performance = performance
+        self.engines = engines
+
+    @property
+    def passed(self):
+        """
+        True if every output of every strict engine matched the reference.
+        """
+        return all(c['passed'] for c in self.checks if self.engines[c['engine']].strict)
+
+    def failures(self):
+        return [c for c in self.checks if not c['passed']]
+
+    def format(self):
+        lines = ['{:<12} {:>10} {:>12} {:>9}  {}'.format('engine', 'seconds', 'peak MiB', 'speedup', 'parity')]
+        for p in self.performance:
+            engine = self.engines[p['engine']]
+            checks = [c for c in self.checks if c['engine'] == p['engine']]
+            failed = sum(not c['passed'] for c in checks)
+            parity = '-' if not checks else 'ok' if not failed else '{}/{} outputs differ{}'.format(
+                failed, len(checks), '' if engine.strict else ' (not strict)')
+            lines.append('{:<12} {:>10.4f} {:>12.2f} {:>8.2f}x  {}'.format(
+                p['engine'], p['seconds'], p['peak_bytes'] / 2 ** 20, p['speedup'], parity))
+        notes = ['{}: {}'.format(name, e.note) for name, e in self.engines.items() if e.note]
+        if notes:
+            lines.append('')
+            lines.extend(notes)
+        failures = self.failures()
+        if failures:
+            lines.append('')
+            lines.append('{:<28} {:<12} {:<14} {:>12} {:>12} {:>6}'.format('set', 'engine', 'output', 'max abs',
+                                                                            'max rel', 'nan'))
+            for c in failures:
+                lines.append('{:<28} {:<12} {:<14} {:>12.3g} {:>12.3g} {:>6}'.format(
+                    c['set'], c['engine'], c['output'], c['max_abs'], c['max_rel'], c['nan_mismatch']))
+        return '\n'.join(lines)
+
+
+class ParityHarness:
+    """
+    Runs TechnicalAnalysisV2 (the reference) and other engines on the same candle sets, checks every output
+    against the reference and measures time and peak memory of each engine.
+
+    Usage:
+        harness = ParityHarness()
+        harness.add_engine(Engine('fast', my_indicators, my_ratios))
+        report = harness.run(synthetic_sets(5))
+        print(report.format())
+    """
+
+    def __init__(self, engines=None, reference=REFERENCE, repeats=3):
+        """
+        :param engines: Engine names from ENGINES or Engine instances. Defaults to all of ENGINES.
+        :param reference: Engine the others are compared with.
+        :param repeats: Timed runs per engine and set, the fastest counts.
+        """
+        self.reference = reference
+        self.repeats = repeats
+        self.engines = {}
+        for engine in engines if engines is not None else ENGINES.values():
+            self.add_engine(ENGINES[engine] if isinstance(engine, str) else engine)
+
+    def add_engine(self, engine):
+        self.engines[engine.name] = engine
+
+    def __measure(self, engine, candle_sets, names):
+        seconds = 0.0
+        for candles in candle_sets.values():
+            times = []
+            for _ in range(self.repeats):
+                start = time.perf_counter()
+                engine.run(candles, names)
+                times.append(time.perf_counter() - start)
+            seconds += min(times)
+        tracemalloc.start()
+        try:
+            for candles in candle_sets.values():
+                engine.run(candles, names)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return seconds, peak
+
+    def run(self, candle_sets, indicators=DEFAULT_INDICATORS):
+        """
+        :param candle_sets: Dict of set name to list of candles.
+        :param indicators: indicator strings ==> https://pypi.org/project/stockstats/
+        :return: ParityReport
+        """
+        engines = dict({self.reference.name: self.reference}, **self.engines)
+        checks = []
+        for set_name, candles in candle_sets.items():
+            expected = self.reference.run(candles, indicators)
+            for engine in self.engines.values():
+                try:
+                    outputs = engine.run(candles, indicators)
+                except Exception as e:
+                    checks.append({'set': set_name, 'engine': engine.name, 'output': type(e).__name__,
+                                   'max_abs': np.nan, 'max_rel': np.nan, 'nan_mismatch': 0, 'passed': False})
+                    continue
+                for output, reference in expected.items():
+                    if output not in outputs:
+                        continue
+                    values = outputs[output]
+                    if engine.latest:
+                        rtol, atol = engine.tolerance(output) if engine.tolerance else (LATEST_RTOL, LATEST_ATOL)
+                        result = compare(values[-1:], reference[-1:], rtol, atol)
+                    elif len(values) != len(reference):
+                        result = (np.nan, np.nan, abs(len(values) - len(reference)), False)
+                    else:
+                        rtol, atol = engine.tolerance(output) if engine.tolerance else (SERIES_RTOL, SERIES_ATOL)
+                        result = compare(values, reference, rtol, atol)
+                    checks.append(dict(zip(['max_abs', 'max_rel', 'nan_mismatch', 'passed'], result),
+                                       set=set_name, engine=engine.name, output=output))
+        performance = []
+        for engine in engines.values():
+            seconds, peak = self.__measure(engine, candle_sets, indicators)
+            performance.append({'engine': engine.name, 'seconds': seconds, 'peak_bytes': peak})
+        base = performance[0]['seconds']
+        for p in performance:
+            p['speedup'] = base / p['seconds'] if p['seconds'] else float('inf')
+        return ParityReport(checks, performance, engines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check indicator engines against TechnicalAnalysisV2 and compare '
+                                                 'their speed and memory.')
+    parser.add_argument('--synthetic', type=int, default=5, help='Synthetic instruments. 0 for none.')
+    parser.add_argument('--days', type=int, default=20, help='Calendar days of synthetic history.')
+    parser.add_argument('--interval', default='minute')
+    parser.add_argument('--recorded', help='JSON file of recorded candles (FakeKiteServer format).')
+    parser.add_argument('--store', help='HistoryStore directory.')
+    parser.add_argument('--tokens', type=int, nargs='*', help='Instruments of the store. Defaults to all.')
+    parser.add_argument('--indicators', nargs='+', default=list(DEFAULT_INDICATORS))
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    candle_sets = {}
+    if args.synthetic:
+        candle_sets.update(synthetic_sets(args.synthetic, args.interval, args.days))
+    if args.recorded:
+        candle_sets.update(recorded_sets(args.recorded, args.interval))
+    if args.store:
+        from .store import HistoryStore
+        candle_sets.update(store_sets(HistoryStore(args.store), args.interval, args.tokens))
+    candle_sets = {name: candles for name, candles in candle_sets.items() if candles}
+    if not candle_sets:
+        parser.error('No candles to compare.')
+    report = ParityHarness(args.engines, repeats=args.repeats).run(candle_sets, args.indicators)
+    print('{} sets, {} candles'.format(len(candle_sets), sum(len(c) for c in candle_sets.values())))
+    print(report.format())
+    return 0 if report.passed else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
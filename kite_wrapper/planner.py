@@ -0,0 +1,171 @@
+import datetime
+import math
+import re
+
+from .sessions import ExchangeCalendar
+
+# Relative weight of history older than the fetched window that recursive indicators may ignore.
+# With weights decaying by (1 - alpha) per bar, stopping after n bars leaves at most (1 - alpha) ** n of the total
+# weight unaccounted for, so the latest value is within tolerance * (max - min of the input) of the full history value.
+DEFAULT_TOLERANCE = 1e-4
+
+# stockstats defaults
+DMI_WINDOW = 14
+ADX_WINDOW = 6
+KDJ_WINDOW = 9
+KDJ_DECAY = 2.0 / 3.0
+
+# Used when an indicator is not recognised.
+DEFAULT_WARMUP = 250
+
+# Days of history Kite.get_historic_data fetches by default, by interval. vwap is cumulative over its input, so it
+# has no warm-up: plan_window anchors it to this fixed lookback, and its value does not depend on the other indicators
+# requested with it.
+DEFAULT_LOOKBACK_DAYS = {
+    'minute': 60,
+    '2minute': 60,
+    '3minute': 100,
+    '4minute': 100,
+    '5minute': 100,
+    '10minute': 100,
+    '15minute': 200,
+    '30minute': 200,
+    'hour': 400,
+    '2hour': 400,
+    '3hour': 400,
+    'day': 2000,
+    'week': 2000,
+}
+
+
+def convergence_bars(alpha, tolerance=DEFAULT_TOLERANCE):
+    """
+    Bars needed for an exponential average to forget all but `tolerance` of its starting value.
+    :param alpha: Smoothing factor (span n => 2 / (n + 1), smoothed n => 1 / n).
+    :param tolerance: Relative weight that may be ignored.
+    :return: Number of bars.
+    """
+    if alpha >= 1:
+        return 1
+    return int(math.ceil(math.log(tolerance) / math.log(1 - alpha)))
+
+
+def warmup_bars(indicator, tolerance=DEFAULT_TOLERANCE):
+    """
+    Bars of history an indicator needs before its latest value is exact (moving windows) or within tolerance
+    (recursive smoothing).
+    :param indicator: Indicator string ==> https://pypi.org/project/stockstats/
+    :param tolerance: See DEFAULT_TOLERANCE.
+    :return: Number of bars, including the latest one.
+    """
+    match = re.match(r'^\w+?_(\d+)_(sma|ema|smma|mstd|mvar)$', indicator)
+    if match:
+        window, kind = int(match.group(1)), match.group(2)
+        if kind == 'ema':
+            return max(window, convergence_bars(2.0 / (window + 1), tolerance))
+        if kind == 'smma':
+            return max(window, convergence_bars(1.0 / window, tolerance))
+        return window
+    match = re.match(r'^rsi_(\d+)$', indicator)
+    if match:
+        window = int(match.group(1))
+        return 1 + max(window, convergence_bars(1.0 / window, tolerance))
+    match = re.match(r'^(wr|rsv)_(\d+)$', indicator)
+    if match:
+        return int(match.group(2))
+    if indicator in ['pdi', 'mdi', 'dx']:
+        return 1 + max(convergence_bars(2.0 / (DMI_WINDOW + 1), tolerance),
+                       convergence_bars(1.0 / DMI_WINDOW, tolerance))
+    if indicator in ['adx', 'adxr']:
+        steps = 1 if indicator == 'adx' else 2
+        return warmup_bars('dx', tolerance) + steps * convergence_bars(2.0 / (ADX_WINDOW + 1), tolerance)
+    match = re.match(r'^(kdjk|kdjd|kdjj)(?:_(\d+))?$', indicator)
+    if match:
+        window = int(match.group(2) or KDJ_WINDOW)
+        smoothing = convergence_bars(1 - KDJ_DECAY, tolerance)
+        return window + smoothing * (1 if match.group(1) == 'kdjk' else 2)
+    if indicator in ['vwap', 'candle_ratios']:
+        return 1
+    return DEFAULT_WARMUP
+
+
+def plan_window(*indicators, interval, end=None, calendar=None, tolerance=DEFAULT_TOLERANCE, bars=None):
+    """
+    Smallest date range that gives every requested indicator its warm-up history.
+    With vwap the range starts DEFAULT_LOOKBACK_DAYS before the end (or earlier if another indicator needs more bars
+    than the lookback holds), so vwap is the same whatever else is requested.
+    :param indicators: Indicator strings ==> https://pypi.org/project/stockstats/
+    :param interval: Candle interval.
+    :param end: End of the range. Defaults to now.
+    :param calendar: ExchangeCalendar. Defaults to NSE sessions.
+    :param tolerance: See DEFAULT_TOLERANCE.
+    :param bars: Minimum number of bars regardless of indicators.
+    :return: (from_datetime, to_datetime, bars)
+    """
+    calendar = calendar or ExchangeCalendar()
+    end = end or datetime.datetime.now()
+    needed = max([warmup_bars(i, tolerance) for i in indicators] + [bars or 1])
+    start = calendar.start_for_bars(needed, interval, end)
+    if 'vwap' in indicators:
+        start = min(start, end - datetime.timedelta(days=DEFAULT_LOOKBACK_DAYS[interval]))
+    return start, end, needed
+
+
+# Longest span in days Kite serves in one historical data request, by interval.
+MAX_DAYS_PER_REQUEST = {
+    'minute': 60,
+    '2minute': 60,
+    '3minute': 100,
+    '4minute': 100,
+    '5minute': 100,
+    '10minute': 100,
+    '15minute': 200,
+    '30minute': 200,
+    'hour': 400,
+    '2hour': 400,
+    '3hour': 400,
+    'day': 2000,
+    'week': 2000,
+}
+
+
+def split_range(from_date, to_date, interval, calendar=None):
+    """
+    Split a date range into the fewest requests Kite accepts for an interval.
+    Chunk edges are moved onto trading days, so no request starts or ends in a weekend or holiday, and chunks do
+    not overlap, so no candle is returned twice.
+    :param from_date: Start of the range (datetime).
+    :param to_date: End of the range (datetime).
+    :param interval: Candle interval.
+    :param calendar: ExchangeCalendar. Defaults to NSE sessions.
+    :return: List of (from_datetime, to_datetime) in chronological order. Empty if the range has no session.
+    """
+    calendar = calendar or ExchangeCalendar()
+    days = calendar.trading_days(from_date.date(), to_date.date())
+    if not days:
+        return []
+    intraday = interval not in ['day', 'week']
+    if intraday and to_date < calendar.session_open(days[-1]):
+        days = days[:-1]
+    if intraday and days and from_date >= calendar.session_close(days[0]):
+        days = days[1:]
+    if not days:
+        return []
+    span = datetime.timedelta(days=MAX_DAYS_PER_REQUEST[interval] - 1)
+    chunks = []
+    index = 0
+    while index < len(days):
+        first = days[index]
+        last_index = index
+        while last_index + 1 < len(days) and days[last_index + 1] - first <= span:
+            last_index += 1
+        last = days[last_index]
+        if intraday:
+            start = max(from_date, calendar.session_open(first))
+            end = min(to_date, calendar.session_close(last))
+        else:
+            start = max(from_date, datetime.datetime.combine(first, datetime.time()))
+            end = min(to_date, datetime.datetime.combine(last, datetime.time(23, 59, 59)))
+        chunks.append((start, end))
+        index = last_index + 1
+    return chunks
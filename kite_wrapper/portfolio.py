@@ -0,0 +1,273 @@
+import datetime
+import logging
+import threading
+import time
+
+from .metrics import registry
+
+
+# Fields that make a change of a position or holding: what is held and at what cost, not what it is worth now.
+POSITION_FIELDS = ['quantity', 'overnight_quantity', 'average_price', 'product']
+HOLDING_FIELDS = ['quantity', 't1_quantity', 'average_price', 'product']
+
+# Fields that move with the market on every tick, reported by diff_marks.
+MARK_FIELDS = ['last_price', 'close_price', 'value', 'pnl', 'm2m', 'unrealised', 'realised', 'day_change',
+               'day_change_percentage']
+
+# Margin fields that move with mark to market P&L. Other margin changes (cash, span, exposure ...) are changes.
+MARGIN_MARK_FIELDS = ['net', 'live_balance', 'debits', 'm2m_realised', 'm2m_unrealised']
+
+
+def _key(item, fields):
+    return tuple(item.get(f) for f in fields)
+
+
+def _diff_items(old, new, fields, compared):
+    """
+    Compare two lists of dicts matched on key fields.
+    :param compared: Fields whose difference makes an item changed.
+    :return: Dict {added, removed, changed: [(old, new)]}, or None if equal.
+    """
+    old = {_key(i, fields): i for i in old or []}
+    new = {_key(i, fields): i for i in new or []}
+    added = [new[k] for k in new if k not in old]
+    removed = [old[k] for k in old if k not in new]
+    changed = [(old[k], new[k]) for k in new if k in old and _key(old[k], compared) != _key(new[k], compared)]
+    if not (added or removed or changed):
+        return None
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def _margin_fields(margins, marks):
+    """
+    Margins of a segment with only (marks=True) or without MARGIN_MARK_FIELDS, at any depth.
+    """
+    if not isinstance(margins, dict):
+        return margins
+    return {k: _margin_fields(v, marks) for k, v in margins.items()
+            if isinstance(v, dict) or (k in MARGIN_MARK_FIELDS) == marks}
+
+
+def _diff_margins(old, new, view):
+    old = old or {}
+    return {segment: (old.get(segment), value) for segment, value in new.items()
+            if view(old.get(segment)) != view(value)}
+
+
+def diff_snapshots(old, new):
+    """
+    Changes between two portfolio snapshots: orders filled, positions closed or converted, funds added. Price and
+    P&L movement alone is not a change, see diff_marks.
+    Positions are matched on exchange, tradingsymbol and product and compared on POSITION_FIELDS, holdings are
+    matched on exchange and tradingsymbol and compared on HOLDING_FIELDS, and margins are compared by segment
+    without MARGIN_MARK_FIELDS.
+    :param old: PortfolioSnapshot or None.
+    :param new: PortfolioSnapshot.
+    :return: Dict of positions, holdings and/or margins to their changes. Empty if nothing changed.
+    """
+    diff = {}
+    positions = _diff_items(old.positions.get('net') if old else [], new.positions.get('net'),
+                            ['exchange', 'tradingsymbol', 'product'], POSITION_FIELDS)
+    if positions:
+        diff['positions'] = positions
+    holdings = _diff_items(old.holdings if old else [], new.holdings, ['exchange', 'tradingsymbol'], HOLDING_FIELDS)
+    if holdings:
+        diff['holdings'] = holdings
+    margins = _diff_margins(old.margins if old else {}, new.margins, lambda m: _margin_fields(m, False))
+    if margins:
+        diff['margins'] = margins
+    return diff
+
+
+def diff_marks(old, new):
+    """
+    Price and P&L movement between two portfolio snapshots, of the positions and holdings in both.
+    :param old: PortfolioSnapshot or None.
+    :param new: PortfolioSnapshot.
+    :return: Dict of positions, holdings and/or margins to [(old, new)] (margins {segment: (old, new)}) where
+    MARK_FIELDS or MARGIN_MARK_FIELDS moved. Empty if nothing moved.
+    """
+    if old is None:
+        return {}
+    marks = {}
+    positions = _diff_items(old.positions.get('net'), new.positions.get('net'),
+                            ['exchange', 'tradingsymbol', 'product'], MARK_FIELDS)
+    if positions and positions['changed']:
+        marks['positions'] = positions['changed']
+    holdings = _diff_items(old.holdings, new.holdings, ['exchange', 'tradingsymbol'], MARK_FIELDS)
+    if holdings and holdings['changed']:
+        marks['holdings'] = holdings['changed']
+    margins = _diff_margins(old.margins, new.margins, lambda m: _margin_fields(m, True))
+    if margins:
+        marks['margins'] = margins
+    return marks
+
+
+class PortfolioSnapshot:
+    """
+    Positions, holdings and margins fetched together. Shared between threads, do not modify.
+    """
+
+    def __init__(self, positions, holdings, margins, version):
+        """
+        :param positions: Response of KiteConnect.positions, {net, day}.
+        :param holdings: Response of KiteConnect.holdings.
+        :param margins: Response of KiteConnect.margins, by segment.
+        :param version: Number of the refresh that produced this snapshot.
+        """
+        self.positions = positions
+        self.holdings = holdings
+        self.margins = margins
+        self.version = version
+        self.timestamp = datetime.datetime.now()
+        self.fetched = time.monotonic()
+
+    @property
+    def age(self):
+        """
+        Seconds since the snapshot was fetched.
+        """
+        return time.monotonic() - self.fetched
+
+
+class PortfolioService:
+    """
+    One cached view of positions, holdings and margins for all components of a process.
+    Callers asking within min_interval of the last refresh get the cached snapshot. Concurrent refreshes are
+    merged into one set of API calls. Subscribers are called with the changes after each refresh that changed
+    something (see diff_snapshots, price ticks alone are not a change), either on demand or from a polling thread.
+
+    Usage:
+        portfolio = kite.portfolio
+        portfolio.subscribe(lambda diff, snapshot: print(diff))
+        portfolio.start(interval=2)
+        positions = portfolio.snapshot().positions
+    """
+
+    def __init__(self, session, min_interval=1.0, metrics=None):
+        """
+        :param session: KiteConnect session.
+        :param min_interval: Seconds a snapshot is served from cache.
+        :param metrics: MetricsRegistry to record into. Defaults to the process wide registry.
+        """
+        self.session = session
+        self.min_interval = min_interval
+        self.metrics = metrics or registry
+        self.__snapshot = None
+        self.__version = 0
+        self.__refreshing = False
+        self.__condition = threading.Condition()
+        self.__subscribers = []
+        self.__poller = None
+        self.__stop = threading.Event()
+
+    def snapshot(self, max_age=None):
+        """
+        Latest snapshot, refreshed if older than max_age.
+        :param max_age: Seconds. Defaults to min_interval. 0 always refreshes.
+        :return: PortfolioSnapshot. If a refresh by another thread fails, the previous snapshot (None at first).
+        """
+        max_age = self.min_interval if max_age is None else max_age
+        with self.__condition:
+            snapshot = self.__snapshot
+            if snapshot is not None and snapshot.age < max_age:
+                self.metrics.record_cache('portfolio', True)
+                return snapshot
+            if self.__refreshing:
+                # Another thread is fetching, share its result.
+                self.metrics.record_cache('portfolio', True)
+                while self.__refreshing:
+                    self.__condition.wait()
+                return self.__snapshot
+            self.__refreshing = True
+        self.metrics.record_cache('portfolio', False)
+        return self.__refresh()
+
+    def refresh(self):
+        """
+        Fetch a new snapshot now, regardless of age.
+        :return: PortfolioSnapshot
+        """
+        return self.snapshot(max_age=0)
+
+    def __refresh(self):
+        start = time.perf_counter()
+        try:
+            positions = self.session.positions()
+            holdings = self.session.holdings()
+            margins = self.session.margins()
+        except Exception:
+            with self.__condition:
+                self.__refreshing = False
+                self.__condition.notify_all()
+            raise
+        finally:
+            self.metrics.observe('kite_portfolio_refresh_seconds', time.perf_counter() - start)
+        with self.__condition:
+            self.__version += 1
+            previous = self.__snapshot
+            snapshot = PortfolioSnapshot(positions, holdings, margins, self.__version)
+            self.__snapshot = snapshot
+            self.__refreshing = False
+            self.__condition.notify_all()
+            subscribers = list(self.__subscribers)
+        diff = diff_snapshots(previous, snapshot)
+        if diff:
+            self.metrics.inc('kite_portfolio_changes_total')
+        marks = diff_marks(previous, snapshot) if any(m for _, m in subscribers) else {}
+        for callback, with_marks in subscribers:
+            if not (diff or (with_marks and marks)):
+                continue
+            try:
+                callback(dict(diff, marks=marks) if with_marks else diff, snapshot)
+            except Exception as e:
+                logging.exception(e)
+        return snapshot
+
+    def subscribe(self, callback, marks=False):
+        """
+        Call back on every change.
+        :param callback: Function of (diff, snapshot). See diff_snapshots for the diff. Runs on the refreshing
+        thread, so it should return quickly.
+        :param marks: Also call back when only prices and P&L moved, with the diff_marks of the refresh under
+        'marks' of the diff.
+        :return: Function that removes the subscription.
+        """
+        subscription = (callback, marks)
+        with self.__condition:
+            self.__subscribers.append(subscription)
+
+        def unsubscribe():
+            with self.__condition:
+                if subscription in self.__subscribers:
+                    self.__subscribers.remove(subscription)
+
+        return unsubscribe
+
+    def start(self, interval=None):
+        """
+        Refresh from a background thread.
+        :param interval: Seconds between refreshes. Defaults to min_interval.
+        """
+        if self.__poller is not None:
+            return
+        interval = max(interval or self.min_interval, self.min_interval)
+        self.__stop.clear()
+        self.__poller = threading.Thread(target=self.__poll, args=(interval,), name='portfolio', daemon=True)
+        self.__poller.start()
+
+    def stop(self):
+        if self.__poller is None:
+            return
+        self.__stop.set()
+        self.__poller.join()
+        self.__poller = None
+
+    def __poll(self, interval):
+        while not self.__stop.is_set():
+            try:
+                # Half the interval, so a refresh is not skipped for being a little too fresh.
+                self.snapshot(max_age=interval / 2)
+            except Exception as e:
+                logging.warning('Portfolio refresh failed: %s', e)
+            self.__stop.wait(interval)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+# Published Kite Connect request limits (requests per second).
+# https://kite.trade/docs/connect/v3/exceptions/#api-rate-limit
+KITE_RATE_LIMITS = {
+    'quote': 1,
+    'historical': 3,
+    'orders': 10,
+    'default': 10,
+}
+
+
+def endpoint_category(path, method='GET'):
+    """
+    Map a Kite API request to its rate limit category. Only placing, modifying and cancelling orders count against
+    the order limit, reading the order book falls under the default one.
+    :param path: URL path of the request. Eg: /instruments/historical/256265/minute
+    :param method: HTTP method of the request.
+    :return: One of the keys of KITE_RATE_LIMITS.
+    """
+    if path.startswith('/quote'):
+        return 'quote'
+    if path.startswith('/instruments/historical'):
+        return 'historical'
+    if path.startswith('/orders') and method != 'GET':
+        return 'orders'
+    return 'default'
+
+
+class RateLimiter:
+    """
+    Thread safe token bucket limiter.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: Tokens added per second.
+        :param burst: Bucket capacity. Defaults to rate.
+        """
+        assert rate > 0
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.__tokens = self.burst
+        self.__last = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def __refill(self):
+        now = time.monotonic()
+        self.__tokens = min(self.burst, self.__tokens + (now - self.__last) * self.rate)
+        self.__last = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens from the bucket without waiting.
+        :param tokens: Number of tokens.
+        :return: Boolean. True if tokens were taken.
+        """
+        with self.__lock:
+            self.__refill()
+            if self.__tokens >= tokens:
+                self.__tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until tokens are available.
+        :param tokens: Number of tokens.
+        :param timeout: Maximum seconds to wait. None waits forever.
+        :return: Boolean. False if timed out.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.__lock:
+                self.__refill()
+                if self.__tokens >= tokens:
+                    self.__tokens -= tokens
+                    return True
+                wait = (tokens - self.__tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
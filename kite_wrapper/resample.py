@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from .sessions import ExchangeCalendar, INTERVAL_MINUTES
+
+_NS_PER_MINUTE = 60 * 10 ** 9
+
+
+def bucket_starts(minutes, interval, calendar=None):
+    """
+    Start of the candle each minute belongs to, aligned the way Kite aligns candles: intraday buckets count from the
+    session open, day candles start at midnight and week candles on Monday midnight.
+    :param minutes: int64 array of minutes since epoch, in exchange local time.
+    :param interval: Target interval.
+    :param calendar: ExchangeCalendar. Defaults to NSE sessions.
+    :return: int64 array of bucket start minutes.
+    """
+    calendar = calendar or ExchangeCalendar()
+    minutes = np.asarray(minutes, dtype=np.int64)
+    midnight = minutes - minutes % 1440
+    if interval == 'day':
+        return midnight
+    if interval == 'week':
+        # 1970-01-01 was a Thursday, so Mondays are 4 days after a multiple of 7 days.
+        days = midnight // 1440
+        return (days - (days - 4) % 7) * 1440
+    step = INTERVAL_MINUTES[interval]
+    open_offset = calendar.open_time.hour * 60 + calendar.open_time.minute
+    return midnight + open_offset + ((minutes - midnight - open_offset) // step) * step
+
+
+def resample(candles, interval, calendar=None):
+    """
+    Aggregate finer candles (usually minute) into a coarser interval.
+    :param candles: List of candles as returned by Kite.get_historic_data, oldest first.
+    :param interval: Target interval, one of Kite.valid_intervals.
+    :param calendar: ExchangeCalendar. Defaults to NSE sessions.
+    :return: List of candles in the same format.
+    """
+    if not candles:
+        return []
+    frame = pd.DataFrame(candles)
+    dates = pd.DatetimeIndex(frame['date'])
+    tz = dates.tz
+    local = dates.tz_localize(None) if tz is not None else dates
+    minutes = local.values.astype('datetime64[ns]').astype(np.int64) // _NS_PER_MINUTE
+    keys = bucket_starts(minutes, interval, calendar)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    columns = {
+        'open': frame['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(frame['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(frame['low'].to_numpy(), starts),
+        'close': frame['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(frame['volume'].to_numpy(), starts),
+    }
+    if 'oi' in frame:
+        columns['oi'] = frame['oi'].to_numpy()[ends]
+    stamps = pd.DatetimeIndex(keys[starts] * _NS_PER_MINUTE)
+    if tz is not None:
+        stamps = stamps.tz_localize(tz)
+    stamps = stamps.to_pydatetime()
+    names = list(columns.keys())
+    values = [columns[n].tolist() for n in names]
+    return [dict(zip(['date'] + names, row)) for row in zip(stamps, *values)]
+
+
+def resample_all(candles, intervals, calendar=None):
+    """
+    Derive several intervals from one set of base candles.
+    :return: Dict of interval to list of candles.
+    """
+    return {interval: candles if interval == 'minute' else resample(candles, interval, calendar)
+            for interval in intervals}
@@ -0,0 +1,300 @@
+import concurrent.futures as concurrent
+import datetime
+import logging
+import threading
+
+from .metrics import registry
+from .sessions import ExchangeCalendar, INTERVAL_MINUTES
+from .shm import IST
+
+# Seconds from a candle close until its cycle latency is judged, up to a few intraday candles.
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+
+# What to do when a cycle is due while the previous cycle of the same job still runs.
+OVERRUN_POLICIES = ['skip', 'merge']
+
+
+def exchange_now():
+    """
+    Current time in exchange local time (IST), naive like the rest of the wrapper.
+    """
+    return datetime.datetime.now(IST).replace(tzinfo=None)
+
+
+def session_candle_closes(calendar, interval, date):
+    """
+    Times at which candles of an interval close during one session, the way Kite aligns them.
+    :param calendar: ExchangeCalendar.
+    :param interval: Candle interval.
+    :param date: Session date.
+    :return: List of datetimes. Empty on non trading days, and for week candles except on the last trading day of
+    the week.
+    """
+    if not calendar.is_trading_day(date):
+        return []
+    close = calendar.session_close(date)
+    if interval == 'day':
+        return [close]
+    if interval == 'week':
+        following = calendar.next_trading_day(date)
+        return [close] if following.isocalendar()[:2] != date.isocalendar()[:2] else []
+    step = datetime.timedelta(minutes=INTERVAL_MINUTES[interval])
+    closes = []
+    moment = calendar.session_open(date) + step
+    while moment < close:
+        closes.append(moment)
+        moment += step
+    closes.append(close)
+    return closes
+
+
+def next_candle_close(calendar, interval, after):
+    """
+    First candle close strictly after a moment.
+    :param calendar: ExchangeCalendar.
+    :param interval: Candle interval.
+    :param after: datetime.
+    :return: datetime.
+    """
+    day = after.date()
+    if not calendar.is_trading_day(day):
+        day = calendar.next_trading_day(day)
+    while True:
+        for close in session_candle_closes(calendar, interval, day):
+            if close > after:
+                return close
+        day = calendar.next_trading_day(day)
+
+
+class CycleReport:
+    """
+    Outcome of one cycle of a scheduled job.
+    """
+
+    def __init__(self, job, close, deadline, started, finished, results, errors, merged=0):
+        """
+        :param job: Job name.
+        :param close: Candle close the cycle ran for.
+        :param deadline: Next candle close, by which the cycle should be done.
+        :param started: When the cycle started.
+        :param finished: When the last task finished.
+        :param results: Dict of instrument token (None for jobs without instruments) to the job's return value.
+        :param errors: Dict of instrument token to the exception raised.
+        :param merged: Number of overrun cycles folded into this one.
+        """
+        self.job = job
+        self.close = close
+        self.deadline = deadline
+        self.started = started
+        self.finished = finished
+        self.results = results
+        self.errors = errors
+        self.merged = merged
+
+    @property
+    def latency(self):
+        """
+        Seconds from the candle close to the end of the cycle.
+        """
+        return (self.finished - self.close).total_seconds()
+
+    @property
+    def missed(self):
+        return self.finished > self.deadline
+
+
+class _Job:
+
+    def __init__(self, name, fn, interval, instruments, on_cycle):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.instruments = instruments
+        self.on_cycle = on_cycle
+        self.next_close = None
+        self.running = False
+        self.pending = None
+        self.merged = 0
+
+
+class CandleScheduler:
+    """
+    Runs jobs right after each candle of their interval closes, during exchange sessions only.
+    A cycle runs the job once per instrument on a shared pool of workers. A cycle due while the previous one of the
+    same job is still running is skipped, or merged into a single catch up cycle for the latest close, so slow
+    cycles never pile up.
+    Latency from the candle close to the end of each cycle is recorded in kite_scheduler_cycle_seconds and cycles
+    that end after the next candle close count in kite_scheduler_deadline_misses_total.
+
+    Usage:
+        scheduler = kite.scheduler
+        scheduler.add(lambda token, close: kite.get_trend_and_input_features('rsi_6', instrument_token=token),
+                      interval='5minute', instruments=[256265, 260105], on_cycle=handle)
+        scheduler.start()
+    """
+
+    def __init__(self, calendar=None, workers=4, delay=1.0, overrun='skip', metrics=None, clock=None):
+        """
+        :param calendar: ExchangeCalendar. Defaults to NSE sessions.
+        :param workers: Instruments processed at once, across all jobs.
+        :param delay: Seconds after the close before a cycle starts, so the closed candle is served by Kite.
+        :param overrun: skip or merge. See OVERRUN_POLICIES.
+        :param metrics: MetricsRegistry to record into. Defaults to the process wide registry.
+        :param clock: Function returning the current exchange local time. Defaults to exchange_now.
+        """
+        assert overrun in OVERRUN_POLICIES
+        self.calendar = calendar or ExchangeCalendar()
+        self.delay = datetime.timedelta(seconds=delay)
+        self.overrun = overrun
+        self.metrics = metrics or registry
+        self.clock = clock or exchange_now
+        self.__workers = workers
+        self.__executor = None
+        self.__jobs = []
+        self.__lock = threading.Lock()
+        self.__wake = threading.Condition(self.__lock)
+        self.__stopped = False
+        self.__thread = None
+
+    def add(self, fn, interval='minute', instruments=None, name=None, on_cycle=None):
+        """
+        Schedule a job.
+        :param fn: Function of (instrument_token, close), or of (close) when instruments is None. close is the
+        datetime of the candle close the cycle runs for.
+        :param interval: Candle interval, one of Kite.valid_intervals.
+        :param instruments: Instrument tokens to run the job for.
+        :param name: Job name for metrics. Defaults to the function name.
+        :param on_cycle: Function of (CycleReport), called after each cycle on a worker thread.
+        """
+        assert interval in INTERVAL_MINUTES, 'Invalid interval: {}'.format(interval)
+        job = _Job(name or getattr(fn, '__name__', 'job'), fn, interval,
+                   list(instruments) if instruments is not None else None, on_cycle)
+        with self.__lock:
+            job.next_close = next_candle_close(self.calendar, interval, self.clock())
+            self.__jobs.append(job)
+            self.__wake.notify_all()
+        return job.name
+
+    def run(self):
+        """
+        Run cycles on this thread until stop is called.
+        """
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = concurrent.ThreadPoolExecutor(max_workers=self.__workers,
+                                                                thread_name_prefix='scheduler')
+            while not self.__stopped:
+                if not self.__jobs:
+                    self.__wake.wait()
+                    continue
+                job = min(self.__jobs, key=lambda j: j.next_close)
+                wait = (job.next_close + self.delay - self.clock()).total_seconds()
+                if wait > 0:
+                    # Woken early when jobs are added or on stop, then the next job is picked again.
+                    self.__wake.wait(wait)
+                    continue
+                close = job.next_close
+                job.next_close = next_candle_close(self.calendar, job.interval, close)
+                while job.next_close + self.delay <= self.clock():
+                    # Woke up after several closes (Eg: the host was suspended), only the latest one is run.
+                    self.metrics.inc('kite_scheduler_cycles_total', job=job.name, status='skipped')
+                    close = job.next_close
+                    job.next_close = next_candle_close(self.calendar, job.interval, close)
+                self.__due(job, close)
+
+    def start(self):
+        """
+        Run cycles on a background thread.
+        """
+        if self.__thread is not None:
+            return
+        with self.__lock:
+            self.__stopped = False
+        self.__thread = threading.Thread(target=self.run, name='scheduler', daemon=True)
+        self.__thread.start()
+
+    def stop(self, wait=True):
+        """
+        Stop starting cycles.
+        :param wait: Wait for running cycles to finish.
+        """
+        with self.__lock:
+            self.__stopped = True
+            self.__wake.notify_all()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=wait)
+            self.__executor = None
+
+    def __due(self, job, close):
+        """
+        A cycle is due. Called with the lock held.
+        """
+        if job.running:
+            self.metrics.inc('kite_scheduler_overruns_total', job=job.name)
+            if self.overrun == 'merge':
+                job.pending = close
+                job.merged += 1
+            else:
+                self.metrics.inc('kite_scheduler_cycles_total', job=job.name, status='skipped')
+            return
+        self.__start_cycle(job, close, 0)
+
+    def __start_cycle(self, job, close, merged):
+        """
+        Submit one task per instrument. Called with the lock held.
+        """
+        job.running = True
+        started = self.clock()
+        deadline = next_candle_close(self.calendar, job.interval, close)
+        self.metrics.observe('kite_scheduler_start_delay_seconds', (started - close).total_seconds(),
+                             buckets=LATENCY_BUCKETS, job=job.name)
+        instruments = job.instruments if job.instruments is not None else [None]
+        results, errors = {}, {}
+        remaining = [len(instruments)]
+        state = threading.Lock()
+
+        def task(instrument_token):
+            try:
+                if instrument_token is None:
+                    results[None] = job.fn(close)
+                else:
+                    results[instrument_token] = job.fn(instrument_token, close)
+            except Exception as e:
+                errors[instrument_token] = e
+                logging.warning('Scheduled job %s failed for %s: %s', job.name, instrument_token, e)
+            with state:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.__finish(job, CycleReport(job.name, close, deadline, started, self.clock(), results, errors,
+                                               merged))
+
+        if not instruments:
+            self.__executor.submit(self.__finish, job, CycleReport(job.name, close, deadline, started, started, {},
+                                                                   {}, merged))
+            return
+        for instrument_token in instruments:
+            self.__executor.submit(task, instrument_token)
+
+    def __finish(self, job, report):
+        status = 'missed' if report.missed else 'ok'
+        self.metrics.observe('kite_scheduler_cycle_seconds', report.latency, buckets=LATENCY_BUCKETS, job=job.name)
+        self.metrics.inc('kite_scheduler_cycles_total', job=job.name, status=status)
+        if report.missed:
+            self.metrics.inc('kite_scheduler_deadline_misses_total', job=job.name)
+        if report.errors:
+            self.metrics.inc('kite_scheduler_errors_total', len(report.errors), job=job.name)
+        if job.on_cycle is not None:
+            try:
+                job.on_cycle(report)
+            except Exception as e:
+                logging.exception(e)
+        with self.__lock:
+            job.running = False
+            if job.pending is not None and not self.__stopped:
+                close, merged = job.pending, job.merged
+                job.pending, job.merged = None, 0
+                self.__start_cycle(job, close, merged)
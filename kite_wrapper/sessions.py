@@ -0,0 +1,213 @@
+import datetime
+import json
+import logging
+import math
+import os
+
+SESSION_OPEN = datetime.time(9, 15)
+SESSION_CLOSE = datetime.time(15, 30)
+SESSION_MINUTES = 375
+
+# Candle length in minutes. Kite aligns intraday candles to the session open, so the last candle of a session
+# can be shorter (Eg: hour candles start at 09:15, 10:15 ... 15:15).
+INTERVAL_MINUTES = {
+    'minute': 1,
+    '2minute': 2,
+    '3minute': 3,
+    '4minute': 4,
+    '5minute': 5,
+    '10minute': 10,
+    '15minute': 15,
+    '30minute': 30,
+    'hour': 60,
+    '2hour': 120,
+    '3hour': 180,
+    'day': SESSION_MINUTES,
+    'week': SESSION_MINUTES,
+}
+
+# NSE/BSE equity segment trading holidays (weekday closures only).
+# Extend with ExchangeCalendar(holidays=...), add_holidays or a HOLIDAYS_ENV file for years not listed here.
+NSE_HOLIDAYS = {
+    # 2024
+    datetime.date(2024, 1, 22), datetime.date(2024, 1, 26), datetime.date(2024, 3, 8), datetime.date(2024, 3, 25),
+    datetime.date(2024, 3, 29), datetime.date(2024, 4, 11), datetime.date(2024, 4, 17), datetime.date(2024, 5, 1),
+    datetime.date(2024, 5, 20), datetime.date(2024, 6, 17), datetime.date(2024, 7, 17), datetime.date(2024, 8, 15),
+    datetime.date(2024, 10, 2), datetime.date(2024, 11, 1), datetime.date(2024, 11, 15), datetime.date(2024, 11, 20),
+    datetime.date(2024, 12, 25),
+    # 2025
+    datetime.date(2025, 2, 26), datetime.date(2025, 3, 14), datetime.date(2025, 3, 31), datetime.date(2025, 4, 10),
+    datetime.date(2025, 4, 14), datetime.date(2025, 4, 18), datetime.date(2025, 5, 1), datetime.date(2025, 8, 15),
+    datetime.date(2025, 8, 27), datetime.date(2025, 10, 2), datetime.date(2025, 10, 21), datetime.date(2025, 10, 22),
+    datetime.date(2025, 11, 5), datetime.date(2025, 12, 25),
+}
+
+# JSON file of extra holidays (list of YYYY-MM-DD dates) added to NSE_HOLIDAYS by default, so the calendar can be
+# refreshed for a new year without a release.
+HOLIDAYS_ENV = 'KITE_HOLIDAYS'
+
+# Years after the last known holiday year already warned about, to warn once per process.
+_warned_years = set()
+
+
+def load_holidays(path):
+    """
+    :param path: JSON file with a list of YYYY-MM-DD dates.
+    :return: Set of dates.
+    """
+    with open(path, 'r') as fp:
+        return {datetime.datetime.strptime(d, '%Y-%m-%d').date() for d in json.load(fp)}
+
+
+def default_holidays():
+    """
+    NSE_HOLIDAYS plus the dates in the HOLIDAYS_ENV file, if set.
+    """
+    holidays = set(NSE_HOLIDAYS)
+    if os.environ.get(HOLIDAYS_ENV):
+        holidays.update(load_holidays(os.environ[HOLIDAYS_ENV]))
+    return holidays
+
+
+class ExchangeCalendar:
+    """
+    Trading sessions of an exchange: weekdays minus holidays, each from open to close in exchange local time.
+    All datetimes are naive and in exchange local time (IST for NSE/BSE), like the rest of the wrapper.
+    """
+
+    def __init__(self, holidays=None, open_time=SESSION_OPEN, close_time=SESSION_CLOSE, known_until=None,
+                 strict=False):
+        """
+        :param holidays: Iterable of holiday dates. Defaults to default_holidays().
+        :param open_time: Session open time.
+        :param close_time: Session close time.
+        :param known_until: Last year the holidays are complete for. Defaults to the year of the latest holiday.
+        :param strict: Raise ValueError for dates after known_until. Otherwise weekdays of those years are treated
+        as trading days with a warning.
+        """
+        self.holidays = default_holidays() if holidays is None else set(holidays)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.known_until = known_until or max([d.year for d in self.holidays], default=None)
+        self.strict = strict
+
+    @property
+    def session_minutes(self):
+        today = datetime.date.today()
+        span = datetime.datetime.combine(today, self.close_time) - datetime.datetime.combine(today, self.open_time)
+        return int(span.total_seconds() // 60)
+
+    def add_holidays(self, *dates):
+        self.holidays.update(dates)
+        if dates and self.known_until is not None:
+            self.known_until = max([self.known_until] + [d.year for d in dates])
+
+    def is_trading_day(self, date):
+        if self.known_until is not None and date.year > self.known_until:
+            self.__unknown_year(date.year)
+        return date.weekday() < 5 and date not in self.holidays
+
+    def __unknown_year(self, year):
+        message = 'Exchange holidays are known until {}, not for {}. Add them with add_holidays or a {} file.'.format(
+            self.known_until, year, HOLIDAYS_ENV)
+        if self.strict:
+            raise ValueError(message)
+        if year not in _warned_years:
+            _warned_years.add(year)
+            logging.warning(message + ' Treating every weekday of %s as a trading day.', year)
+
+    def trading_days(self, from_date, to_date):
+        """
+        Trading days between two dates (inclusive).
+        :return: List of dates.
+        """
+        days = []
+        day = from_date
+        while day <= to_date:
+            if self.is_trading_day(day):
+                days.append(day)
+            day += datetime.timedelta(days=1)
+        return days
+
+    def previous_trading_day(self, date):
+        """
+        Latest trading day strictly before a date.
+        """
+        day = date - datetime.timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= datetime.timedelta(days=1)
+        return day
+
+    def next_trading_day(self, date):
+        """
+        Earliest trading day strictly after a date.
+        """
+        day = date + datetime.timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += datetime.timedelta(days=1)
+        return day
+
+    def session_open(self, date):
+        return datetime.datetime.combine(date, self.open_time)
+
+    def session_close(self, date):
+        return datetime.datetime.combine(date, self.close_time)
+
+    def is_open(self, moment):
+        """
+        :param moment: datetime.
+        :return: Boolean. True if the market is open at that moment.
+        """
+        return self.is_trading_day(moment.date()) and \
+            self.session_open(moment.date()) <= moment < self.session_close(moment.date())
+
+    def candles_per_session(self, interval):
+        """
+        Number of candles of an intraday interval in one full session, counting a shorter last candle.
+        """
+        if interval in ['day', 'week']:
+            return 1
+        return int(math.ceil(self.session_minutes / INTERVAL_MINUTES[interval]))
+
+    def candles_until(self, moment, interval):
+        """
+        Number of completed or forming candles of a session up to a moment.
+        """
+        date = moment.date()
+        if not self.is_trading_day(date) or moment <= self.session_open(date):
+            return 0
+        if interval in ['day', 'week']:
+            return 1
+        elapsed = (min(moment, self.session_close(date)) - self.session_open(date)).total_seconds() / 60
+        return int(math.ceil(elapsed / INTERVAL_MINUTES[interval]))
+
+    def start_for_bars(self, bars, interval, end):
+        """
+        Latest start time for a range that ends at `end` and still holds `bars` candles.
+        :param bars: Number of candles needed.
+        :param interval: Candle interval.
+        :param end: End of the range (datetime).
+        :return: datetime. A session open for intraday intervals, midnight for day and week.
+        """
+        bars = max(int(bars), 1)
+        if interval == 'week':
+            monday = end.date() - datetime.timedelta(days=end.weekday())
+            weeks = 0
+            while True:
+                if self.trading_days(monday, monday + datetime.timedelta(days=4)):
+                    weeks += 1
+                if weeks >= bars:
+                    return datetime.datetime.combine(monday, datetime.time())
+                monday -= datetime.timedelta(days=7)
+        per_session = self.candles_per_session(interval)
+        day = end.date()
+        count = self.candles_until(end, interval)
+        if count == 0 or not self.is_trading_day(day):
+            day = self.previous_trading_day(day)
+            count = per_session
+        while count < bars:
+            day = self.previous_trading_day(day)
+            count += per_session
+        if interval == 'day':
+            return datetime.datetime.combine(day, datetime.time())
+        return self.session_open(day)
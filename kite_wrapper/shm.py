@@ -0,0 +1,382 @@
+import datetime
+import logging
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Kite timestamps are in IST. Naive datetimes are taken to be IST too.
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+
+CANDLE_FIELDS = ['date', 'open', 'high', 'low', 'close', 'volume', 'oi']
+
+# Tick fields kept per instrument, from KiteTicker quote/full mode ticks.
+QUOTE_FIELDS = ['timestamp', 'last_price', 'volume_traded', 'oi', 'total_buy_quantity', 'total_sell_quantity']
+
+# int64 header in front of every segment: sequence, rows written, capacity, width.
+HEADER_SIZE = 4
+SEQUENCE, WRITTEN, CAPACITY, WIDTH = range(HEADER_SIZE)
+
+# Default ring length: 60 sessions of minute candles.
+DEFAULT_CAPACITY = 375 * 60
+
+
+def _attach(name):
+    """
+    Attach to an existing segment without letting this process remove it at exit.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the segment with the resource tracker, which unlinks it when this
+        # process exits even though the publisher still owns it. Processes started by the publisher through
+        # multiprocessing share its tracker, so they should attach on Python 3.13+ or expect a tracker warning.
+        segment = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        except Exception:
+            pass
+        return segment
+
+
+def _epoch(date):
+    if isinstance(date, datetime.datetime):
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=IST)
+        return date.timestamp()
+    return float(date or 0)
+
+
+class _Segment:
+    """
+    Shared memory block of an int64 header and a float64 table, guarded by a sequence lock.
+    One process writes. The writer makes the sequence odd while it writes and even when done, and readers retry
+    when they see an odd sequence or a change across their copy. Readers never block the writer.
+    """
+
+    def __init__(self, name, rows=None, width=None, create=False):
+        if create:
+            size = 8 * (HEADER_SIZE + rows * width)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = _attach(name)
+        self.header = np.ndarray((HEADER_SIZE,), dtype=np.int64, buffer=self.shm.buf)
+        if create:
+            self.header[:] = [0, 0, rows, width]
+        rows, width = int(self.header[CAPACITY]), int(self.header[WIDTH])
+        self.table = np.ndarray((rows, width), dtype=np.float64, buffer=self.shm.buf, offset=8 * HEADER_SIZE)
+        self.owner = create
+
+    def begin(self):
+        self.header[SEQUENCE] += 1
+
+    def end(self):
+        self.header[SEQUENCE] += 1
+
+    def consistent(self, copy, spin=1000):
+        """
+        Run copy() until it sees no concurrent write.
+        :param copy: Function returning a copy of the data.
+        :param spin: Attempts before giving up.
+        """
+        for _ in range(spin):
+            before = int(self.header[SEQUENCE])
+            if before % 2:
+                time.sleep(0)
+                continue
+            value = copy()
+            if int(self.header[SEQUENCE]) == before:
+                return value
+        raise TimeoutError('Shared memory segment {} kept changing while reading'.format(self.shm.name))
+
+    def close(self):
+        # Views must go before the buffer can be released.
+        self.header = None
+        self.table = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class CandleRing:
+    """
+    Ring buffer of the latest candles of one instrument in shared memory.
+    Rows are date (epoch seconds), open, high, low, close, volume and oi.
+    """
+
+    def __init__(self, name, capacity=DEFAULT_CAPACITY, create=False):
+        """
+        :param name: Segment name.
+        :param capacity: Candles kept. Used only when creating.
+        :param create: Create the segment (publisher) instead of attaching to it (reader).
+        """
+        self.name = name
+        self.__segment = _Segment(name, capacity, len(CANDLE_FIELDS), create=create)
+
+    @property
+    def capacity(self):
+        return int(self.__segment.header[CAPACITY])
+
+    def __len__(self):
+        return min(int(self.__segment.header[WRITTEN]), self.capacity)
+
+    def last_date(self):
+        """
+        :return: Epoch seconds of the latest candle, or None if empty.
+        """
+        segment = self.__segment
+
+        def copy():
+            written = int(segment.header[WRITTEN])
+            return float(segment.table[(written - 1) % self.capacity, 0]) if written else None
+
+        return segment.consistent(copy)
+
+    def write(self, candles):
+        """
+        Append candles, oldest first. A candle with the date of the latest one replaces it, so a forming candle can
+        be updated in place.
+        :param candles: List of candles as returned by Kite.get_historic_data.
+        """
+        if not candles:
+            return
+        rows = np.array([[_epoch(c['date']), c['open'], c['high'], c['low'], c['close'], c['volume'],
+                          c.get('oi', 0)] for c in candles], dtype=np.float64)
+        last = self.last_date()
+        if last is not None:
+            rows = rows[rows[:, 0] >= last]
+        if not len(rows):
+            return
+        segment = self.__segment
+        capacity = self.capacity
+        rows = rows[-capacity:]
+        segment.begin()
+        try:
+            written = int(segment.header[WRITTEN])
+            if written and rows[0, 0] == segment.table[(written - 1) % capacity, 0]:
+                written -= 1
+            index = (written + np.arange(len(rows))) % capacity
+            segment.table[index] = rows
+            segment.header[WRITTEN] = written + len(rows)
+        finally:
+            segment.end()
+
+    def read(self, count=None):
+        """
+        Consistent copy of the latest candles.
+        :param count: Number of candles. Defaults to all held.
+        :return: float64 array, one row per candle, oldest first, columns as CANDLE_FIELDS.
+        """
+        segment = self.__segment
+
+        def copy():
+            written = int(segment.header[WRITTEN])
+            held = min(written, self.capacity)
+            n = held if count is None else min(count, held)
+            index = (written - n + np.arange(n)) % self.capacity
+            return segment.table[index]
+
+        return segment.consistent(copy)
+
+    def candles(self, count=None):
+        """
+        Latest candles in the format of Kite.get_historic_data.
+        """
+        rows = self.read(count)
+        return [dict(zip(CANDLE_FIELDS, [datetime.datetime.fromtimestamp(row[0], IST)] + row[1:].tolist()))
+                for row in rows]
+
+    def view(self):
+        """
+        Zero copy, read-only view of the ring storage and the number of candles written so far. Candle k (counting
+        from the first ever written) is at row k % capacity. The view may change while it is used; read() gives a
+        consistent copy. Drop the view before close().
+        :return: (array, written)
+        """
+        table = self.__segment.table.view()
+        table.flags.writeable = False
+        return table, int(self.__segment.header[WRITTEN])
+
+    def close(self):
+        """
+        Detach. The creating process also removes the segment.
+        """
+        self.__segment.close()
+
+
+class QuoteBoard:
+    """
+    Latest tick of many instruments in shared memory, one sequence locked slot per instrument.
+    """
+
+    def __init__(self, name, tokens=None, create=False):
+        """
+        :param name: Segment name.
+        :param tokens: Instrument tokens. Used only when creating.
+        :param create: Create the segment (publisher) instead of attaching to it (reader).
+        """
+        self.name = name
+        width = 2 + len(QUOTE_FIELDS)
+        self.__segment = _Segment(name, len(tokens) if create else None, width, create=create)
+        table = self.__segment.table
+        if create:
+            table[:] = 0
+            table[:, 0] = tokens
+        self.__slots = {int(token): slot for slot, token in enumerate(table[:, 0])}
+
+    @property
+    def tokens(self):
+        return list(self.__slots.keys())
+
+    def update(self, ticks):
+        """
+        Store ticks. Ticks of unknown instruments are ignored.
+        :param ticks: List of tick dicts as delivered to KiteTicker.on_ticks.
+        """
+        table = self.__segment.table
+        for tick in ticks:
+            slot = self.__slots.get(tick.get('instrument_token'))
+            if slot is None:
+                continue
+            values = [_epoch(tick.get('exchange_timestamp') or tick.get('timestamp') or datetime.datetime.now(IST))] + \
+                     [tick.get(f) or 0 for f in QUOTE_FIELDS[1:]]
+            # Column 1 is the slot's own sequence.
+            table[slot, 1] += 1
+            table[slot, 2:] = values
+            table[slot, 1] += 1
+
+    def get(self, instrument_token, spin=1000):
+        """
+        Consistent copy of the latest tick of an instrument.
+        :return: Dict of QUOTE_FIELDS, timestamp as datetime. None if no tick arrived yet.
+        """
+        slot = self.__slots[int(instrument_token)]
+        table = self.__segment.table
+        for _ in range(spin):
+            before = table[slot, 1]
+            if before % 2:
+                time.sleep(0)
+                continue
+            values = table[slot, 2:].tolist()
+            if table[slot, 1] == before:
+                if before == 0:
+                    return None
+                values[0] = datetime.datetime.fromtimestamp(values[0], IST)
+                return dict(zip(QUOTE_FIELDS, values), instrument_token=int(instrument_token))
+        raise TimeoutError('Quote of {} kept changing while reading'.format(instrument_token))
+
+    def close(self):
+        self.__slots = {}
+        self.__segment.close()
+
+
+def segment_names(prefix, instrument_tokens, interval):
+    """
+    :return: (quote board name, {instrument_token: candle ring name})
+    """
+    return prefix + '_quotes', {t: '{}_{}_{}'.format(prefix, t, interval) for t in instrument_tokens}
+
+
+class SharedMarketPublisher:
+    """
+    Owns fetching for all strategy processes on a host: writes candles and ticks of a set of instruments into
+    shared memory, where SharedMarketReader instances in other processes read them.
+
+    Usage:
+        publisher = SharedMarketPublisher(kite, tokens, interval='minute')
+        publisher.load_history(from_date)
+        ticker.on_ticks = publisher.on_ticks
+        while True:
+            publisher.refresh()
+            time.sleep(60)
+    """
+
+    def __init__(self, kite, instrument_tokens, interval='minute', capacity=DEFAULT_CAPACITY, prefix='kite'):
+        """
+        :param kite: Kite instance used to fetch candles.
+        :param instrument_tokens: Instruments to publish.
+        :param interval: Candle interval.
+        :param capacity: Candles kept per instrument.
+        :param prefix: Name prefix of the segments, shared with the readers.
+        """
+        self.kite = kite
+        self.interval = interval
+        board, rings = segment_names(prefix, instrument_tokens, interval)
+        self.quotes = QuoteBoard(board, instrument_tokens, create=True)
+        self.rings = {token: CandleRing(name, capacity, create=True) for token, name in rings.items()}
+
+    def load_history(self, from_date):
+        """
+        Fetch and publish candles from a date till now.
+        :param from_date: Start of the range (datetime).
+        """
+        for token, ring in self.rings.items():
+            ring.write(self.kite.get_historic_data(token, self.interval, from_date=from_date))
+
+    def refresh(self):
+        """
+        Fetch and publish the candles formed since the last call, including the one still forming.
+        """
+        for token, ring in self.rings.items():
+            last = ring.last_date()
+            if last is None:
+                continue
+            start = datetime.datetime.fromtimestamp(last, IST).replace(tzinfo=None)
+            try:
+                ring.write(self.kite.get_historic_data(token, self.interval, from_date=start))
+            except Exception as e:
+                logging.warning('Candle refresh of %s failed: %s', token, e)
+
+    def on_ticks(self, ws, ticks):
+        """
+        KiteTicker.on_ticks callback.
+        """
+        self.quotes.update(ticks)
+
+    def close(self):
+        """
+        Remove all segments. Attached readers keep their mapping until they close.
+        """
+        self.quotes.close()
+        for ring in self.rings.values():
+            ring.close()
+
+
+class SharedMarketReader:
+    """
+    Read side of SharedMarketPublisher, for strategy processes. Needs no Kite session.
+    """
+
+    def __init__(self, instrument_tokens, interval='minute', prefix='kite'):
+        """
+        :param instrument_tokens: Instruments to read, a subset of the published ones.
+        :param interval: Candle interval.
+        :param prefix: Name prefix used by the publisher.
+        """
+        board, rings = segment_names(prefix, instrument_tokens, interval)
+        self.quotes = QuoteBoard(board)
+        self.rings = {token: CandleRing(name) for token, name in rings.items()}
+
+    def candles(self, instrument_token, count=None):
+        """
+        :return: Latest candles in the format of Kite.get_historic_data.
+        """
+        return self.rings[instrument_token].candles(count)
+
+    def read(self, instrument_token, count=None):
+        """
+        :return: Latest candles as a float64 array. See CandleRing.read.
+        """
+        return self.rings[instrument_token].read(count)
+
+    def quote(self, instrument_token):
+        return self.quotes.get(instrument_token)
+
+    def close(self):
+        self.quotes.close()
+        for ring in self.rings.values():
+            ring.close()
@@ -0,0 +1,296 @@
+import concurrent.futures as concurrent
+import math
+import numpy as np
+import pandas as pd
+
+DEFAULT_BINS = 64
+DEFAULT_CHUNK_SIZE = 100000
+
+
+class AdaptiveHistogram:
+    """
+    Histogram with a fixed number of equal bins, built in one pass without knowing the range up front. Counts are
+    kept on a finer grid whose bin width doubles (neighbouring bins are merged) whenever a value falls outside it.
+    The occupied part of that grid is grouped into at most `bins` bins on output.
+    """
+
+    def __init__(self, bins=DEFAULT_BINS, resolution=16):
+        """
+        :param bins: Maximum number of bins returned.
+        :param resolution: Fine bins kept per returned bin. Higher is closer to a histogram over the exact range.
+        """
+        self.bins = bins
+        self.size = 2 * ((bins * resolution + 1) // 2)
+        self.low = None
+        self.width = None
+        self.fine = np.zeros(self.size, dtype=np.int64)
+
+    def __grid(self):
+        return self.low + self.width * np.arange(self.size + 1)
+
+    def __cover(self, low, high):
+        if self.low is None:
+            self.low = low
+            self.width = (high - low) / self.size if high > low else max(abs(low), 1.0) / self.size
+        while low < self.low:
+            self.low -= self.width * self.size
+            self.fine = np.concatenate([np.zeros(self.size, dtype=np.int64), self.fine]).reshape(-1, 2).sum(1)
+            self.width *= 2
+        while high > self.low + self.width * self.size:
+            self.fine = np.concatenate([self.fine, np.zeros(self.size, dtype=np.int64)]).reshape(-1, 2).sum(1)
+            self.width *= 2
+
+    def add(self, values, weights=None):
+        """
+        :param values: 1-D array. NaN and infinite values are ignored.
+        :param weights: Optional counts per value.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values)
+        values = values[finite]
+        if not len(values):
+            return
+        self.__cover(values.min(), values.max())
+        index = np.clip(((values - self.low) // self.width).astype(np.int64), 0, self.size - 1)
+        weights = None if weights is None else np.asarray(weights)[finite]
+        self.fine += np.bincount(index, weights=weights, minlength=self.size).astype(np.int64)
+
+    def merge(self, other):
+        """
+        Add another histogram. Its fine bins are placed by their centres, so counts move by at most one fine bin.
+        """
+        if other.low is None:
+            return self
+        grid = other.__grid()
+        self.__cover(grid[0], grid[-1])
+        self.add((grid[:-1] + grid[1:]) / 2, weights=other.fine)
+        return self
+
+    def histogram(self):
+        """
+        :return: (counts, edges) over the occupied range, at most `bins` bins.
+        """
+        occupied = np.flatnonzero(self.fine)
+        if not len(occupied):
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        first, last = occupied[0], occupied[-1] + 1
+        group = -(-(last - first) // self.bins)
+        starts = np.arange(first, last, group)
+        counts = np.add.reduceat(self.fine[first:last], starts - first)
+        edges = self.low + self.width * np.r_[starts, min(starts[-1] + group, self.size)]
+        return counts, edges
+
+
+class StreamingStats:
+    """
+    Single pass, mergeable statistics of the numeric columns of a dataset: count, mean, std, skew, kurtosis, min,
+    max, pairwise correlation (same NaN handling as DataFrame.corr) and histograms.
+    Feed chunks with update, combine the results of parallel workers with merge.
+    """
+
+    def __init__(self, bins=DEFAULT_BINS):
+        """
+        :param bins: Histogram bins per column.
+        """
+        self.bins = bins
+        self.columns = None
+        self.histograms = None
+
+    def __start(self, columns, values):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.m3 = np.zeros(k)
+        self.m4 = np.zeros(k)
+        self.min = np.full(k, np.nan)
+        self.max = np.full(k, np.nan)
+        # Sums for correlation, shifted by a rough mean to limit cancellation.
+        with np.errstate(invalid='ignore'):
+            shift = np.nanmean(values, axis=0) if len(values) else np.zeros(k)
+        self.shift = np.nan_to_num(shift)
+        self.pairs = np.zeros((k, k))
+        self.sx = np.zeros((k, k))
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+        self.histograms = [AdaptiveHistogram(self.bins) for _ in range(k)]
+
+    def update(self, chunk):
+        """
+        Add a chunk of rows.
+        :param chunk: DataFrame. Non numeric columns are ignored.
+        """
+        numeric = chunk.select_dtypes(include=[np.number, bool])
+        values = numeric.to_numpy(dtype=np.float64)
+        if self.columns is None:
+            self.__start(numeric.columns, values)
+        else:
+            assert list(numeric.columns) == self.columns, 'Chunks must have the same numeric columns'
+        if not len(values):
+            return self
+        valid = ~np.isnan(values)
+        part = self.__moments(values, valid)
+        self.__merge_moments(*part)
+        with np.errstate(invalid='ignore'):
+            self.min = np.fmin(self.min, np.nanmin(np.where(valid, values, np.nan), axis=0))
+            self.max = np.fmax(self.max, np.nanmax(np.where(valid, values, np.nan), axis=0))
+        shifted = np.where(valid, values - self.shift, 0.0)
+        mask = valid.astype(np.float64)
+        self.pairs += mask.T @ mask
+        self.sx += shifted.T @ mask
+        self.sxx += (shifted ** 2).T @ mask
+        self.sxy += shifted.T @ shifted
+        for column, histogram in enumerate(self.histograms):
+            histogram.add(values[:, column])
+        return self
+
+    @staticmethod
+    def __moments(values, valid):
+        n = valid.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, np.where(valid, values, 0.0).sum(axis=0) / n, 0.0)
+        deviation = np.where(valid, values - mean, 0.0)
+        return n, mean, (deviation ** 2).sum(axis=0), (deviation ** 3).sum(axis=0), (deviation ** 4).sum(axis=0)
+
+    def __merge_moments(self, n, mean, m2, m3, m4):
+        """
+        Combine central moments of two parts (Pebay, 2008).
+        """
+        na, nb = self.n, n
+        total = na + nb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            ratio = np.where(total > 0, nb / total, 0.0)
+            self.m4 = self.m4 + m4 + np.nan_to_num(
+                delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / total ** 3 +
+                6 * delta ** 2 * (na ** 2 * m2 + nb ** 2 * self.m2) / total ** 2 +
+                4 * delta * (na * m3 - nb * self.m3) / total)
+            self.m3 = self.m3 + m3 + np.nan_to_num(
+                delta ** 3 * na * nb * (na - nb) / total ** 2 + 3 * delta * (na * m2 - nb * self.m2) / total)
+            self.m2 = self.m2 + m2 + np.nan_to_num(delta ** 2 * na * nb / total)
+        self.mean = self.mean + delta * ratio
+        self.n = total
+
+    def merge(self, other):
+        """
+        Add the statistics of another part of the same dataset.
+        :param other: StreamingStats over the same columns.
+        :return: self
+        """
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__start(other.columns, np.zeros((0, len(other.columns))))
+            self.shift = other.shift.copy()
+        assert self.columns == other.columns, 'Cannot merge statistics of different columns'
+        self.__merge_moments(other.n, other.mean, other.m2, other.m3, other.m4)
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        # Move the other sums to this shift: x - self.shift = (x - other.shift) + d
+        d = other.shift - self.shift
+        di, dj = d[:, None], d[None, :]
+        self.pairs += other.pairs
+        self.sx += other.sx + di * other.pairs
+        self.sxx += other.sxx + 2 * di * other.sx + di ** 2 * other.pairs
+        self.sxy += other.sxy + dj * other.sx + di * other.sx.T + di * dj * other.pairs
+        for histogram, part in zip(self.histograms, other.histograms):
+            histogram.merge(part)
+        return self
+
+    def summary(self):
+        """
+        :return: DataFrame indexed by column: count, mean, std, min, max, skew, kurtosis (sample estimates, like
+        pandas).
+        """
+        n = self.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / (n - 1))
+            g1 = np.sqrt(n) * self.m3 / self.m2 ** 1.5
+            skew = np.where(n > 2, g1 * np.sqrt(n * (n - 1)) / (n - 2), np.nan)
+            g2 = n * self.m4 / self.m2 ** 2 - 3
+            kurtosis = np.where(n > 3, ((n + 1) * g2 + 6) * (n - 1) / ((n - 2) * (n - 3)), np.nan)
+        return pd.DataFrame({'count': n, 'mean': np.where(n > 0, self.mean, np.nan), 'std': std, 'min': self.min,
+                             'max': self.max, 'skew': skew, 'kurtosis': kurtosis}, index=self.columns)
+
+    def corr(self):
+        """
+        Pearson correlation over pairwise complete rows, as DataFrame.corr.
+        """
+        n = self.pairs
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = n * self.sxy - self.sx * self.sx.T
+            variance = n * self.sxx - self.sx ** 2
+            correlation = covariance / np.sqrt(variance * variance.T)
+        correlation = np.where(n > 1, np.clip(correlation, -1, 1), np.nan)
+        return pd.DataFrame(correlation, index=self.columns, columns=self.columns)
+
+    def histogram(self, column):
+        """
+        :return: (counts, edges)
+        """
+        return self.histograms[self.columns.index(column)].histogram()
+
+    def density(self, column, points=200):
+        """
+        Gaussian kernel density estimate from the histogram, with Scott's bandwidth like DataFrame.plot.density.
+        :return: (grid, density)
+        """
+        index = self.columns.index(column)
+        counts, edges = self.histogram(column)
+        total = counts.sum()
+        std = self.summary()['std'].iloc[index]
+        if total < 2 or not std > 0:
+            return edges, np.zeros(len(edges))
+        bandwidth = std * total ** (-1.0 / 5)
+        centres = (edges[:-1] + edges[1:]) / 2
+        grid = np.linspace(edges[0] - 3 * bandwidth, edges[-1] + 3 * bandwidth, points)
+        kernel = np.exp(-0.5 * ((grid[:, None] - centres[None, :]) / bandwidth) ** 2)
+        return grid, kernel @ counts / (total * bandwidth * math.sqrt(2 * math.pi))
+
+
+def read_chunks(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read a dataset in chunks of rows.
+    :param filename: CSV file, or Parquet file (.parquet, .pq, needs pyarrow).
+    :return: Generator of DataFrames.
+    """
+    if filename.endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('Reading parquet files needs pyarrow: pip install pyarrow')
+        for batch in pq.ParquetFile(filename).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+    for chunk in pd.read_csv(filename, chunksize=chunk_size):
+        yield chunk
+
+
+def analyse_file(filename, chunk_size=DEFAULT_CHUNK_SIZE, bins=DEFAULT_BINS):
+    """
+    :return: StreamingStats of one file.
+    """
+    stats = StreamingStats(bins=bins)
+    for chunk in read_chunks(filename, chunk_size):
+        stats.update(chunk)
+    return stats
+
+
+def analyse_files(filenames, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, bins=DEFAULT_BINS):
+    """
+    Statistics over several files with the same columns, one worker process per file.
+    :param filenames: List of CSV or Parquet files.
+    :param workers: Worker processes. 1 runs in this process.
+    :return: Merged StreamingStats.
+    """
+    stats = StreamingStats(bins=bins)
+    if workers == 1 or len(filenames) == 1:
+        parts = [analyse_file(f, chunk_size, bins) for f in filenames]
+    else:
+        with concurrent.ProcessPoolExecutor(max_workers=workers) as E:
+            parts = list(E.map(analyse_file, filenames, [chunk_size] * len(filenames), [bins] * len(filenames)))
+    for part in parts:
+        stats.merge(part)
+    return stats
+
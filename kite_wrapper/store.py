@@ -0,0 +1,117 @@
+import csv
+import datetime
+import os
+import threading
+
+CANDLE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume', 'oi']
+
+# Chunk file names hold the requested range: <from>_<to>.csv
+CHUNK_DATE_FORMAT = '%Y%m%d%H%M%S'
+
+
+def _chunk_name(start, end):
+    return '{}_{}.csv'.format(start.strftime(CHUNK_DATE_FORMAT), end.strftime(CHUNK_DATE_FORMAT))
+
+
+def _parse_chunk_name(name):
+    start, end = name[:-len('.csv')].split('_')
+    return (datetime.datetime.strptime(start, CHUNK_DATE_FORMAT),
+            datetime.datetime.strptime(end, CHUNK_DATE_FORMAT))
+
+
+class HistoryStore:
+    """
+    Local store of historical candles, one CSV file per fetched chunk:
+        <root>/<interval>/<instrument_token>/<from>_<to>.csv
+    Files are written to a temporary name and renamed, so a chunk file is either complete or absent.
+    """
+
+    def __init__(self, root):
+        """
+        :param root: Directory of the store. Created if missing.
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def __directory(self, instrument_token, interval):
+        return os.path.join(self.root, interval, str(instrument_token))
+
+    def write_chunk(self, instrument_token, interval, start, end, candles):
+        """
+        Store the candles of one requested range, replacing an earlier copy and earlier downloads of the same range
+        that ended sooner (a trailing chunk fetched while its range was still running).
+        :param candles: List of candles as returned by KiteConnect.historical_data.
+        :return: Path of the chunk file.
+        """
+        directory = self.__directory(instrument_token, interval)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, _chunk_name(start, end))
+        temporary = '{}.{}.tmp'.format(path, threading.get_ident())
+        with open(temporary, 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(CANDLE_COLUMNS)
+            for c in candles:
+                date = c['date']
+                writer.writerow([date.isoformat() if isinstance(date, datetime.datetime) else date, c['open'],
+                                 c['high'], c['low'], c['close'], c['volume'], c.get('oi', '')])
+        os.replace(temporary, path)
+        for earlier_start, earlier_end in self.chunks(instrument_token, interval):
+            if earlier_start == start and earlier_end < end:
+                try:
+                    os.remove(os.path.join(directory, _chunk_name(earlier_start, earlier_end)))
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def chunks(self, instrument_token, interval):
+        """
+        :return: Sorted list of (from, to) of the stored chunks.
+        """
+        directory = self.__directory(instrument_token, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(_parse_chunk_name(f) for f in os.listdir(directory) if f.endswith('.csv'))
+
+    def has_chunk(self, instrument_token, interval, start, end):
+        return os.path.exists(os.path.join(self.__directory(instrument_token, interval), _chunk_name(start, end)))
+
+    def instruments(self, interval):
+        """
+        :return: Instrument tokens with stored candles of an interval.
+        """
+        directory = os.path.join(self.root, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(t) for t in os.listdir(directory) if t.isdigit())
+
+    def read(self, instrument_token, interval, from_date=None, to_date=None):
+        """
+        Stored candles of an instrument, oldest first, without duplicates where chunks overlap.
+        :param from_date: Only chunks ending at or after this datetime are read.
+        :param to_date: Only chunks starting at or before this datetime are read.
+        :return: List of candles in the format of KiteConnect.historical_data.
+        """
+        directory = self.__directory(instrument_token, interval)
+        candles = {}
+        for start, end in self.chunks(instrument_token, interval):
+            if (from_date and end < from_date) or (to_date and start > to_date):
+                continue
+            try:
+                fp = open(os.path.join(directory, _chunk_name(start, end)), newline='')
+            except FileNotFoundError:
+                # Replaced by a longer download of the same range since it was listed.
+                continue
+            with fp:
+                for row in csv.DictReader(fp):
+                    candle = {
+                        'date': datetime.datetime.fromisoformat(row['date']),
+                        'open': float(row['open']),
+                        'high': float(row['high']),
+                        'low': float(row['low']),
+                        'close': float(row['close']),
+                        'volume': int(float(row['volume'])),
+                    }
+                    if row.get('oi'):
+                        candle['oi'] = int(float(row['oi']))
+                    candles[candle['date']] = candle
+        return [candles[d] for d in sorted(candles)]
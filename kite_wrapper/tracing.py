@@ -0,0 +1,259 @@
+import collections
+import json
+import os
+import threading
+import time
+
+
+class Span:
+    """
+    A timed section of work. Times are epoch nanoseconds.
+    """
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, tracer, name, trace_id, span_id, parent_id, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = None
+        self.end = None
+        self.error = None
+
+    @property
+    def duration(self):
+        """
+        :return: Duration in seconds.
+        """
+        if self.end is None:
+            return None
+        return (self.end - self.start) / 1e9
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'end': self.end,
+            'duration': self.duration,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+    def __enter__(self):
+        self.start = time.time_ns()
+        self.tracer._push(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.end = time.time_ns()
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self.tracer._pop(self)
+        return False
+
+
+class _NoopSpan:
+    """
+    Shared span used when tracing is off. Every method is a no-op.
+    """
+    __slots__ = ()
+    duration = None
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NullTracer:
+    """
+    Tracer that records nothing. `span` returns a shared object, so disabled tracing costs one method call.
+    """
+    enabled = False
+
+    def span(self, name, parent=None, **attributes):
+        return _NOOP_SPAN
+
+    def wrap(self, fn, name, parent=None, **attributes):
+        return fn
+
+
+NULL_TRACER = NullTracer()
+
+
+class Tracer:
+    """
+    Emits timed spans to a sink. Spans opened inside another span on the same thread become its children.
+    Work handed to another thread can be parented explicitly with `parent=` or by using `wrap`.
+
+    Usage:
+        tracer = Tracer(RingBufferSink())
+        with tracer.span('scan', instrument_token=256265):
+            with tracer.span('fetch'):
+                ...
+    """
+    enabled = True
+
+    def __init__(self, sink):
+        """
+        :param sink: Object with an emit(span) method, called when a span ends. An optional on_start(span) method
+        is called when it starts.
+        """
+        self.sink = sink
+        self.__local = threading.local()
+        self.__ids = iter(range(1, 1 << 62))
+        self.__lock = threading.Lock()
+        self.__prefix = '{:08x}'.format(os.getpid() & 0xffffffff)
+
+    def __next_id(self):
+        with self.__lock:
+            return self.__prefix + '{:016x}'.format(next(self.__ids))
+
+    def __stack(self):
+        stack = getattr(self.__local, 'stack', None)
+        if stack is None:
+            stack = self.__local.stack = []
+        return stack
+
+    def span(self, name, parent=None, **attributes):
+        """
+        Create a span. Use it as a context manager.
+        :param name: Span name.
+        :param parent: Parent span. Defaults to the innermost open span on this thread.
+        :param attributes: Attributes of the span.
+        :return: Span
+        """
+        if parent is None:
+            stack = self.__stack()
+            parent = stack[-1] if stack else None
+        if isinstance(parent, _NoopSpan):
+            parent = None
+        trace_id = parent.trace_id if parent else self.__next_id()
+        return Span(self, name, trace_id, self.__next_id(), parent.span_id if parent else None, attributes)
+
+    def wrap(self, fn, name, parent=None, **attributes):
+        """
+        Wrap a callable so it runs inside a span. Used to trace work submitted to executors.
+        :param fn: Callable.
+        :param name: Span name.
+        :param parent: Parent span. Defaults to the innermost open span on the calling thread.
+        :return: Wrapped callable.
+        """
+        if parent is None:
+            stack = self.__stack()
+            parent = stack[-1] if stack else None
+
+        def traced(*args, **kwargs):
+            with self.span(name, parent=parent, **attributes):
+                return fn(*args, **kwargs)
+
+        return traced
+
+    def _push(self, span):
+        self.__stack().append(span)
+        on_start = getattr(self.sink, 'on_start', None)
+        if on_start:
+            on_start(span)
+
+    def _pop(self, span):
+        stack = self.__stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        self.sink.emit(span)
+
+
+class RingBufferSink:
+    """
+    Keeps the most recent spans in memory.
+    """
+
+    def __init__(self, capacity=10000):
+        self.__spans = collections.deque(maxlen=capacity)
+
+    def emit(self, span):
+        self.__spans.append(span)
+
+    def spans(self, name=None, trace_id=None):
+        """
+        :param name: Only spans with this name.
+        :param trace_id: Only spans of this trace.
+        :return: List of spans, oldest first.
+        """
+        spans = list(self.__spans)
+        if name is not None:
+            spans = [s for s in spans if s.name == name]
+        if trace_id is not None:
+            spans = [s for s in spans if s.trace_id == trace_id]
+        return spans
+
+    def clear(self):
+        self.__spans.clear()
+
+
+class JsonLinesSink:
+    """
+    Appends one JSON object per span to a file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.__lock = threading.Lock()
+        self.__fp = open(filename, 'a')
+
+    def emit(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self.__lock:
+            self.__fp.write(line + '\n')
+            self.__fp.flush()
+
+    def close(self):
+        with self.__lock:
+            self.__fp.close()
+
+
+class OpenTelemetrySink:
+    """
+    Forwards spans to an OpenTelemetry tracer, keeping parent/child links.
+    Requires the opentelemetry-api package and a configured tracer provider.
+    """
+
+    def __init__(self, tracer=None, name='kite_wrapper'):
+        from opentelemetry import trace
+        self.__trace = trace
+        self.__tracer = tracer or trace.get_tracer(name)
+        self.__open = {}
+        self.__lock = threading.Lock()
+
+    def on_start(self, span):
+        with self.__lock:
+            parent = self.__open.get(span.parent_id)
+        context = self.__trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self.__tracer.start_span(span.name, context=context, start_time=span.start or time.time_ns())
+        with self.__lock:
+            self.__open[span.span_id] = otel_span
+
+    def emit(self, span):
+        with self.__lock:
+            otel_span = self.__open.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            otel_span.set_attribute(key, value if isinstance(value, (bool, int, float, str)) else str(value))
+        if span.error:
+            otel_span.set_attribute('error', span.error)
+        otel_span.end(end_time=span.end)
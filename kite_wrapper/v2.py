@@ -1,11 +1,20 @@
 import json
 import csv
 import numpy as np
-from stockstats import StockDataFrame
 import pandas as pd
 import mplfinance as mpf
 import seaborn as sn
 import matplotlib.pyplot as plt
+import time
+from .metrics import registry
+from .planner import warmup_bars, DEFAULT_TOLERANCE
+from .frame import CandleFrame, as_candle_frame
+from .precision import resolve_dtype
+from .downsample import OHLC_TYPES, to_plot_frame, downsample_ohlc, downsample_line
+from .stats import DEFAULT_BINS, DEFAULT_CHUNK_SIZE, analyse_files
+
+# Indicators written by generate_data_set, used as default ML features.
+DEFAULT_FEATURES = ('rsi_6', 'rsi_10', 'pdi', 'mdi', 'adx', 'kdjk', 'kdjd', 'kdjj', 'wr_6', 'wr_10', 'vwap')
 
 
 def load_secrets():
@@ -47,11 +56,45 @@ class TechnicalAnalysisV2:
     """
     Class to perform technical analysis on input stock data.
     The input data should have columns date, open, high, low, close, volume etc.
+    dtype=float32 holds candles, indicators and feature matrices in float32 for large universes. stockstats still
+    computes each indicator in float64, so this lowers the memory held between calls more than the peak while
+    computing, and costs some speed (see CandleFrame). See precision.FLOAT32_TOLERANCE for the precision.
     """
 
-    def __init__(self, data=None, name: str = None):
+    def __init__(self, data=None, name: str = None, metrics=None, dtype=None):
         self.data = pd.DataFrame(data)
         self.name = name
+        self.metrics = metrics or registry
+        self.dtype = dtype
+
+    def __frame(self, data):
+        """
+        Input data as a DataFrame. Lists of candles are converted, frames are used as they are. Falls back to
+        self.data.
+        """
+        if isinstance(data, CandleFrame):
+            return data.frame
+        if isinstance(data, pd.DataFrame):
+            return data
+        if data:
+            return pd.DataFrame(data)
+        return self.data
+
+    def __candles(self, data):
+        """
+        Input data as a CandleFrame. Falls back to self.data, which gets the indicator columns like before.
+        """
+        if isinstance(data, (CandleFrame, pd.DataFrame)) or data:
+            return as_candle_frame(data, self.dtype)
+        return CandleFrame(self.data, inplace=True, dtype=self.dtype)
+
+    def __tail(self, data, bars):
+        """
+        Last `bars` candles of the input data.
+        """
+        if isinstance(data, list) and data:
+            return data[-bars:]
+        return self.__candles(data).tail(bars)
 
     @staticmethod
     def __get_trend(data, stride=1):
@@ -96,10 +139,7 @@ class TechnicalAnalysisV2:
         one and swing high and descending in another
         :return: Dict {actions, swing high, swing low}
         """
-        if data:
-            data = pd.DataFrame(data)[type]
-        else:
-            data = self.data[type]
+        data = self.__frame(data)[type]
         trends = []
         for s in range(0, stride, 1):
             trend = self.__get_trend(data=data, stride=s)
@@ -166,28 +206,70 @@ class TechnicalAnalysisV2:
         :param to_percentage: divide by 100
         :return: Dictionary of technical indicators on input file.
         """
-        if data:
-            data = pd.DataFrame(data)
-        else:
-            data = self.data
-        stock = StockDataFrame.retype(data)
+        candles = self.__candles(data)
         indicators = {}
         for arg in args:
+            start = time.perf_counter()
             try:
                 if 'vwap' == arg:
-                    vwap = self.get_vwap(data)
+                    vwap = candles.derived('vwap', lambda c: self.get_vwap(c.stock))
                     indicators['vwap'] = vwap
                     continue
                 if to_percentage:
-                    indicators[arg] = stock[arg] / 100
+                    indicators[arg] = candles.indicator(arg) / 100
                     continue
-                indicators[arg] = stock[arg]
+                indicators[arg] = candles.indicator(arg)
 
             except Exception as e:
                 pass
+            finally:
+                self.metrics.observe('analysis_indicator_seconds', time.perf_counter() - start, indicator=arg)
 
         return indicators
 
+    def get_latest_indicators(self, *args, data=None, to_percentage=True, tolerance=DEFAULT_TOLERANCE):
+        """
+        Latest value of each indicator, computed only on the trailing bars it needs (planner.warmup_bars), so the
+        cost does not grow with the length of the history.
+        Accuracy: moving window indicators (sma, mstd, wr, rsv ...) are exact. Recursive ones (ema, smma, rsi, pdi,
+        mdi, dx, adx, adxr, kdj) differ from the full history value by at most tolerance * (max - min of their input
+        over the history) for each smoothing stage. vwap is cumulative over the whole input and is always computed on
+        all of it.
+        :param args: indicator strings ==> https://pypi.org/project/stockstats/
+        :param data: Input data (list of candles, DataFrame or CandleFrame). Defaults to self.data.
+        :param to_percentage: divide by 100
+        :param tolerance: See planner.DEFAULT_TOLERANCE.
+        :return: Dict of indicator to latest value.
+        """
+        windowed = [arg for arg in args if arg != 'vwap']
+        values = {}
+        if windowed:
+            bars = max(warmup_bars(arg, tolerance) for arg in windowed)
+            indicators = self.get_indicators(*windowed, data=self.__tail(data, bars), to_percentage=to_percentage)
+            values.update({indicator: value.iloc[-1] for indicator, value in indicators.items()})
+        if 'vwap' in args:
+            if isinstance(data, list) and data:
+                start = time.perf_counter()
+                # Only two columns of the whole history are needed, so skip building a DataFrame.
+                columns = {name: np.fromiter((c[name] for c in data), dtype=np.float64, count=len(data))
+                           for name in ['close', 'volume']}
+                vwap = self.get_vwap(columns)
+                self.metrics.observe('analysis_indicator_seconds', time.perf_counter() - start, indicator='vwap')
+            else:
+                vwap = self.get_indicators('vwap', data=data)['vwap']
+            values['vwap'] = np.asarray(vwap)[-1]
+        return {arg: values[arg] for arg in args if arg in values}
+
+    def get_latest_candle_ratios(self, data=None, to_percentage=True):
+        """
+        Candle ratios of the last candle only.
+        :param data: Input data. Defaults to self.data.
+        :param to_percentage: divide by 100
+        :return: Dict of ratio to latest value.
+        """
+        ratios = self.get_candle_ratios(data=self.__tail(data, 1), to_percentage=to_percentage)
+        return {ratio: value[-1] for ratio, value in ratios.items()}
+
     def get_vwap(self, data=None, autoscale=True):
         """
         Find VWAP for given data
@@ -197,10 +279,12 @@ class TechnicalAnalysisV2:
         """
         close = data['close']
         volume = data['volume']
-        vwap = (np.cumsum(volume * close) / np.cumsum(volume))
+        # Accumulate in float64 even for float32 candles, a running sum over years of candles drifts in float32.
+        vwap = (np.cumsum(volume.astype(np.float64) * close.astype(np.float64)) /
+                np.cumsum(volume.astype(np.float64)))
         if autoscale:
             vwap = vwap / max(vwap)
-        return vwap
+        return vwap.astype(close.dtype) if close.dtype == np.float32 else vwap
 
     def get_vwap_gradient(self, data=None, delta=100):
         """
@@ -209,10 +293,7 @@ class TechnicalAnalysisV2:
         :param delta:
         :return:
         """
-        if data:
-            data = pd.DataFrame(data)
-        else:
-            data = self.data
+        data = self.__frame(data)
 
         vwap = list(self.get_vwap(data, autoscale=True))
         r = []
@@ -230,10 +311,11 @@ class TechnicalAnalysisV2:
         :param to_percentage: divide by 100
         :return:
         """
-        if data:
-            data = pd.DataFrame(data)
-        else:
-            data = self.data
+        if isinstance(data, CandleFrame):
+            return data.derived(('candle_ratios', to_percentage),
+                                lambda candles: self.get_candle_ratios(candles.frame, to_percentage))
+        start = time.perf_counter()
+        data = self.__frame(data)
         high = data['high']
         low = data['low']
         open_ = data['open']
@@ -265,6 +347,7 @@ class TechnicalAnalysisV2:
             r5 = [(i / (j + 0.1)) for i, j in zip(upper_wick, candle)]
             r6 = [(i / (j + 0.1)) for i, j in zip(lower_wick, candle)]
 
+        self.metrics.observe('analysis_indicator_seconds', time.perf_counter() - start, indicator='candle_ratios')
         return {
             'r1': r1,
             'r2': r2,
@@ -290,8 +373,7 @@ class TechnicalAnalysisV2:
         """
         swing = self.get_swing_data(stride=1, type=type, ramp=ramp, swing=swing)
 
-        indicators = self.get_indicators('rsi_6', 'rsi_10', 'pdi', 'mdi', 'adx', 'kdjk', 'kdjd',
-                                         'kdjj', 'wr_6', 'wr_10', 'vwap')
+        indicators = self.get_indicators(*DEFAULT_FEATURES)
 
         if include_candle_ratios:
             ratios = self.get_candle_ratios()
@@ -301,6 +383,150 @@ class TechnicalAnalysisV2:
         data_set = pd.DataFrame(data=indicators).iloc[5:]
         data_set.to_csv(self.name + '.csv', index=False)
 
+    def get_feature_matrix(self, *args, data=None, include_candle_ratios=True):
+        """
+        Indicators and candle ratios as one matrix, one row per candle.
+        :param args: indicator strings ==> https://pypi.org/project/stockstats/. Defaults to DEFAULT_FEATURES.
+        :param data: Input data (list of candles, DataFrame or CandleFrame). Defaults to self.data.
+        :param include_candle_ratios: Boolean. Append the candle ratios of get_candle_ratios.
+        :return: (matrix, names). C-contiguous array (candles x features) in self.dtype, float64 by default, and the
+        feature names.
+        """
+        candles = self.__candles(data)
+        features = self.get_indicators(*(args or DEFAULT_FEATURES), data=candles)
+        if include_candle_ratios:
+            features.update(self.get_candle_ratios(data=candles))
+        names = list(features.keys())
+        dtype = resolve_dtype(self.dtype)
+        matrix = np.empty((len(candles), len(names)), dtype=dtype)
+        for column, name in enumerate(names):
+            matrix[:, column] = np.asarray(features[name], dtype=dtype)
+        return matrix, names
+
+    @staticmethod
+    def sliding_windows(matrix, window, step=1):
+        """
+        Read-only view of every `window` consecutive rows of a matrix, without copying.
+        :param matrix: 2-D array (time x features).
+        :param window: Rows per window.
+        :param step: Rows between the starts of consecutive windows.
+        :return: Array (windows x window x features) sharing memory with matrix.
+        """
+        matrix = np.ascontiguousarray(matrix)
+        count = max((len(matrix) - window) // step + 1, 0)
+        row, column = matrix.strides
+        return np.lib.stride_tricks.as_strided(matrix, shape=(count, window, matrix.shape[1]),
+                                               strides=(step * row, row, column), writeable=False)
+
+    def get_feature_windows(self, *args, window, data=None, step=1, label_stride=1, include_candle_ratios=True,
+                            type='close', ramp=False, swing=True, skip=5):
+        """
+        Sliding windows of features for sequence models, labelled with the swing action of their last candle.
+        The windows are strided views of one feature matrix, so memory does not grow with the window length.
+        :param args: indicator strings ==> https://pypi.org/project/stockstats/. Defaults to DEFAULT_FEATURES.
+        :param window: Candles per window.
+        :param data: Input data (list of candles, DataFrame or CandleFrame). Defaults to self.data.
+        :param step: Candles between the starts of consecutive windows.
+        :param label_stride: Stride passed to get_swing_data for the labels.
+        :param include_candle_ratios: Boolean. Include the candle ratios as features.
+        :param type: Column for the labels. open, high, low or close.
+        :param ramp: See get_swing_data.
+        :param swing: See get_swing_data.
+        :param skip: Leading candles dropped while indicators warm up, like generate_data_set.
+        :return: Dict {windows (read-only, windows x window x features), actions (label per window), features
+        (names), end (index of the last candle of each window)}
+        """
+        candles = self.__candles(data)
+        matrix, names = self.get_feature_matrix(*args, data=candles, include_candle_ratios=include_candle_ratios)
+        actions = self.get_swing_data(stride=label_stride, type=type, data=candles, ramp=ramp,
+                                      swing=swing)['actions']
+        return self.__windows(matrix, np.array(actions, dtype=object), names, skip + window - 1, len(matrix) - 1,
+                              window, step)
+
+    def __windows(self, matrix, actions, names, first, last, window, step, offset=0):
+        """
+        Windows whose last row lies in [first, last], as local row indices of matrix.
+        """
+        ends = np.arange(max(first, window - 1), last + 1, step)
+        if len(ends):
+            windows = self.sliding_windows(matrix[ends[0] - window + 1:ends[-1] + 1], window, step)
+        else:
+            windows = self.sliding_windows(matrix[:0], window, step)
+        return {
+            'windows': windows,
+            'actions': actions[ends],
+            'features': names,
+            'end': ends + offset,
+        }
+
+    def iter_feature_windows(self, filename, *args, window, chunk_size=100000, step=1, label_stride=1,
+                             include_candle_ratios=True, type='close', ramp=False, swing=True, skip=5,
+                             tolerance=DEFAULT_TOLERANCE):
+        """
+        get_feature_windows over a candle CSV file too large for memory, one chunk of candles at a time.
+        Each chunk is computed together with enough preceding candles for indicator warm-up (planner.warmup_bars)
+        and the first window, so recursive indicators match the in-memory result within tolerance and the rest
+        exactly. vwap needs a first pass over the close and volume columns for its scale.
+        :param filename: CSV with columns date, open, high, low, close, volume, oldest first.
+        :param chunk_size: Candles read per chunk.
+        :param tolerance: See planner.DEFAULT_TOLERANCE.
+        :return: Generator of dicts as get_feature_windows, with end counted from the start of the file.
+        """
+        args = args or DEFAULT_FEATURES
+        warmup = max([warmup_bars(arg, tolerance) for arg in args if arg != 'vwap'] + [1])
+        # The label of a candle looks this many candles ahead.
+        lookahead = max(label_stride - 1, 1)
+        keep = warmup + window - 1 + lookahead
+        scale = self.__vwap_scale(filename, chunk_size) if 'vwap' in args else None
+        sums = np.zeros(2)
+        history = None
+        history_vwap = np.empty(0)
+        base = 0
+        next_end = skip + window - 1
+        chunks = iter(pd.read_csv(filename, chunksize=chunk_size))
+        chunk = next(chunks, None)
+        while chunk is not None:
+            following = next(chunks, None)
+            frame = chunk if history is None else pd.concat([history, chunk], ignore_index=True)
+            frame = frame.reset_index(drop=True)
+            candles = CandleFrame(frame)
+            matrix, names = self.get_feature_matrix(*args, data=candles,
+                                                    include_candle_ratios=include_candle_ratios)
+            actions = self.get_swing_data(stride=label_stride, type=type, data=candles, ramp=ramp,
+                                          swing=swing)['actions']
+            if scale is not None:
+                weighted = np.cumsum(chunk['close'].to_numpy() * chunk['volume'].to_numpy()) + sums[0]
+                volume = np.cumsum(chunk['volume'].to_numpy()) + sums[1]
+                sums = np.array([weighted[-1], volume[-1]]) if len(chunk) else sums
+                vwap = np.concatenate([history_vwap, weighted / volume / scale])
+                matrix[:, names.index('vwap')] = vwap
+                history_vwap = vwap[-keep:]
+            last = len(frame) - 1 if following is None else len(frame) - 1 - lookahead
+            result = self.__windows(matrix, np.array(actions, dtype=object), names, next_end - base, last, window,
+                                    step, offset=base)
+            if len(result['end']):
+                next_end = result['end'][-1] + step
+                yield result
+            drop = max(len(frame) - keep, 0)
+            history = frame.iloc[drop:]
+            base += drop
+            chunk = following
+
+    @staticmethod
+    def __vwap_scale(filename, chunk_size):
+        """
+        Largest vwap over a whole CSV file, the scale get_vwap applies in memory.
+        """
+        weighted = volume = 0.0
+        peak = -np.inf
+        for chunk in pd.read_csv(filename, chunksize=chunk_size, usecols=['close', 'volume']):
+            cumulative = np.cumsum(chunk['close'].to_numpy() * chunk['volume'].to_numpy()) + weighted
+            volumes = np.cumsum(chunk['volume'].to_numpy()) + volume
+            if len(chunk):
+                peak = max(peak, np.nanmax(cumulative / volumes))
+                weighted, volume = cumulative[-1], volumes[-1]
+        return peak
+
     @staticmethod
     def __rotate(input_list, n):
         return input_list[n:] + input_list[:n]
@@ -343,39 +569,74 @@ class TechnicalAnalysisV2:
             errors.append(int(np.median(error) * 10000))
         return errors.index(np.median(errors)) + 1
 
-    def plot_chart(self, type='candle', moving_averages: tuple = None, show_volume=True, length=100):
+    def plot_chart(self, type='candle', moving_averages: tuple = None, show_volume=True, length=100, max_points=500,
+                   savefig=None):
         """
         Plot candlestick
+        Long ranges are drawn at screen resolution: candles are merged into at most max_points candles keeping
+        their open, high, low and close, and line charts keep the LTTB points of the close. Moving averages are
+        computed on all the data before that, so they have no warm-up gap and do not depend on the resolution.
         :param show_volume: plot volume or not
         :param type: candle, line, renko, ohlc, bars
         :param moving_averages: tuple. Moving averages tobe plotted
-        :param length: length of data tobe displayed
+        :param length: length of data tobe displayed. None shows all of it.
+        :param max_points: Most candles or line points drawn. None draws every candle.
+        :param savefig: Filename to save the chart to instead of showing it. Works without a display.
         :return:
         """
-        max_length = len(self.data)
-        assert max_length > length
-        data = self.data[max_length - length:]
-        if moving_averages:
-            mpf.plot(data, type=type, mav=moving_averages, volume=show_volume)
-        else:
-            mpf.plot(data, type=type, volume=show_volume)
-
-    def analyse_dataset(self):
+        data = to_plot_frame(self.data)
+        averages = [data['close'].rolling(n).mean() for n in moving_averages or ()]
+        length = len(data) if length is None else min(length, len(data))
+        data = data.iloc[len(data) - length:]
+        rows = np.arange(length)
+        if max_points and length > max_points:
+            if type in OHLC_TYPES:
+                data, rows = downsample_ohlc(data, max_points)
+            elif type == 'line':
+                data, rows = downsample_line(data, max_points)
+        kwargs = {'type': type, 'volume': show_volume}
+        addplots = []
+        for average in averages:
+            values = average.iloc[len(average) - length:].to_numpy()[rows]
+            if not np.isnan(values).all():
+                addplots.append(mpf.make_addplot(values))
+        if addplots:
+            kwargs['addplot'] = addplots
+        if savefig:
+            kwargs['savefig'] = savefig
+            kwargs['closefig'] = True
+        mpf.plot(data, **kwargs)
+
+    def analyse_dataset(self, filenames=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, bins=DEFAULT_BINS):
         """
-        Plot correlation matrix from dataset
-        :return:
+        Plot correlation matrix, histograms and densities from dataset.
+        The dataset is read in chunks in a single pass, so it need not fit in memory. Histograms are fixed-bin and
+        densities are estimated from them.
+        :param filenames: CSV or Parquet files with the same columns, eg: one per instrument. Defaults to
+        <name>.csv.
+        :param workers: Worker processes when there are several files.
+        :param chunk_size: Rows read at a time.
+        :param bins: Histogram bins per column.
+        :return: StreamingStats
         """
-        filename = self.name + '.csv'
+        filenames = filenames or [self.name + '.csv']
         try:
-            dataset = pd.read_csv(filename)
-            correlation = dataset.corr()
-            sn.heatmap(correlation, annot=True)
+            stats = analyse_files(filenames, workers=workers, chunk_size=chunk_size, bins=bins)
+            sn.heatmap(stats.corr(), annot=True)
             plt.show()
-            dataset.plot(kind='hist')
+            for column in stats.columns:
+                counts, edges = stats.histogram(column)
+                plt.hist(edges[:-1], bins=edges, weights=counts, alpha=0.5, label=column)
+            plt.legend()
             plt.show()
-            dataset.plot(kind='density')
+            for column in stats.columns:
+                grid, density = stats.density(column)
+                plt.plot(grid, density, label=column)
+            plt.legend()
             plt.show()
-            print('Max value: ', dataset.max(), ' Min value: ', dataset.min())
+            summary = stats.summary()
+            print('Max value: ', summary['max'], ' Min value: ', summary['min'])
+            return stats
 
         except Exception as e:
 
@@ -17,6 +17,12 @@ setup(name='kite-wrapper',
           "License :: OSI Approved :: MIT License",
           "Operating System :: OS Independent",
       ],
-      python_requires='>=3.6',
+      python_requires='>=3.8',
       install_requires=['kiteconnect', 'selenium==3.141.0', 'numpy>=1.19', 'pandas==1.2.2', 'stockstats==0.3.2',
-                        'mplfinance==0.12.7a7', 'seaborn==0.11.1'], )
+                        'mplfinance==0.12.7a7', 'seaborn==0.11.1'],
+      entry_points={
+          'console_scripts': [
+              'kite-backfill=kite_wrapper.bulk:main',
+              'kite-parity=kite_wrapper.parity:main',
+          ],
+      }, )
@@ -0,0 +1,8 @@
+import importlib.metadata
+
+import pytest
+
+# Indicator values follow the stockstats pinned in setup.py. Later versions changed the definitions of several
+# indicators (Eg: rsi, dmi smoothing) and renamed some (mdi), so value comparisons only hold on 0.3.x.
+pinned_stockstats = pytest.mark.skipif(not importlib.metadata.version('stockstats').startswith('0.3.'),
+                                       reason='needs the pinned stockstats==0.3.2')
@@ -0,0 +1,46 @@
+import numpy as np
+
+from kite_wrapper.backtest import Backtest
+from kite_wrapper.batch import BatchTechnicalAnalysis, OHLCV
+
+
+def candles(close, missing=()):
+    close = np.asarray(close, dtype=np.float64)
+    data = {'open': close - 0.5, 'high': close + 1, 'low': close - 1, 'close': close,
+            'volume': np.full(close.shape, 100.0)}
+    for column in OHLCV:
+        data[column] = np.array(data[column])[None, :]
+        data[column][0, list(missing)] = np.nan
+    return BatchTechnicalAnalysis(data)
+
+
+CLOSE = 100 + np.cumsum(np.sin(np.arange(40)))
+MISSING = [3, 4, 11, 20, 21, 22]
+KEPT = [i for i in range(len(CLOSE)) if i not in MISSING]
+
+
+def test_actions_are_not_lost_on_missing_bars():
+    # The action of bar 2 is known at its next bar, 5, and filled at bar 6.
+    actions = ['Hold', 'Hold', 'Buy'] + ['Hold'] * (len(KEPT) - 3)
+    result = Backtest(candles(CLOSE, MISSING), cost_bps=0, slippage_bps=0).run_actions([actions])
+    positions = result['positions'][0]
+    assert np.all(positions[:6] == 0)
+    assert np.all(positions[6:] == 1)
+
+
+def test_gaps_match_the_same_bars_without_gaps():
+    actions = [['Buy', 'Hold', 'Sell', 'Hold', 'Hold', 'Buy', 'Sell'][i % 7] for i in range(len(KEPT))]
+    gapped = Backtest(candles(CLOSE, MISSING)).run_actions([actions], stride=2)
+    dense = Backtest(candles(CLOSE[KEPT])).run_actions([actions], stride=2)
+    np.testing.assert_allclose(gapped['positions'][0, KEPT], dense['positions'][0])
+    np.testing.assert_allclose(gapped['returns'][0, KEPT], dense['returns'][0])
+    np.testing.assert_allclose(gapped['equity'][0, -1], dense['equity'][0, -1])
+
+
+def test_lag_counts_bars_not_columns():
+    signals = np.full((1, len(CLOSE)), np.nan)
+    signals[0, 2] = 1
+    positions = Backtest(candles(CLOSE, MISSING)).run(signals, lag=2)['positions'][0]
+    # Bars after 2 are 5 and 6, so the fill is at 6.
+    assert np.all(positions[:6] == 0)
+    assert np.all(positions[6:] == 1)
@@ -0,0 +1,55 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+from conftest import pinned_stockstats
+
+from kite_wrapper import TechnicalAnalysisV2
+from kite_wrapper.batch import BatchTechnicalAnalysis
+from kite_wrapper.parity import compare, synthetic_sets
+
+INDICATORS = ['close_20_sma', 'close_10_ema', 'rsi_14', 'wr_10', 'pdi', 'mdi', 'adx', 'kdjk', 'vwap']
+
+
+def candle_sets():
+    """
+    Two instruments, the second missing a block of bars and every seventh bar.
+    """
+    first, second = synthetic_sets(2, '15minute', 20, end=datetime.date(2025, 6, 13)).values()
+    second = [c for i, c in enumerate(second) if i % 7 and not 40 <= i < 60]
+    return {1: first, 2: second}
+
+
+def rows(batch, candles):
+    """
+    Columns of the batch matrix that hold the candles of an instrument.
+    """
+    return batch.timestamps.get_indexer(pd.DatetimeIndex([c['date'] for c in candles]))
+
+
+def test_missing_bars_are_nan_and_the_rest_ignores_them():
+    sets = candle_sets()
+    batch = BatchTechnicalAnalysis.from_candles(sets)
+    sma = batch.get_indicators('close_20_sma', to_percentage=False)['close_20_sma']
+    columns = rows(batch, sets[2])
+    assert np.isnan(np.delete(sma[1], columns)).all()
+    expected = pd.Series([c['close'] for c in sets[2]]).rolling(20, min_periods=1).mean().to_numpy()
+    assert np.allclose(sma[1, columns], expected)
+    latest = batch.latest({'close': batch.get_ohlcv()['close']})
+    assert latest['close'].tolist() == [sets[1][-1]['close'], sets[2][-1]['close']]
+
+
+@pinned_stockstats
+def test_batch_matches_v2_per_instrument():
+    sets = candle_sets()
+    batch = BatchTechnicalAnalysis.from_candles(sets)
+    values = batch.get_indicators(*INDICATORS, to_percentage=False)
+    values.update(batch.get_candle_ratios(to_percentage=False))
+    for row, (token, candles) in enumerate(sets.items()):
+        analysis = TechnicalAnalysisV2()
+        expected = analysis.get_indicators(*INDICATORS, data=candles, to_percentage=False)
+        expected.update(analysis.get_candle_ratios(data=candles, to_percentage=False))
+        columns = rows(batch, candles)
+        for name, reference in expected.items():
+            actual = values[name][row, columns]
+            assert compare(actual, np.asarray(reference, dtype=np.float64), 1e-9, 1e-9)[3], (token, name)
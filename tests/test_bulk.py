@@ -0,0 +1,58 @@
+import datetime
+import logging
+
+import pytest
+
+from kite_wrapper import Kite
+from kite_wrapper.bulk import BulkDownloader, Checkpoint
+from kite_wrapper.fake_server import FakeKiteServer
+from kite_wrapper.metrics import MetricsRegistry
+from kite_wrapper.store import HistoryStore
+
+FROM, TO = datetime.datetime(2025, 6, 2, 9, 15), datetime.datetime(2025, 6, 13, 15, 30)
+
+
+@pytest.fixture(scope='module')
+def server():
+    logging.disable(logging.CRITICAL)
+    with FakeKiteServer(rate_limits=None) as server:
+        yield server
+    logging.disable(logging.NOTSET)
+
+
+def kite(server):
+    kite = Kite('key', 'secret', 'http://localhost', root=server.url, metrics=MetricsRegistry())
+    kite.session.set_access_token('token')
+    return kite
+
+
+def test_rerun_skips_downloaded_chunks_and_retries_transient_errors(server, tmp_path):
+    tokens = [i['instrument_token'] for i in server.instruments[:2]]
+    store = HistoryStore(str(tmp_path))
+    server.inject_errors('historical', status=503)
+    downloader = BulkDownloader(kite(server), store, backoff=0)
+    summary = downloader.run(tokens, ['minute', 'day'], FROM, TO)
+    downloader.close()
+    assert summary['failed'] == [] and not summary['interrupted']
+    assert summary['done'] == summary['planned'] == 4
+    assert sum(downloader.metrics.snapshot()['counters']['kite_bulk_retries_total'].values()) == 1
+    # 10 sessions of 375 minute candles.
+    assert len(store.read(tokens[0], 'minute')) == 3750
+    assert len(store.read(tokens[1], 'day')) == 10
+
+    again = BulkDownloader(kite(server), store, backoff=0)
+    summary = again.run(tokens, ['minute', 'day'], FROM, TO)
+    again.close()
+    assert summary['skipped'] == 4 and summary['done'] == 0
+
+
+def test_checkpoint_ignores_a_cut_line(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = Checkpoint(path)
+    checkpoint.add('a', 10)
+    checkpoint.close()
+    with open(path, 'a') as fp:
+        fp.write('{"key": "b", "cand')
+    checkpoint = Checkpoint(path)
+    assert 'a' in checkpoint and 'b' not in checkpoint and len(checkpoint) == 1
+    checkpoint.close()
@@ -0,0 +1,33 @@
+import datetime
+
+import pytest
+
+from kite_wrapper.compute import ComputeBackend, latest_features
+from kite_wrapper.historical import frame_to_arrays
+from kite_wrapper.metrics import MetricsRegistry
+from kite_wrapper.parity import synthetic_sets
+
+INDICATORS = ['close_20_sma', 'close_10_ema', 'rsi_14', 'wr_10']
+
+
+@pytest.fixture(scope='module')
+def candles():
+    return list(synthetic_sets(1, '15minute', 30, end=datetime.date(2025, 6, 13)).values())[0]
+
+
+@pytest.mark.parametrize('kind', ['inline', 'thread', 'process'])
+def test_backends_match_direct_call(candles, kind):
+    expected = latest_features(frame_to_arrays(candles), INDICATORS, candle_ratios=True)
+    metrics = MetricsRegistry()
+    with ComputeBackend(kind, workers=2, metrics=metrics) as backend:
+        # Lists of candles and decoded arrays are both accepted.
+        for data in (candles, frame_to_arrays(candles)):
+            assert backend.latest_features(data, *INDICATORS, candle_ratios=True).result() == expected
+    assert set(expected) >= set(INDICATORS) | {'r1', 't'}
+    assert metrics.get('kite_compute_seconds', backend=kind).count == 2
+
+
+def test_errors_reach_the_future():
+    with ComputeBackend('inline', metrics=MetricsRegistry()) as backend:
+        with pytest.raises(ZeroDivisionError):
+            backend.submit(lambda: 1 / 0).result()
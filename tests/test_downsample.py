@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from kite_wrapper.downsample import downsample_line, downsample_ohlc, to_plot_frame
+
+
+def frame(count):
+    dates = pd.date_range('2025-06-13 09:15', periods=count, freq='min')
+    close = 100 + np.sin(np.arange(count) / 7.0) * 5
+    return pd.DataFrame({'open': close - 0.5, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': np.arange(count, dtype=np.int64)}, index=dates)
+
+
+def test_to_plot_frame_leaves_the_callers_frame_alone():
+    data = frame(10)
+    data.index = data.index.astype(str)
+    plot = to_plot_frame(data)
+    assert isinstance(plot.index, pd.DatetimeIndex)
+    assert not isinstance(data.index, pd.DatetimeIndex)
+
+
+def test_downsample_ohlc_keeps_extremes_and_volume():
+    data = frame(1000)
+    data.iloc[123, data.columns.get_loc('high')] = 500.0
+    data.iloc[877, data.columns.get_loc('low')] = 1.0
+    sampled, ends = downsample_ohlc(data, 50)
+    assert len(sampled) == 50
+    assert sampled['high'].max() == 500.0
+    assert sampled['low'].min() == 1.0
+    assert sampled['volume'].sum() == data['volume'].sum()
+    assert sampled['open'].iloc[0] == data['open'].iloc[0]
+    assert sampled['close'].iloc[-1] == data['close'].iloc[-1]
+    assert ends[-1] == len(data) - 1
+
+
+def test_downsample_line_keeps_the_ends():
+    data = frame(1000)
+    sampled, rows = downsample_line(data, 40)
+    assert len(sampled) == 40
+    assert rows[0] == 0 and rows[-1] == len(data) - 1
+    assert sampled['volume'].sum() == data['volume'].sum()
@@ -0,0 +1,44 @@
+import datetime
+
+import pytest
+
+from kite_wrapper.fake_server import SyntheticMarket
+
+DAY = datetime.date(2025, 6, 12)
+
+
+def stamps(candles):
+    return [datetime.datetime.strptime(c[0][:19], '%Y-%m-%dT%H:%M:%S') for c in candles]
+
+
+@pytest.mark.parametrize('interval', ['minute', '15minute', 'hour', 'day', 'week'])
+def test_candles_stay_within_the_range(interval):
+    market = SyntheticMarket()
+    start, end = datetime.datetime(2025, 6, 4, 11, 0), datetime.datetime(2025, 6, 12, 10, 20)
+    candles = market.candles(1, interval, start, end)
+    assert candles
+    for stamp in stamps(candles):
+        if interval in ['day', 'week']:
+            assert start.date() <= stamp.date() <= end.date()
+        else:
+            assert start <= stamp <= end
+
+
+@pytest.mark.parametrize('interval', ['hour', 'day', 'week'])
+def test_last_candle_holds_no_later_prices(interval):
+    market = SyntheticMarket()
+    end = datetime.datetime.combine(DAY, datetime.time(10, 20))
+    minutes = market.candles(1, 'minute', datetime.datetime(2025, 6, 9), end)
+    last = market.candles(1, interval, datetime.datetime(2025, 6, 9), end)[-1]
+    since = [c for c, stamp in zip(minutes, stamps(minutes)) if stamp >= stamps([last])[0]]
+    assert last[1] == since[0][1]
+    assert last[2] == max(c[2] for c in since)
+    assert last[3] == min(c[3] for c in since)
+    assert last[4] == minutes[-1][4]
+    assert last[5] == sum(c[5] for c in since)
+
+
+def test_date_only_end_covers_the_whole_day():
+    market = SyntheticMarket()
+    full = market.candles(1, 'day', datetime.datetime(2025, 6, 9), datetime.datetime(2025, 6, 12, 23, 59))
+    assert market.candles(1, 'day', datetime.datetime(2025, 6, 9), datetime.datetime(2025, 6, 12)) == full
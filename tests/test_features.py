@@ -0,0 +1,102 @@
+import datetime
+import json
+import logging
+
+import numpy as np
+import pytest
+from conftest import pinned_stockstats
+
+from kite_wrapper import FeatureStore, Kite, TechnicalAnalysisV2
+from kite_wrapper.fake_server import FakeKiteServer
+from kite_wrapper.features import IncrementalFeatures
+from kite_wrapper.historical import frame_to_arrays
+from kite_wrapper.parity import synthetic_sets
+
+SUPPORTED = ['rsi_14', 'close_20_sma', 'close_10_ema', 'wr_10', 'kdjk', 'pdi', 'mdi', 'adx']
+
+INCREMENTAL = ['close_20_sma', 'close_10_ema', 'close_5_smma', 'rsi_6', 'rsi_14', 'wr_10', 'pdi', 'mdi', 'dx', 'adx',
+               'adxr', 'kdjk', 'kdjd', 'kdjj', 'kdjk_5', 'vwap']
+
+
+def split(arrays, cuts):
+    return [{k: v if k == 'utc_offset' else v[a:b] for k, v in arrays.items()} for a, b in zip(cuts[:-1], cuts[1:])]
+
+
+@pinned_stockstats
+@pytest.mark.parametrize('seed', [0, 1])
+def test_incremental_features_match_v2_however_split(seed):
+    candles = list(synthetic_sets(1, 'minute', 7, end=datetime.date(2025, 6, 13)).values())[0]
+    arrays = frame_to_arrays(candles)
+    count = len(arrays['date'])
+    rng = np.random.default_rng(seed)
+    # Single candles at the start, where windows are still filling, then random batches.
+    cuts = [0, 1, 2, 3] + sorted(rng.choice(np.arange(4, count), 20, replace=False).tolist()) + [count]
+    features = IncrementalFeatures(INCREMENTAL)
+    parts = []
+    for index, part in enumerate(split(arrays, cuts)):
+        parts.append(features.update(part))
+        if index % 2:
+            # Resume from the saved state, as a FeatureStore does on its next update.
+            features = IncrementalFeatures(INCREMENTAL, state=json.loads(json.dumps(features.state)))
+    analysis = TechnicalAnalysisV2()
+    expected = analysis.get_indicators(*INCREMENTAL, data=candles, to_percentage=False)
+    expected.update(analysis.get_candle_ratios(data=candles, to_percentage=False))
+    for name in features.columns:
+        actual = np.concatenate([part[name] for part in parts])
+        if name == 'vwap':
+            actual = actual / features.vwap_max()
+        np.testing.assert_allclose(actual, np.asarray(expected[name], dtype=np.float64), rtol=1e-9, atol=1e-9,
+                                   err_msg=name)
+
+
+def test_uncommitted_update_leaves_state():
+    candles = list(synthetic_sets(1, 'minute', 3, end=datetime.date(2025, 6, 13)).values())[0]
+    parts = split(frame_to_arrays(candles), [0, 500, 501])
+    features = IncrementalFeatures(['rsi_14', 'adx'])
+    features.update(parts[0])
+    state = features.state
+    forming = features.update(parts[1], commit=False)
+    assert features.state is state
+    np.testing.assert_array_equal(features.update(parts[1])['adx'], forming['adx'])
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeKiteServer(rate_limits=None) as server:
+        yield server
+
+
+def kite(server, **kwargs):
+    kite = Kite('key', 'secret', 'http://localhost', root=server.url, **kwargs)
+    kite.session.set_access_token('token')
+    return kite
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pinned_stockstats
+def test_store_path_matches_compute_path(server, tmp_path):
+    token = server.instruments[0]['instrument_token']
+    expected = kite(server).get_input_features(*SUPPORTED, instrument_token=token, interval='hour', tail=False)
+    stored = kite(server, features=FeatureStore(str(tmp_path)))
+    for _ in range(2):
+        actual = stored.get_input_features(*SUPPORTED, instrument_token=token, interval='hour')
+        assert list(actual) == list(expected)
+        for name, value in expected.items():
+            assert actual[name] == pytest.approx(value, rel=1e-4, abs=1e-4), name
+
+
+def test_store_path_computes_vwap_and_unsupported_indicators(server, tmp_path):
+    token = server.instruments[1]['instrument_token']
+    args = ['rsi_14', 'vwap', 'macd', 'boll']
+    expected = kite(server).get_input_features(*args, instrument_token=token, interval='hour')
+    actual = kite(server, features=FeatureStore(str(tmp_path))).get_input_features(*args, instrument_token=token,
+                                                                                  interval='hour')
+    assert list(actual) == list(expected)
+    for name in ['vwap', 'macd', 'boll']:
+        assert actual[name] == pytest.approx(expected[name], rel=1e-6), name
@@ -0,0 +1,34 @@
+import datetime
+
+import pandas as pd
+
+from kite_wrapper import TechnicalAnalysisV2
+from kite_wrapper.frame import CandleFrame, as_candle_frame
+from kite_wrapper.parity import synthetic_sets
+
+
+def candles():
+    return list(synthetic_sets(1, '15minute', 10, end=datetime.date(2025, 6, 13)).values())[0]
+
+
+def test_shared_frame_leaves_the_input_alone_and_reuses_results():
+    data = pd.DataFrame(candles())
+    columns = list(data.columns)
+    frame = CandleFrame(data)
+    analysis = TechnicalAnalysisV2()
+    first = analysis.get_indicators('close_20_sma', 'vwap', data=frame)
+    second = analysis.get_indicators('close_20_sma', 'vwap', data=frame)
+    assert first['vwap'] is second['vwap']
+    assert frame.indicator('close_20_sma') is frame.indicator('close_20_sma')
+    assert list(data.columns) == columns
+    assert frame.tail(5) is frame.tail(5) and len(frame.tail(5)) == 5
+    assert frame.tail(len(frame) + 1) is frame
+    assert as_candle_frame(frame) is frame
+
+
+def test_analysis_falls_back_to_its_own_data():
+    data = candles()
+    own = TechnicalAnalysisV2(data).get_indicators('close_20_sma', 'vwap')
+    given = TechnicalAnalysisV2().get_indicators('close_20_sma', 'vwap', data=data)
+    for name in ['close_20_sma', 'vwap']:
+        assert list(own[name]) == list(given[name])
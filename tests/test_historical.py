@@ -0,0 +1,44 @@
+import datetime
+
+import numpy as np
+
+from kite_wrapper.historical import decode_candles, parse_timestamps
+
+
+def epochs(stamps):
+    parsed = [datetime.datetime.fromisoformat(s) for s in stamps]
+    return [int(p.replace(tzinfo=p.tzinfo or datetime.timezone.utc).timestamp()) for p in parsed]
+
+
+def test_uniform_timestamps():
+    for stamps in (['2025-06-13T09:15:00+05:30', '2025-06-13T09:16:00+05:30'],
+                   ['2025-06-13T09:15:00', '2025-06-13T09:16:00'],
+                   ['2025-06-13T09:15:00-04:00', '2025-06-13T09:16:00-04:00']):
+        seconds, offset = parse_timestamps(stamps)
+        assert seconds.tolist() == epochs(stamps)
+        expected = datetime.datetime.fromisoformat(stamps[0]).utcoffset()
+        assert offset == (expected.total_seconds() if expected else 0)
+
+
+def test_compact_offset():
+    seconds, offset = parse_timestamps(['2025-06-13T09:15:00+0530'])
+    assert seconds.tolist() == epochs(['2025-06-13T09:15:00+05:30'])
+    assert offset == 19800
+
+
+def test_mixed_layouts_fall_back_to_pandas():
+    stamps = ['2025-06-13T09:15:00+0530', '2025-06-13T09:16:00+05:30', '2025-06-13T03:47:00']
+    seconds, offset = parse_timestamps(stamps)
+    assert seconds.tolist() == epochs(['2025-06-13T09:15:00+05:30', stamps[1], stamps[2]])
+    assert offset == 19800
+
+
+def test_decode_candles():
+    candles = [['2025-06-13T09:15:00+0530', 100, 101, 99, 100.5, 10, 7],
+               ['2025-06-13T09:16:00+0530', 100.5, 102, 100, 101.5, 20, 8]]
+    arrays = decode_candles(candles, dtype=np.float32)
+    assert arrays['date'].tolist() == epochs(['2025-06-13T09:15:00+05:30', '2025-06-13T09:16:00+05:30'])
+    assert arrays['utc_offset'] == 19800
+    assert arrays['close'].dtype == np.float32
+    assert arrays['high'].tolist() == [101, 102]
+    assert arrays['oi'].tolist() == [7, 8]
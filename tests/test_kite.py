@@ -0,0 +1,72 @@
+import datetime
+import logging
+
+import pytest
+from conftest import pinned_stockstats
+
+from kite_wrapper import Kite
+from kite_wrapper.fake_server import FakeKiteServer
+from kite_wrapper.kite import MINUTE_CACHE_RANGES
+from kite_wrapper.metrics import MetricsRegistry
+from kite_wrapper.tracing import RingBufferSink, Tracer
+
+
+@pytest.fixture(scope='module')
+def server():
+    logging.disable(logging.CRITICAL)
+    with FakeKiteServer(rate_limits=None) as server:
+        yield server
+    logging.disable(logging.NOTSET)
+
+
+def kite(server, **kwargs):
+    kite = Kite('key', 'secret', 'http://localhost', root=server.url, metrics=MetricsRegistry(), **kwargs)
+    kite.session.set_access_token('token')
+    return kite
+
+
+def misses(kite):
+    return kite.metrics.get('cache_misses_total', cache='minute_candles')
+
+
+def test_minute_cache_drops_least_recently_used_instrument(server):
+    k = kite(server, minute_cache_size=2)
+    tokens = [i['instrument_token'] for i in server.instruments[:3]]
+    from_date = datetime.datetime.now() - datetime.timedelta(days=7)
+    for token in tokens:
+        k.get_minute_candles(token, from_date)
+    assert misses(k) == 3
+    k.get_minute_candles(tokens[2], from_date)
+    k.get_minute_candles(tokens[1], from_date)
+    assert misses(k) == 3
+    k.get_minute_candles(tokens[0], from_date)
+    assert misses(k) == 4
+
+
+def test_minute_cache_trims_candles_no_call_needs(server):
+    k = kite(server)
+    token = server.instruments[0]['instrument_token']
+    now = datetime.datetime.now()
+    first = k.get_minute_candles(token, now - datetime.timedelta(days=14))
+    assert k.get_minute_candles(token, now - datetime.timedelta(days=14))[0] == first[0]
+    assert misses(k) == 1
+    for _ in range(MINUTE_CACHE_RANGES):
+        k.get_minute_candles(token, now - datetime.timedelta(days=7))
+    assert misses(k) == 1
+    # Candles before the recent ranges were dropped, so the longer range is fetched again.
+    assert k.get_minute_candles(token, now - datetime.timedelta(days=14))[0] == first[0]
+    assert misses(k) == 2
+
+
+@pinned_stockstats
+def test_trend_stages_are_traced(server):
+    sink = RingBufferSink()
+    k = kite(server, tracer=Tracer(sink))
+    token = server.instruments[0]['instrument_token']
+    response = k.get_trend_and_input_features('adx', 'pdi', 'mdi', instrument_token=token, interval='15minute')
+    assert 'r1' in response['indicator_values']
+    root, = sink.spans('get_trend_and_input_features')
+    for name in ['plan_window', 'historic_fetch', 'ltp_fetch', 'candle_ratios', 'indicators', 'trend']:
+        span, = sink.spans(name)
+        assert span.parent_id == root.span_id
+        assert span.trace_id == root.trace_id
@@ -0,0 +1,73 @@
+import logging
+
+import pytest
+from kiteconnect import KiteConnect
+
+from kite_wrapper.fake_server import FakeKiteServer
+from kite_wrapper.metrics import Histogram, MetricsRegistry, instrument_session
+
+
+def test_series_are_kept_per_label_set():
+    metrics = MetricsRegistry()
+    metrics.inc('kite_requests_total', endpoint='market.quote')
+    metrics.inc('kite_requests_total', 2, endpoint='market.quote')
+    metrics.inc('kite_requests_total', endpoint='market.historical')
+    metrics.set('queue_depth', 5)
+    metrics.add('queue_depth', -2)
+    assert metrics.get('kite_requests_total', endpoint='market.quote') == 3
+    assert metrics.get('kite_requests_total', endpoint='market.historical') == 1
+    assert metrics.get('kite_requests_total', endpoint='user.profile') is None
+    assert metrics.get('queue_depth') == 3
+
+
+def test_cache_hit_ratio():
+    metrics = MetricsRegistry()
+    assert metrics.cache_hit_ratio('instruments') is None
+    for hit in [True, True, True, False]:
+        metrics.record_cache('instruments', hit)
+    assert metrics.cache_hit_ratio('instruments') == 0.75
+
+
+def test_histogram_quantile_interpolates_inside_the_bucket():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in [0.5, 1.5, 1.5, 3.0]:
+        histogram.observe(value)
+    assert histogram.quantile(0.25) == 1.0
+    assert histogram.quantile(0.5) == 1.5
+    assert histogram.quantile(1.0) == 4.0
+    assert Histogram().quantile(0.5) is None
+
+
+def test_prometheus_buckets_are_cumulative():
+    metrics = MetricsRegistry()
+    metrics.describe('kite_request_seconds', 'Request latency')
+    for value in [0.5, 1.5, 9.0]:
+        metrics.observe('kite_request_seconds', value, buckets=(1.0, 2.0), endpoint='market.quote')
+    lines = metrics.to_prometheus().splitlines()
+    assert '# HELP kite_request_seconds Request latency' in lines
+    assert 'kite_request_seconds_bucket{endpoint="market.quote",le="1.0"} 1' in lines
+    assert 'kite_request_seconds_bucket{endpoint="market.quote",le="2.0"} 2' in lines
+    assert 'kite_request_seconds_bucket{endpoint="market.quote",le="+Inf"} 3' in lines
+    assert 'kite_request_seconds_count{endpoint="market.quote"} 3' in lines
+
+
+@pytest.fixture(scope='module')
+def server():
+    logging.disable(logging.CRITICAL)
+    with FakeKiteServer(rate_limits=None) as server:
+        yield server
+    logging.disable(logging.NOTSET)
+
+
+def test_instrumented_session_counts_requests_and_errors(server):
+    metrics = MetricsRegistry()
+    session = KiteConnect('key', access_token='token', root=server.url)
+    instrument_session(session, metrics)
+    session.ltp([server.instruments[0]['instrument_token']])
+    server.inject_errors('quote', status=503)
+    with pytest.raises(Exception):
+        session.ltp([server.instruments[0]['instrument_token']])
+    assert metrics.get('kite_requests_total', endpoint='market.quote.ltp') == 2
+    assert sum((metrics.snapshot()['counters']['kite_request_errors_total']).values()) == 1
+    assert metrics.get('kite_request_seconds', endpoint='market.quote.ltp').count == 2
+    assert metrics.get('kite_response_bytes_total', endpoint='market.quote.ltp') > 0
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+from kiteconnect import exceptions as kite_exceptions
+
+from kite_wrapper.metrics import MetricsRegistry
+from kite_wrapper.orders import OrderGateway, OrderStatusUnknown
+from kite_wrapper.ratelimit import endpoint_category
+
+ORDER = dict(exchange='NSE', tradingsymbol='INFY', transaction_type='BUY', quantity=1, product='CNC',
+             order_type='MARKET')
+
+
+class Session:
+    """
+    KiteConnect stand-in: place_order fails with the queued errors, and an order can reach the book although its
+    request failed.
+    """
+
+    def __init__(self, errors=(), placed_despite_error=False, book_visible_after=0, book_errors=0):
+        self.errors = list(errors)
+        self.placed_despite_error = placed_despite_error
+        self.book_visible_after = book_visible_after
+        self.book_errors = book_errors
+        self.book = []
+        self.placed = 0
+        self.lookups = 0
+        self.lock = threading.Lock()
+
+    def place_order(self, variety, tag, **params):
+        with self.lock:
+            self.placed += 1
+            order = {'order_id': str(self.placed), 'tag': tag}
+            if self.errors:
+                if self.placed_despite_error:
+                    self.book.append(order)
+                raise self.errors.pop(0)
+            self.book.append(order)
+            return order['order_id']
+
+    def orders(self):
+        with self.lock:
+            self.lookups += 1
+            if self.book_errors:
+                self.book_errors -= 1
+                raise kite_exceptions.NetworkException('gateway timeout', code=504)
+            return list(self.book) if self.lookups > self.book_visible_after else []
+
+
+def gateway(session, **kwargs):
+    kwargs = dict(dict(backoff=0, reconcile_timeout=0.3, reconcile_interval=0.02, metrics=MetricsRegistry()),
+                  **kwargs)
+    return OrderGateway(session, **kwargs)
+
+
+def timeout():
+    return kite_exceptions.GeneralException('gateway timeout', code=504)
+
+
+def test_lost_response_is_recovered_from_the_order_book():
+    session = Session([timeout()], placed_despite_error=True, book_visible_after=3)
+    with gateway(session) as g:
+        assert g.submit(**ORDER).result() == '1'
+    assert session.placed == 1
+    assert len(session.book) == 1
+
+
+def test_order_missing_after_deadline_is_sent_again():
+    session = Session([timeout()])
+    with gateway(session) as g:
+        assert g.submit(**ORDER).result() == '2'
+    assert session.placed == 2
+    assert session.lookups > 1
+
+
+def test_unreadable_order_book_gives_unknown_status():
+    session = Session([timeout()], book_errors=1000)
+    with gateway(session) as g:
+        future = g.submit(**ORDER, tag='kwfixed')
+        with pytest.raises(OrderStatusUnknown) as error:
+            future.result()
+    assert error.value.tag == 'kwfixed'
+    assert session.placed == 1
+
+
+def test_order_book_reads_do_not_use_order_rate():
+    session = Session([timeout()], placed_despite_error=True, book_visible_after=5)
+    start = time.monotonic()
+    with gateway(session, rate=2) as g:
+        assert g.submit(**ORDER).result() == '1'
+        assert g.submit(**ORDER).result() == '2'
+    # Sharing the order bucket, the five reads would have waited two seconds for tokens.
+    assert time.monotonic() - start < 1
+    assert endpoint_category('/orders', 'GET') == 'default'
+    assert endpoint_category('/orders/regular', 'POST') == 'orders'
+
+
+def test_throttled_order_is_retried_without_lookup():
+    session = Session([kite_exceptions.NetworkException('too many requests', code=429)])
+    with gateway(session) as g:
+        assert g.submit(**ORDER).result() == '2'
+    assert session.lookups == 0
+
+
+def test_rejected_order_is_not_retried():
+    session = Session([kite_exceptions.InputException('invalid quantity', code=400)])
+    with gateway(session) as g:
+        with pytest.raises(kite_exceptions.InputException):
+            g.submit(**ORDER).result()
+    assert session.placed == 1
+    assert session.lookups == 0
+
+
+def test_gives_up_after_retries():
+    session = Session([timeout()] * 3)
+    with gateway(session, retries=2) as g:
+        with pytest.raises(kite_exceptions.GeneralException):
+            g.submit(**ORDER).result()
+    assert session.placed == 3
+    assert session.book == []
@@ -0,0 +1,51 @@
+import datetime
+
+import numpy as np
+from conftest import pinned_stockstats
+
+from kite_wrapper import TechnicalAnalysisV2
+from kite_wrapper.parity import Engine, ParityHarness, compare, synthetic_sets
+
+INDICATORS = ('close_20_sma', 'rsi_14', 'vwap')
+
+
+def sets():
+    return synthetic_sets(2, '15minute', 10, end=datetime.date(2025, 6, 13))
+
+
+def v2(candles, names):
+    return TechnicalAnalysisV2().get_indicators(*names, data=candles, to_percentage=False)
+
+
+def shifted(candles, names):
+    values = v2(candles, names)
+    values['rsi_14'] = values['rsi_14'] + 0.5
+    return values
+
+
+def test_compare_counts_one_sided_nans():
+    reference = np.array([np.nan, 1.0, 2.0, 4.0])
+    assert compare(reference.copy(), reference, 0, 0) == (0.0, 0.0, 0, True)
+    max_abs, max_rel, nan_mismatch, passed = compare(np.array([0.0, 1.0, 2.0, 4.4]), reference, 1e-3, 1e-3)
+    assert np.isclose(max_abs, 0.4) and np.isclose(max_rel, 0.1)
+    assert nan_mismatch == 1 and not passed
+
+
+def test_harness_reports_mismatching_outputs():
+    harness = ParityHarness([Engine('same', v2), Engine('shifted', shifted, strict=False, note='rsi + 0.5')],
+                            repeats=1)
+    report = harness.run(sets(), INDICATORS)
+    # Non strict engines are reported but do not fail the run.
+    assert report.passed
+    failures = report.failures()
+    assert {(c['engine'], c['output']) for c in failures} == {('shifted', 'rsi_14')}
+    assert len(failures) == 2
+    assert [p['engine'] for p in report.performance] == ['v2', 'same', 'shifted']
+    assert 'rsi + 0.5' in report.format()
+    assert not ParityHarness([Engine('shifted', shifted)], repeats=1).run(sets(), INDICATORS).passed
+
+
+@pinned_stockstats
+def test_built_in_engines_match_the_reference():
+    report = ParityHarness(['v2_latest', 'batch', 'v2_float32', 'batch_float32'], repeats=1).run(sets())
+    assert report.passed, report.format()
@@ -0,0 +1,85 @@
+import datetime
+
+from kite_wrapper.planner import DEFAULT_LOOKBACK_DAYS, DEFAULT_WARMUP, MAX_DAYS_PER_REQUEST, plan_window, \
+    split_range, warmup_bars
+from kite_wrapper.sessions import ExchangeCalendar
+
+END = datetime.datetime(2025, 6, 13, 12, 0)
+
+
+def test_vwap_window_does_not_depend_on_other_indicators():
+    for interval in ['minute', '15minute', 'hour', 'day']:
+        alone = plan_window('vwap', interval=interval, end=END)[0]
+        for others in [('rsi_14',), ('close_200_sma',), ('rsi_14', 'adx', 'close_200_sma')]:
+            assert plan_window('vwap', *others, interval=interval, end=END)[0] == alone
+
+
+def test_vwap_window_is_the_default_lookback():
+    start = plan_window('vwap', interval='minute', end=END)[0]
+    assert start == END - datetime.timedelta(days=DEFAULT_LOOKBACK_DAYS['minute'])
+
+
+def test_window_without_vwap_covers_warmup():
+    start, end, bars = plan_window('close_200_sma', interval='day', end=END)
+    assert bars == 200
+    assert end == END
+    assert start < END - datetime.timedelta(days=280)
+
+
+def test_warmup_bars():
+    assert warmup_bars('close_20_sma') == 20
+    assert warmup_bars('wr_10') == 10
+    assert warmup_bars('close_10_ema') > 10
+    assert warmup_bars('rsi_14') > warmup_bars('rsi_6')
+    assert warmup_bars('adx') > warmup_bars('dx')
+    assert warmup_bars('adxr') > warmup_bars('adx')
+    assert warmup_bars('close_10_ema', tolerance=1e-6) > warmup_bars('close_10_ema')
+    assert warmup_bars('unknown_indicator') == DEFAULT_WARMUP
+
+
+def test_plan_window_ending_on_a_weekend():
+    # Saturday after a Friday holiday: the last session is Thursday 14 August 2025.
+    start, _, bars = plan_window('close_20_sma', interval='minute', end=datetime.datetime(2025, 8, 16, 12, 0))
+    assert bars == 20
+    assert start == datetime.datetime(2025, 8, 14, 9, 15)
+
+
+def test_plan_window_mid_session():
+    # 30 minute candles of the session so far (09:15 to 10:15 and a forming one) are not enough for 5 bars.
+    start = plan_window(interval='30minute', bars=5, end=datetime.datetime(2025, 8, 14, 10, 20))[0]
+    assert start == datetime.datetime(2025, 8, 13, 9, 15)
+    start = plan_window(interval='30minute', bars=3, end=datetime.datetime(2025, 8, 14, 10, 20))[0]
+    assert start == datetime.datetime(2025, 8, 14, 9, 15)
+
+
+def test_split_range_chunks_follow_request_limits():
+    start, end = datetime.datetime(2024, 1, 1), datetime.datetime(2025, 6, 13, 15, 30)
+    chunks = split_range(start, end, 'minute')
+    calendar = ExchangeCalendar()
+    assert chunks[0][0] == datetime.datetime(2024, 1, 1, 9, 15)
+    assert chunks[-1][1] == end
+    for first, last in chunks:
+        assert calendar.is_trading_day(first.date()) and calendar.is_trading_day(last.date())
+        assert first.time() == calendar.open_time and last.time() == calendar.close_time
+        assert (last.date() - first.date()).days < MAX_DAYS_PER_REQUEST['minute']
+    for (_, previous), (following, _) in zip(chunks, chunks[1:]):
+        assert previous < following
+        # No trading day is left out between chunks.
+        assert calendar.next_trading_day(previous.date()) == following.date()
+
+
+def test_split_range_skips_closed_edges():
+    # From Friday's close to Monday before the open there is no session.
+    assert split_range(datetime.datetime(2025, 8, 14, 15, 30), datetime.datetime(2025, 8, 18, 9, 0),
+                       'minute') == []
+    # Holiday and weekend at the start, a range ending before the open at the end.
+    chunks = split_range(datetime.datetime(2025, 8, 15), datetime.datetime(2025, 8, 20, 8, 0), 'hour')
+    assert chunks == [(datetime.datetime(2025, 8, 18, 9, 15), datetime.datetime(2025, 8, 19, 15, 30))]
+
+
+def test_split_range_day_interval_keeps_whole_days():
+    chunks = split_range(datetime.datetime(2019, 1, 1), datetime.datetime(2025, 6, 13, 12, 0), 'day')
+    assert len(chunks) == 2
+    assert chunks[0][0] == datetime.datetime(2019, 1, 1)
+    assert chunks[0][1].time() == datetime.time(23, 59, 59)
+    assert chunks[-1][1] == datetime.datetime(2025, 6, 13, 12, 0)
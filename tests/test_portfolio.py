@@ -0,0 +1,71 @@
+import copy
+
+from kite_wrapper.metrics import MetricsRegistry
+from kite_wrapper.portfolio import PortfolioService
+
+POSITION = {'exchange': 'NSE', 'tradingsymbol': 'INFY', 'product': 'MIS', 'quantity': 10, 'overnight_quantity': 0,
+            'average_price': 1500.0, 'last_price': 1500.0, 'pnl': 0.0, 'm2m': 0.0}
+HOLDING = {'exchange': 'NSE', 'tradingsymbol': 'TCS', 'product': 'CNC', 'quantity': 5, 't1_quantity': 0,
+           'average_price': 3500.0, 'last_price': 3600.0, 'pnl': 500.0}
+MARGINS = {'equity': {'net': 100000.0, 'available': {'cash': 100000.0, 'live_balance': 90000.0},
+                      'utilised': {'span': 0.0, 'm2m_unrealised': 0.0}}}
+
+
+class Session:
+    def __init__(self):
+        self.position = dict(POSITION)
+        self.holding = dict(HOLDING)
+        self.margin = copy.deepcopy(MARGINS)
+
+    def positions(self):
+        return {'net': [dict(self.position)], 'day': []}
+
+    def holdings(self):
+        return [dict(self.holding)]
+
+    def margins(self):
+        return copy.deepcopy(self.margin)
+
+    def tick(self, price):
+        self.position.update(last_price=price, pnl=(price - 1500.0) * 10, m2m=(price - 1500.0) * 10)
+        self.holding.update(last_price=price * 2, pnl=(price * 2 - 3500.0) * 5)
+        self.margin['equity']['net'] = 100000.0 + self.position['pnl']
+        self.margin['equity']['utilised']['m2m_unrealised'] = -self.position['pnl']
+
+
+def service():
+    session = Session()
+    portfolio = PortfolioService(session, min_interval=0, metrics=MetricsRegistry())
+    changes, marks = [], []
+    portfolio.subscribe(lambda diff, snapshot: changes.append(diff))
+    portfolio.subscribe(lambda diff, snapshot: marks.append(diff), marks=True)
+    portfolio.refresh()
+    return session, portfolio, changes, marks
+
+
+def test_price_ticks_are_not_changes():
+    session, portfolio, changes, marks = service()
+    assert len(changes) == 1
+    session.tick(1510.0)
+    portfolio.refresh()
+    assert len(changes) == 1
+    assert len(marks) == 2
+    moved = marks[-1]['marks']
+    assert moved['positions'][0][1]['last_price'] == 1510.0
+    assert moved['holdings'][0][1]['pnl'] == (3020.0 - 3500.0) * 5
+    assert moved['margins']['equity'][1]['net'] == 100100.0
+    assert set(marks[-1]) == {'marks'}
+
+
+def test_fills_and_funds_are_changes():
+    session, portfolio, changes, marks = service()
+    session.tick(1510.0)
+    session.position.update(quantity=20, average_price=1505.0)
+    portfolio.refresh()
+    assert changes[-1]['positions']['changed'][0][1]['quantity'] == 20
+    session.margin['equity']['available']['cash'] = 150000.0
+    portfolio.refresh()
+    assert list(changes[-1]) == ['margins']
+    assert len(changes) == 3
+    portfolio.refresh()
+    assert len(changes) == 3
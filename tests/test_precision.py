@@ -0,0 +1,40 @@
+import datetime
+
+import numpy as np
+
+from kite_wrapper.batch import BatchTechnicalAnalysis
+from kite_wrapper.frame import CandleFrame
+from kite_wrapper.parity import synthetic_sets, compare
+from kite_wrapper.precision import float32_tolerance, restore_prices
+
+DMI = ['pdi', 'mdi', 'dx', 'adx', 'adxr']
+
+
+def test_restore_prices_recovers_float64_ticks():
+    prices = np.round(np.arange(400, 3000, 0.05), 2)
+    assert np.array_equal(restore_prices(prices.astype(np.float32)), prices)
+
+
+def test_float32_dmi_within_tolerance():
+    sets = synthetic_sets(2, 'minute', 20, end=datetime.date(2025, 6, 13))
+    batch = BatchTechnicalAnalysis.from_candles(sets)
+    batch32 = BatchTechnicalAnalysis.from_candles(sets, dtype='float32')
+    expected = batch.get_indicators(*DMI, to_percentage=False)
+    actual = batch32.get_indicators(*DMI, to_percentage=False)
+    for name in DMI:
+        assert actual[name].dtype == np.float32
+        assert float32_tolerance(name)[1] <= 1e-4
+        assert compare(actual[name], expected[name], *float32_tolerance(name))[3], name
+
+
+def test_float32_frame_keeps_only_float32_indicators():
+    candles = list(synthetic_sets(1, 'minute', 10, end=datetime.date(2025, 6, 13)).values())[0]
+    frame = CandleFrame(candles)
+    frame32 = CandleFrame(candles, dtype=np.float32)
+    for name in ['close_20_sma', 'rsi_14', 'kdjk', 'kdjd', 'pdi', 'adx']:
+        values = frame32.indicator(name)
+        assert values.dtype == np.float32
+        assert values is frame32.indicator(name)
+        assert compare(values.to_numpy(), frame.indicator(name).to_numpy(), *float32_tolerance(name))[3], name
+    # The float64 columns stockstats added on the way were dropped.
+    assert list(frame32.stock.columns) == list(CandleFrame(candles, dtype=np.float32).stock.columns)
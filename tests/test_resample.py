@@ -0,0 +1,32 @@
+import datetime
+
+import pytest
+
+from kite_wrapper.parity import synthetic_sets
+from kite_wrapper.resample import resample, resample_all
+
+END = datetime.date(2025, 6, 13)
+
+
+def fields(candles):
+    return [(c['date'], c['open'], c['high'], c['low'], c['close'], c['volume']) for c in candles]
+
+
+@pytest.fixture(scope='module')
+def minute():
+    return list(synthetic_sets(1, 'minute', 10, end=END).values())[0]
+
+
+@pytest.mark.parametrize('interval', ['3minute', '15minute', 'hour', 'day'])
+def test_resampled_minutes_match_server_candles(minute, interval):
+    # Day candles are selected by date, so the server also returns the day the minute range starts after.
+    first = minute[0]['date'].replace(hour=0, minute=0)
+    expected = [c for c in list(synthetic_sets(1, interval, 10, end=END).values())[0] if c['date'] >= first]
+    assert fields(resample(minute, interval)) == pytest.approx(fields(expected))
+
+
+def test_resample_all_keeps_minute_candles(minute):
+    derived = resample_all(minute, ['minute', '5minute'])
+    assert derived['minute'] is minute
+    assert len(derived['5minute']) == len(minute) // 5
+    assert resample([], '5minute') == []
@@ -0,0 +1,53 @@
+import datetime
+import threading
+import time
+
+from kite_wrapper.metrics import MetricsRegistry
+from kite_wrapper.scheduler import CandleScheduler, next_candle_close, session_candle_closes
+from kite_wrapper.sessions import ExchangeCalendar
+
+
+def at(day, hour, minute, second=0):
+    return datetime.datetime(2025, 8, day, hour, minute, second)
+
+
+def test_session_candle_closes_end_with_the_short_last_candle():
+    calendar = ExchangeCalendar()
+    closes = session_candle_closes(calendar, 'hour', datetime.date(2025, 8, 14))
+    assert closes == [at(14, h, 15) for h in range(10, 16)] + [at(14, 15, 30)]
+    assert len(session_candle_closes(calendar, 'minute', datetime.date(2025, 8, 14))) == 375
+    assert session_candle_closes(calendar, 'day', datetime.date(2025, 8, 15)) == []
+    # Friday the 15th is a holiday, so the week closes on Thursday.
+    assert session_candle_closes(calendar, 'week', datetime.date(2025, 8, 14)) == [at(14, 15, 30)]
+    assert session_candle_closes(calendar, 'week', datetime.date(2025, 8, 13)) == []
+
+
+def test_next_candle_close_skips_closed_days():
+    calendar = ExchangeCalendar()
+    assert next_candle_close(calendar, '5minute', at(14, 9, 20)) == at(14, 9, 25)
+    assert next_candle_close(calendar, '5minute', at(14, 15, 30)) == at(18, 9, 20)
+
+
+def test_cycle_runs_each_instrument_after_the_close():
+    # Exchange time running from a second before the 09:16 close.
+    start = time.monotonic()
+
+    def clock():
+        return at(14, 9, 15, 59) + datetime.timedelta(seconds=time.monotonic() - start)
+
+    metrics = MetricsRegistry()
+    scheduler = CandleScheduler(delay=0.1, metrics=metrics, clock=clock)
+    reports, done = [], threading.Event()
+    scheduler.add(lambda token, close: (token, close), instruments=[1, 2], name='scan',
+                  on_cycle=lambda report: (reports.append(report), done.set()))
+    scheduler.start()
+    try:
+        assert done.wait(5)
+    finally:
+        scheduler.stop()
+    report = reports[0]
+    assert report.close == at(14, 9, 16)
+    assert report.results == {1: (1, at(14, 9, 16)), 2: (2, at(14, 9, 16))}
+    assert not report.errors and not report.missed
+    assert 0.1 <= report.latency < 5
+    assert metrics.get('kite_scheduler_cycles_total', job='scan', status='ok') == 1
@@ -0,0 +1,64 @@
+import datetime
+import json
+
+import pytest
+
+from kite_wrapper import sessions
+from kite_wrapper.sessions import ExchangeCalendar, HOLIDAYS_ENV
+
+
+def test_holidays_and_weekends_are_closed():
+    calendar = ExchangeCalendar()
+    assert not calendar.is_trading_day(datetime.date(2025, 8, 15))
+    assert not calendar.is_trading_day(datetime.date(2025, 8, 16))
+    assert calendar.is_trading_day(datetime.date(2025, 8, 14))
+    assert calendar.previous_trading_day(datetime.date(2025, 8, 18)) == datetime.date(2025, 8, 14)
+    assert calendar.next_trading_day(datetime.date(2025, 8, 14)) == datetime.date(2025, 8, 18)
+
+
+def test_candles_per_session_counts_the_short_last_candle():
+    calendar = ExchangeCalendar()
+    assert calendar.candles_per_session('minute') == 375
+    assert calendar.candles_per_session('hour') == 7
+    assert calendar.candles_until(datetime.datetime(2025, 8, 14, 9, 15), 'minute') == 0
+    assert calendar.candles_until(datetime.datetime(2025, 8, 14, 10, 16), 'hour') == 2
+    assert calendar.candles_until(datetime.datetime(2025, 8, 14, 18, 0), 'minute') == 375
+
+
+def test_start_for_bars_skips_closed_days():
+    calendar = ExchangeCalendar()
+    # Monday before open: the bars come from the previous sessions, Thursday 14th (Friday 15th is a holiday).
+    end = datetime.datetime(2025, 8, 18, 9, 0)
+    assert calendar.start_for_bars(375, 'minute', end) == datetime.datetime(2025, 8, 14, 9, 15)
+    assert calendar.start_for_bars(376, 'minute', end) == datetime.datetime(2025, 8, 13, 9, 15)
+    assert calendar.start_for_bars(2, 'day', end) == datetime.datetime(2025, 8, 13)
+    assert calendar.start_for_bars(1, 'week', end) == datetime.datetime(2025, 8, 18)
+
+
+def test_unknown_years_warn(caplog):
+    sessions._warned_years.discard(2026)
+    calendar = ExchangeCalendar()
+    assert calendar.known_until == 2025
+    with caplog.at_level('WARNING'):
+        assert calendar.is_trading_day(datetime.date(2026, 1, 27))
+        calendar.is_trading_day(datetime.date(2026, 1, 28))
+    assert len([r for r in caplog.records if '2026' in r.getMessage()]) == 1
+
+
+def test_unknown_years_raise_when_strict():
+    calendar = ExchangeCalendar(strict=True)
+    assert calendar.is_trading_day(datetime.date(2025, 12, 24))
+    with pytest.raises(ValueError):
+        calendar.is_trading_day(datetime.date(2026, 1, 2))
+    calendar.add_holidays(datetime.date(2026, 1, 26))
+    assert not calendar.is_trading_day(datetime.date(2026, 1, 26))
+
+
+def test_holidays_file(tmp_path, monkeypatch):
+    path = tmp_path / 'holidays.json'
+    path.write_text(json.dumps(['2026-01-26', '2026-12-25']))
+    monkeypatch.setenv(HOLIDAYS_ENV, str(path))
+    calendar = ExchangeCalendar(strict=True)
+    assert calendar.known_until == 2026
+    assert not calendar.is_trading_day(datetime.date(2026, 1, 26))
+    assert calendar.is_trading_day(datetime.date(2026, 1, 27))
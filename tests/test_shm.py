@@ -0,0 +1,58 @@
+import datetime
+import os
+import time
+
+from kite_wrapper.shm import IST, CandleRing, QuoteBoard
+
+
+def name(kind):
+    return 'kw_test_{}_{}'.format(kind, os.getpid())
+
+
+def candles(start, count):
+    return [{'date': start + datetime.timedelta(minutes=i), 'open': 100.0 + i, 'high': 101.0 + i, 'low': 99.0 + i,
+             'close': 100.5 + i, 'volume': 10 * i, 'oi': 0} for i in range(count)]
+
+
+def test_candle_ring_round_trip_keeps_the_latest_candles():
+    # Readers attach from other processes. Attaching in this one would unregister the segment from the resource
+    # tracker before Python 3.13, so the owner reads here.
+    ring = CandleRing(name('ring'), capacity=5, create=True)
+    try:
+        start = datetime.datetime(2025, 6, 13, 9, 15)
+        ring.write(candles(start, 8))
+        # A forming candle with the latest date replaces it.
+        ring.write([dict(candles(start, 8)[-1], close=200.0)])
+        read = ring.candles()
+        assert len(read) == 5
+        assert [c['date'] for c in read] == [(start + datetime.timedelta(minutes=i)).replace(tzinfo=IST)
+                                             for i in range(3, 8)]
+        assert read[-1]['close'] == 200.0
+        assert ring.read(2).shape == (2, 7)
+    finally:
+        ring.close()
+
+
+def test_quote_board_round_trip():
+    board = QuoteBoard(name('quotes'), tokens=[1, 2], create=True)
+    try:
+        assert board.get(1) is None
+        stamp = datetime.datetime(2025, 6, 13, 10, 0, 5)
+        board.update([{'instrument_token': 1, 'exchange_timestamp': stamp, 'last_price': 101.5,
+                       'volume_traded': 500}, {'instrument_token': 9, 'last_price': 1.0}])
+        quote = board.get(1)
+        assert quote['timestamp'] == stamp.replace(tzinfo=IST)
+        assert quote['last_price'] == 101.5
+        assert quote['volume_traded'] == 500
+        assert board.tokens == [1, 2]
+    finally:
+        board.close()
+
+
+def test_tick_without_timestamp_is_stamped_now():
+    board = QuoteBoard(name('stamp'), tokens=[1], create=True)
+    try:
+        board.update([{'instrument_token': 1, 'last_price': 10.0}])
+        assert abs(board.get(1)['timestamp'].timestamp() - time.time()) < 5
+    finally:
+        board.close()
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kite_wrapper.stats import StreamingStats, analyse_files
+
+
+def dataset(rows, seed):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(100, 5, rows)
+    frame = pd.DataFrame({'x': x, 'y': 2 * x + rng.normal(0, 1, rows), 'z': rng.exponential(3, rows),
+                          'symbol': 'INFY'})
+    frame.loc[rng.choice(rows, rows // 10, replace=False), 'y'] = np.nan
+    return frame
+
+
+def assert_matches_pandas(stats, frame):
+    numeric = frame[['x', 'y', 'z']]
+    summary = stats.summary()
+    assert summary['count'].tolist() == numeric.count().tolist()
+    for column, expected in [('mean', numeric.mean()), ('std', numeric.std()), ('min', numeric.min()),
+                             ('max', numeric.max()), ('skew', numeric.skew()), ('kurtosis', numeric.kurt())]:
+        assert summary[column].to_numpy() == pytest.approx(expected.to_numpy(), rel=1e-9, abs=1e-9), column
+    assert stats.corr().to_numpy() == pytest.approx(numeric.corr().to_numpy(), rel=1e-9, abs=1e-9)
+
+
+def test_chunks_and_merged_parts_match_pandas():
+    frame = pd.concat([dataset(3000, 0), dataset(2000, 1)], ignore_index=True)
+    # The second part has a different mean, so merging has to move its moments.
+    frame.loc[3000:, 'x'] += 50
+    chunked = StreamingStats()
+    for start in range(0, len(frame), 700):
+        chunked.update(frame.iloc[start:start + 700])
+    assert_matches_pandas(chunked, frame)
+    merged = StreamingStats().update(frame.iloc[:3000]).merge(StreamingStats().update(frame.iloc[3000:]))
+    assert_matches_pandas(merged, frame)
+    counts, edges = chunked.histogram('z')
+    assert counts.sum() == len(frame) and edges[0] <= frame['z'].min() and edges[-1] >= frame['z'].max()
+    # Merged fine bins are placed by their centres, so only the total is exact.
+    assert merged.histogram('z')[0].sum() == len(frame)
+
+
+def test_analyse_files(tmp_path):
+    frames = [dataset(1000, seed) for seed in range(3)]
+    filenames = []
+    for index, frame in enumerate(frames):
+        filenames.append(str(tmp_path / '{}.csv'.format(index)))
+        frame.to_csv(filenames[-1], index=False)
+    stats = analyse_files(filenames, workers=2, chunk_size=250)
+    assert_matches_pandas(stats, pd.concat(frames, ignore_index=True))
@@ -0,0 +1,29 @@
+import datetime
+
+from kite_wrapper.store import HistoryStore
+
+
+def candles(start, count):
+    return [{'date': start + datetime.timedelta(minutes=i), 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5,
+             'volume': 10} for i in range(count)]
+
+
+def test_longer_download_of_a_range_replaces_the_partial_one(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    start = datetime.datetime(2025, 6, 13, 9, 15)
+    store.write_chunk(1, 'minute', start, datetime.datetime(2025, 6, 13, 10, 0), candles(start, 45))
+    store.write_chunk(1, 'minute', start, datetime.datetime(2025, 6, 13, 15, 30), candles(start, 375))
+    assert store.chunks(1, 'minute') == [(start, datetime.datetime(2025, 6, 13, 15, 30))]
+    assert len(store.read(1, 'minute')) == 375
+
+
+def test_other_ranges_are_kept(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    first = datetime.datetime(2025, 6, 12, 9, 15)
+    second = datetime.datetime(2025, 6, 13, 9, 15)
+    store.write_chunk(1, 'minute', first, datetime.datetime(2025, 6, 12, 15, 30), candles(first, 375))
+    store.write_chunk(1, 'minute', second, datetime.datetime(2025, 6, 13, 15, 30), candles(second, 375))
+    # Rewriting a range with an earlier end does not drop the longer copy.
+    store.write_chunk(1, 'minute', second, datetime.datetime(2025, 6, 13, 10, 0), candles(second, 45))
+    assert len(store.chunks(1, 'minute')) == 3
+    assert len(store.read(1, 'minute')) == 750
@@ -0,0 +1,54 @@
+import concurrent.futures as concurrent
+import json
+
+import pytest
+
+from kite_wrapper.tracing import NULL_TRACER, JsonLinesSink, RingBufferSink, Tracer
+
+
+def test_nested_spans_share_the_trace():
+    sink = RingBufferSink()
+    tracer = Tracer(sink)
+    with tracer.span('scan', instrument_token=256265) as root:
+        with tracer.span('fetch') as child:
+            child.set('candles', 375)
+    with tracer.span('other') as other:
+        pass
+    assert [s.name for s in sink.spans()] == ['fetch', 'scan', 'other']
+    assert child.parent_id == root.span_id and child.trace_id == root.trace_id
+    assert root.parent_id is None and other.trace_id != root.trace_id
+    assert child.attributes == {'candles': 375}
+    assert root.attributes == {'instrument_token': 256265}
+    assert root.duration >= child.duration >= 0
+
+
+def test_wrapped_work_on_other_threads_keeps_its_parent():
+    sink = RingBufferSink()
+    tracer = Tracer(sink)
+    with tracer.span('scan') as root:
+        with concurrent.ThreadPoolExecutor(2) as executor:
+            list(executor.map(tracer.wrap(lambda x: x, 'fetch'), range(3)))
+    fetches = sink.spans('fetch')
+    assert len(fetches) == 3
+    assert all(s.parent_id == root.span_id for s in fetches)
+    assert sink.spans(trace_id=root.trace_id) == fetches + [root]
+
+
+def test_errors_are_recorded_and_raised(tmp_path):
+    sink = JsonLinesSink(str(tmp_path / 'spans.jsonl'))
+    tracer = Tracer(sink)
+    with pytest.raises(KeyError):
+        with tracer.span('lookup'):
+            raise KeyError('INFY')
+    sink.close()
+    span, = [json.loads(line) for line in open(sink.filename)]
+    assert span['name'] == 'lookup'
+    assert span['error'] == 'KeyError'
+
+
+def test_null_tracer_records_nothing():
+    fn = len
+    assert NULL_TRACER.wrap(fn, 'len') is fn
+    with NULL_TRACER.span('scan') as span:
+        span.set('ignored', 1)
+    assert span.duration is None
@@ -0,0 +1,58 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kite_wrapper import TechnicalAnalysisV2
+from kite_wrapper.parity import LATEST_ATOL, LATEST_RTOL, synthetic_sets
+
+END = datetime.date(2025, 6, 13)
+
+
+@pytest.fixture(scope='module')
+def candles():
+    return list(synthetic_sets(1, '5minute', 30, end=END).values())[0]
+
+
+def test_latest_indicators_match_the_full_history(candles):
+    analysis = TechnicalAnalysisV2()
+    names = ['close_20_sma', 'wr_10', 'close_10_ema', 'rsi_14', 'vwap']
+    full = analysis.get_indicators(*names, data=candles)
+    latest = analysis.get_latest_indicators(*names, data=candles)
+    assert list(latest) == names
+    # Moving windows and vwap are exact, recursive filters carry the warm-up truncation error.
+    for name in ['close_20_sma', 'wr_10', 'vwap']:
+        assert latest[name] == pytest.approx(np.asarray(full[name])[-1], rel=1e-12)
+    for name in ['close_10_ema', 'rsi_14']:
+        assert latest[name] == pytest.approx(np.asarray(full[name])[-1], rel=LATEST_RTOL, abs=LATEST_ATOL)
+    ratios = analysis.get_latest_candle_ratios(data=candles)
+    full_ratios = analysis.get_candle_ratios(data=candles)
+    assert ratios == {k: pytest.approx(np.asarray(v)[-1]) for k, v in full_ratios.items()}
+
+
+def test_feature_windows_are_views_of_the_feature_matrix(candles):
+    analysis = TechnicalAnalysisV2()
+    matrix, names = analysis.get_feature_matrix('close_20_sma', 'wr_10', data=candles)
+    result = analysis.get_feature_windows('close_20_sma', 'wr_10', window=8, step=3, data=candles)
+    windows, end = result['windows'], result['end']
+    assert result['features'] == names
+    assert windows.shape == (len(end), 8, len(names))
+    assert not windows.flags.writeable
+    assert end[0] == 5 + 8 - 1 and np.all(np.diff(end) == 3)
+    for index in [0, len(end) // 2, len(end) - 1]:
+        assert np.array_equal(windows[index], matrix[end[index] - 7:end[index] + 1], equal_nan=True)
+    actions = analysis.get_swing_data(1, data=candles)['actions']
+    assert list(result['actions']) == [actions[i] for i in end]
+
+
+def test_feature_windows_of_a_file_match_in_memory(candles, tmp_path):
+    filename = str(tmp_path / 'candles.csv')
+    pd.DataFrame(candles).to_csv(filename, index=False)
+    analysis = TechnicalAnalysisV2()
+    expected = analysis.get_feature_windows('close_20_sma', 'wr_10', window=8, data=candles)
+    chunks = list(analysis.iter_feature_windows(filename, 'close_20_sma', 'wr_10', window=8, chunk_size=500))
+    assert len(chunks) > 1
+    assert np.concatenate([c['end'] for c in chunks]).tolist() == expected['end'].tolist()
+    windows = np.concatenate([c['windows'] for c in chunks])
+    assert np.allclose(windows, expected['windows'], rtol=1e-9, atol=1e-12, equal_nan=True)